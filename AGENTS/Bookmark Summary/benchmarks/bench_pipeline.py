@@ -0,0 +1,523 @@
+# Offline end-to-end benchmark of runner.py's scrape -> summarize -> deliver pipeline.
+#
+# Starts three local stand-ins on 127.0.0.1:
+#   - a static site serving generated articles of controlled sizes, some of
+#     them client-rendered JS shells, all padded with inline script and
+#     wrapped in site chrome (menu, cookie banner, related links, comments),
+#     spread unevenly over --hosts loopback addresses (127.0.0.1, .2, ...) and
+#     optionally answering 429 + Retry-After above --site-rps per host;
+#   - a fake OpenAI-compatible /v1/chat/completions server (SSE or JSON) with
+#     configurable latency, prefill speed, tokens/s and concurrent slots;
+#   - a fake Telegram Bot API answering getMe / sendMessage.
+# The runner then processes N bookmarks in a child process against a scratch
+# bookmark DB and fresh caches. Per-stage latency comes from the run report
+# (metrics.span), and the result is compared with a stored baseline.
+#
+# Timings depend on the machine, so the baseline is not committed: record one
+# on the box you compare on, with the same flags as the runs it should judge.
+# Comparing without one fails straight away (pass --no-compare to only print
+# the numbers).
+#
+#   python3 benchmarks/bench_pipeline.py --save-baseline      # record the current numbers
+#   python3 benchmarks/bench_pipeline.py                      # compare against them
+#   python3 benchmarks/bench_pipeline.py --bookmarks 30 --page-words 400,2000,9000 --no-compare
+#
+# JS-shell pages need Playwright's Chromium installed; they are off by default.
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline_baseline.json")
+
+# Relative slowdown (or RSS growth) beyond which a number counts as a regression
+DEFAULT_TOLERANCE = 0.15
+# Stage p50s must also grow by this many seconds; millisecond stages are noisy
+MIN_STAGE_SLOWDOWN = 0.01
+
+WORDS = (
+    "system latency memory cache queue browser server request response model token budget "
+    "article summary pipeline worker thread process network socket page render script style "
+    "index store record update value result error retry limit stream chunk batch delay metric "
+    "report stage profile measure throughput scale design review change release version build"
+).split()
+
+
+# ------------------------------
+# Stand-in servers
+# ------------------------------
+
+def make_paragraphs(rng, words):
+    paragraphs = []
+    while words > 0:
+        n = min(words, rng.randint(40, 120))
+        text = " ".join(rng.choice(WORDS) for _ in range(n))
+        paragraphs.append(text[0].upper() + text[1:] + ".")
+        words -= n
+    return paragraphs
+
+
+def make_page(index, words, js_shell, script_kb, seed):
+    """Builds one article: plain HTML, or a shell whose text only appears after its script runs."""
+    rng = random.Random(seed * 100003 + index)
+    title = f"Benchmark article {index}"
+    paragraphs = make_paragraphs(rng, words)
+    padding = f"<script>var bundle = \"{'x' * (script_kb * 1024)}\";</script>" if script_kb else ""
+    if js_shell:
+        body = json.dumps("".join(f"<p>{p}</p>" for p in paragraphs))
+        return (
+            f"<html><head><title>{title}</title>{padding}</head><body>"
+            f"<div id=\"root\"></div>"
+            f"<script>document.getElementById('root').innerHTML = {body};</script>"
+            f"</body></html>"
+        )
+    article = "".join(
+        (f"<h2>Section {i // 5 + 1}</h2>" if i % 5 == 0 else "") + f"<p>{p}</p>"
+        for i, p in enumerate(paragraphs)
+    )
+    menu = "".join(f"<li><a href=\"/topic/{w}\">{w.title()} news</a></li>" for w in WORDS[:30])
+    related = "".join(f"<li><a href=\"/article/{index + n}.html\">{p[:80]}</a></li>"
+                      for n, p in enumerate(make_paragraphs(rng, 400)))
+    comments = "".join(
+        f"<div class=\"comment\"><span>reader{n}</span><p>{p}</p><button>Reply</button><button>Share</button></div>"
+        for n, p in enumerate(make_paragraphs(rng, words // 4))
+    )
+    return (
+        f"<html><head><title>{title}</title><meta name=\"description\" content=\"{title}\">{padding}</head>"
+        f"<body><div class=\"cookie-banner\">We use cookies to personalise content and ads. "
+        f"<button>Accept all</button></div><header><nav><ul>{menu}</ul></nav></header>"
+        f"<main><article><h1>{title}</h1>{article}</article>"
+        f"<aside class=\"related\"><h3>Related</h3><ul>{related}</ul></aside>"
+        f"<section class=\"comments\"><h3>Comments</h3>{comments}</section></main>"
+        f"<footer>Generated for benchmarking</footer></body></html>"
+    )
+
+
+def site_app(pages, args, stats):
+    recent = collections.defaultdict(collections.deque)   # Host -> request times in the last second
+
+    async def article(request):
+        html = pages.get(request.match_info["name"])
+        if html is None:
+            raise web.HTTPNotFound()
+        if args.site_rps:
+            now = time.monotonic()
+            times = recent[request.host]
+            while times and now - times[0] > 1:
+                times.popleft()
+            if len(times) >= args.site_rps:
+                stats["rate_limited"] += 1
+                return web.Response(status=429, headers={"Retry-After": "1"}, text="Too Many Requests")
+            times.append(now)
+        stats["served"] += 1
+        return web.Response(text=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/article/{name}", article)
+    return app
+
+
+def llm_app(args, stats):
+    slots = asyncio.Semaphore(args.llm_slots)
+
+    async def completions(request):
+        payload = await request.json()
+        prompt_tokens = sum(len(m.get("content", "")) for m in payload.get("messages", [])) // 4
+        stats["requests"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        async with slots:
+            # Queueing for a slot, then time-to-first-token grows with the prompt
+            await asyncio.sleep(args.llm_latency + prompt_tokens / args.llm_prefill_tps)
+            if not payload.get("stream"):
+                await asyncio.sleep(args.llm_tokens / args.llm_tps)
+                text = " ".join(WORDS[i % len(WORDS)] for i in range(args.llm_tokens))
+                return web.json_response({
+                    "choices": [{"message": {"role": "assistant", "content": text}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": args.llm_tokens},
+                })
+
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            started = time.monotonic()
+            for i in range(args.llm_tokens):
+                # Paced against the start so sleep overshoot doesn't accumulate
+                delay = started + i / args.llm_tps - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                event = {"choices": [{"delta": {"content": WORDS[i % len(WORDS)] + " "}}]}
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/v1/chat/completions", completions)
+    return app
+
+
+def telegram_app(args, stats):
+    async def method(request):
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        await asyncio.sleep(args.telegram_latency)
+        name = request.match_info["method"]
+        if name == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif name == "sendMessage":
+            stats["messages"] += 1
+            stats["bytes"] += len(str(params.get("text", "")).encode())
+            result = {
+                "message_id": stats["messages"],
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 1)), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", method)
+    return app
+
+
+async def start_app(app, hosts=1):
+    """Serves the app on 127.0.0.1 (and 127.0.0.2, ... for hosts > 1); returns (runner, base URLs)."""
+    app_runner = web.AppRunner(app, access_log=None)
+    await app_runner.setup()
+    site = web.TCPSite(app_runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    for n in range(2, hosts + 1):
+        await web.TCPSite(app_runner, f"127.0.0.{n}", port).start()
+    return app_runner, [f"http://127.0.0.{n}:{port}" for n in range(1, hosts + 1)]
+
+
+# ------------------------------
+# Runner child process
+# ------------------------------
+
+def run_child(config_path):
+    """Runs one pipeline pass with the runner pointed at the stand-ins; writes a result JSON."""
+    with open(config_path) as f:
+        config = json.load(f)
+    sys.path.insert(0, APP_DIR)
+    import bookmark_store
+    import metrics
+    import runner
+    import telegram_delivery
+    from scrape_cache import ScrapeCache
+    from summary_cache import SummaryCache
+
+    work_dir = config["work_dir"]
+    db_path = os.path.join(work_dir, "bookmarks.db")
+    metrics.METRICS_DIR = os.path.join(work_dir, "metrics")
+    metrics.REPORT_DIR = os.path.join(work_dir, "reports")
+    telegram_delivery.API_URL = config["telegram_url"]
+    telegram_delivery.PRIVATE_CHAT_INTERVAL = config["chat_interval"]
+    runner.BOT_TOKEN = "123456:bench"
+    runner.CHAT_ID = "1"
+    runner.LLM_API_URL = config["llm_url"]
+    runner.BOOKMARK_DB = db_path
+    for name, value in config["runner_settings"].items():
+        setattr(runner, name, value)
+    # Fresh caches, so every bookmark really is fetched and summarized
+    runner._scrape_cache = ScrapeCache(path=os.path.join(work_dir, "scrape_cache.db"))
+    runner._summary_cache = SummaryCache(path=os.path.join(work_dir, "summary_cache.db"))
+
+    bookmark_store.init_db(db_path, os.path.join(work_dir, "bookmarks.txt"))
+    for url in config["urls"]:
+        bookmark_store.add_bookmark(url, db_path=db_path)
+    bookmarks = bookmark_store.pending_bookmarks(db_path=db_path)
+
+    async def run():
+        async with runner.PipelineResources() as resources:
+            return await runner.run_pipeline(bookmarks, resources, limit=config["limit"] or len(bookmarks))
+
+    started = time.perf_counter()
+    delivered = asyncio.run(run())
+    wall = time.perf_counter() - started
+
+    reports = sorted(os.listdir(metrics.REPORT_DIR))
+    with open(os.path.join(metrics.REPORT_DIR, reports[-1])) as f:
+        report = json.load(f)
+    with open(config["result_path"], "w") as f:
+        json.dump({
+            "delivered": delivered,
+            "wall_seconds": wall,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "report": report,
+        }, f)
+
+
+# ------------------------------
+# Driver
+# ------------------------------
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_result(result):
+    """Reduces a child's result to the numbers that are printed and compared."""
+    report = result["report"]
+    stages = {}
+    for span in report["spans"]:
+        stages.setdefault(span["stage"], []).append(span["seconds"])
+    llm_calls = report.get("llm_calls", [])
+    ttfts = [call["ttft"] for call in llm_calls if call.get("ttft") is not None]
+    return {
+        "bookmarks": report.get("bookmarks", 0),
+        "delivered": result["delivered"],
+        "pipeline_seconds": report["seconds"],
+        "wall_seconds": round(result["wall_seconds"], 3),
+        "articles_per_minute": round(60 * result["delivered"] / report["seconds"], 2) if report["seconds"] else 0.0,
+        "peak_rss_mb": round(result["peak_rss_kb"] / 1024, 1),
+        "llm_calls": len(llm_calls),
+        "llm_ttft_p50": round(statistics.median(ttfts), 3) if ttfts else None,
+        "fetch_tiers": {tier: value["count"] for tier, value in report.get("fetch_tiers", {}).items()},
+        "duplicates": report.get("dedupe", {}).get("collapsed", 0),
+        "hosts": report.get("hosts", {}),
+        "prompt_tokens_scraped": sum(page["tokens_in"] for page in report.get("compaction", [])),
+        "prompt_tokens_compacted": sum(page["tokens_out"] for page in report.get("compaction", [])),
+        "stages": {
+            stage: {
+                "count": len(times),
+                "p50": round(statistics.median(times), 4),
+                "p95": round(percentile(times, 95), 4),
+                "max": round(max(times), 4),
+            }
+            for stage, times in sorted(stages.items())
+        },
+    }
+
+
+async def run_benchmark(args, work_dir):
+    pages = {}
+    sizes = [int(size) for size in args.page_words.split(",")]
+    rng = random.Random(args.seed)
+    for i in range(args.bookmarks):
+        js_shell = rng.random() < args.js_fraction
+        pages[f"{i}.html"] = make_page(i, sizes[i % len(sizes)], js_shell, args.script_kb, args.seed)
+    # Extra bookmarks for pages already in the list: alternately the same URL with
+    # tracking parameters and a mirror of the article under another name and title
+    names = list(pages)
+    duplicates = []
+    mirror_of = {}
+    for d in range(int(args.bookmarks * args.duplicate_fraction)):
+        i = rng.randrange(args.bookmarks)
+        if d % 2 == 0:
+            duplicates.append(f"{i}.html?utm_source=newsletter&utm_medium=email")
+        else:
+            html = make_page(i, sizes[i % len(sizes)], False, args.script_kb, args.seed)
+            pages[f"mirror-{d}.html"] = html.replace(f"Benchmark article {i}", f"Syndicated article {i}")
+            mirror_of[f"mirror-{d}.html"] = f"{i}.html"
+            duplicates.append(f"mirror-{d}.html")
+
+    # Bookmarks cluster on a few sites: host k gets a share proportional to 1/(k+1)
+    host_of = {name: rng.choices(range(args.hosts), weights=[1 / (k + 1) for k in range(args.hosts)])[0]
+               for name in names}
+    for name in pages:
+        # A syndicated copy is served by the same site as its original
+        host_of.setdefault(name, host_of[mirror_of[name]] if name in mirror_of else 0)
+
+    llm_stats = {"requests": 0, "prompt_tokens": 0}
+    telegram_stats = {"messages": 0, "bytes": 0}
+    site_stats = {"served": 0, "rate_limited": 0}
+    runners = []
+    try:
+        runners.append(await start_app(site_app(pages, args, site_stats), hosts=args.hosts))
+        for app in (llm_app(args, llm_stats), telegram_app(args, telegram_stats)):
+            runners.append(await start_app(app))
+        (_, site_urls), (_, [llm_url]), (_, [telegram_url]) = runners
+        # Stored grouped by site, the way an archive import arrives
+        urls = sorted(names + duplicates, key=lambda name: host_of[name.split("?")[0]])
+
+        runner_settings = {"SCRAPE_CONCURRENCY": args.scrape_concurrency,
+                           "SUMMARY_CONCURRENCY": args.summary_concurrency,
+                           "DELIVERY_CONCURRENCY": args.delivery_concurrency}
+        config = {
+            "work_dir": work_dir,
+            "result_path": os.path.join(work_dir, "result.json"),
+            "urls": [f"{site_urls[host_of[name.split('?')[0]]]}/article/{name}" for name in urls],
+            "llm_url": f"{llm_url}/v1/chat/completions",
+            "telegram_url": f"{telegram_url}/bot",
+            "chat_interval": args.chat_interval,
+            "limit": args.limit,
+            "runner_settings": {name: value for name, value in runner_settings.items() if value is not None},
+        }
+        config_path = os.path.join(work_dir, "config.json")
+        with open(config_path, "w") as f:
+            json.dump(config, f)
+
+        log_path = os.path.join(work_dir, "runner.log")
+        with open(log_path, "wb") as log:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.abspath(__file__), "--child", config_path,
+                cwd=APP_DIR, stdout=None if args.verbose else log, stderr=asyncio.subprocess.STDOUT,
+            )
+            returncode = await process.wait()
+        if returncode != 0:
+            with open(log_path, errors="replace") as f:
+                tail = f.read()[-4000:]
+            raise SystemExit(f"Runner exited with status {returncode}:\n{tail}")
+    finally:
+        for app_runner, _ in runners:
+            await app_runner.cleanup()
+
+    with open(config["result_path"]) as f:
+        summary = summarize_result(json.load(f))
+    summary["llm_requests"] = llm_stats["requests"]
+    summary["telegram_messages"] = telegram_stats["messages"]
+    summary["site_rate_limited"] = site_stats["rate_limited"]
+    return summary
+
+
+def benchmark_config(args):
+    """The settings a baseline is only comparable under."""
+    return {name: getattr(args, name) for name in (
+        "bookmarks", "limit", "page_words", "js_fraction", "duplicate_fraction", "hosts", "site_rps", "script_kb", "seed", "llm_latency", "llm_prefill_tps",
+        "llm_tps", "llm_tokens", "llm_slots", "telegram_latency", "chat_interval",
+        "scrape_concurrency", "summary_concurrency", "delivery_concurrency",
+    )}
+
+
+def compare(current, baseline, tolerance):
+    """Returns a list of human-readable regressions of current against baseline."""
+    regressions = []
+    old, new = baseline["articles_per_minute"], current["articles_per_minute"]
+    if old and new < old * (1 - tolerance):
+        regressions.append(f"articles/minute {new:.2f} < baseline {old:.2f}")
+    old, new = baseline["peak_rss_mb"], current["peak_rss_mb"]
+    if old and new > old * (1 + tolerance):
+        regressions.append(f"peak RSS {new:.1f} MB > baseline {old:.1f} MB")
+    for stage, stats in current["stages"].items():
+        before = baseline["stages"].get(stage)
+        if before is None or stats["p50"] - before["p50"] < MIN_STAGE_SLOWDOWN:
+            continue
+        if stats["p50"] > before["p50"] * (1 + tolerance):
+            regressions.append(f"{stage} p50 {stats['p50'] * 1000:.1f} ms > baseline {before['p50'] * 1000:.1f} ms")
+    return regressions
+
+
+def print_summary(summary):
+    print(f"{'stage':<12} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for stage, stats in summary["stages"].items():
+        print(f"{stage:<12} {stats['count']:>6} {stats['p50'] * 1000:>10.1f} "
+              f"{stats['p95'] * 1000:>10.1f} {stats['max'] * 1000:>10.1f}")
+    print()
+    print(f"Delivered:        {summary['delivered']}/{summary['bookmarks']} "
+          f"({summary['telegram_messages']} Telegram messages, {summary['llm_requests']} LLM requests)")
+    print(f"Pipeline time:    {summary['pipeline_seconds']:.2f}s ({summary['wall_seconds']:.2f}s with startup)")
+    print(f"Articles/minute:  {summary['articles_per_minute']:.2f}")
+    print(f"Peak RSS:         {summary['peak_rss_mb']:.1f} MB (runner process)")
+    print(f"LLM TTFT p50:     {summary['llm_ttft_p50']}s")
+    print(f"Fetch tiers:      {summary['fetch_tiers']}")
+    print(f"Duplicates:       {summary.get('duplicates', 0)} collapsed before the LLM")
+    print(f"Site 429s:        {summary.get('site_rate_limited', 0)} "
+          f"(hosts paused {summary.get('hosts', {}).get('deferred', 0)} times)")
+    scraped, compacted = summary.get("prompt_tokens_scraped", 0), summary.get("prompt_tokens_compacted", 0)
+    if scraped:
+        print(f"Prompt tokens:    {compacted} of {scraped} scraped ({compacted / scraped:.0%} after compaction)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bookmark pipeline against local stand-ins.")
+    parser.add_argument("--bookmarks", type=int, default=20)
+    parser.add_argument("--limit", type=int, help="articles to deliver (default: every bookmark)")
+    parser.add_argument("--page-words", default="400,1500,6000",
+                        help="comma-separated article lengths in words, cycled over the bookmarks")
+    parser.add_argument("--js-fraction", type=float, default=0.0,
+                        help="share of pages that are client-rendered shells (needs Chromium)")
+    parser.add_argument("--duplicate-fraction", type=float, default=0.0,
+                        help="extra bookmarks (as a fraction of --bookmarks) that repeat a page by URL or content")
+    parser.add_argument("--hosts", type=int, default=1, help="loopback addresses the articles are spread over")
+    parser.add_argument("--site-rps", type=int, default=0,
+                        help="requests per second per host before the site answers 429 (0: no limit)")
+    parser.add_argument("--script-kb", type=int, default=64, help="inline script padding per page")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before prefill starts")
+    parser.add_argument("--llm-prefill-tps", type=float, default=4000, help="prompt tokens processed per second")
+    parser.add_argument("--llm-tps", type=float, default=200, help="generated tokens per second")
+    parser.add_argument("--llm-tokens", type=int, default=120, help="tokens per completion")
+    parser.add_argument("--llm-slots", type=int, default=1, help="completions the fake LLM runs at once")
+    parser.add_argument("--telegram-latency", type=float, default=0.02)
+    parser.add_argument("--chat-interval", type=float, default=0.0,
+                        help="Telegram per-chat pacing; 0 keeps it from masking the other stages")
+    parser.add_argument("--scrape-concurrency", type=int)
+    parser.add_argument("--summary-concurrency", type=int)
+    parser.add_argument("--delivery-concurrency", type=int)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--no-compare", action="store_true", help="only print the numbers; don't need a baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory (DB, reports, log)")
+    parser.add_argument("--verbose", action="store_true", help="show the runner's output")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+    if not (args.save_baseline or args.no_compare or os.path.exists(args.baseline)):
+        # Checked before the run so a missing baseline doesn't cost a full benchmark
+        command = " ".join(["python3 benchmarks/bench_pipeline.py", *sys.argv[1:], "--save-baseline"])
+        sys.exit(f"No baseline at {args.baseline}; record one on this machine first:\n  {command}\n"
+                 "or pass --no-compare to only print the numbers.")
+
+    work_dir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    try:
+        summary = asyncio.run(run_benchmark(args, work_dir))
+    finally:
+        if args.keep:
+            print(f"Scratch directory kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    config = benchmark_config(args)
+    if args.json:
+        print(json.dumps(summary, indent=1))
+    else:
+        print_summary(summary)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "result": summary}, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if args.no_compare:
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["config"] != config:
+        changed = sorted(name for name in config if baseline["config"].get(name) != config[name])
+        print(f"Baseline was recorded with different settings ({', '.join(changed)}); not comparing.")
+        return
+    regressions = compare(summary, baseline["result"], args.tolerance)
+    if regressions:
+        print(f"Regressions against baseline (tolerance {args.tolerance:.0%}):")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions against baseline (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
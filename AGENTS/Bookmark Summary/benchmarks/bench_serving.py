@@ -0,0 +1,136 @@
+# Load benchmark: Werkzeug dev server vs. the gunicorn serving mode.
+#
+# Starts each server on a local port, drives it with a pool of keep-alive
+# HTTP clients and reports requests/s and latency percentiles per path.
+#
+#   python3 benchmarks/bench_serving.py --requests 2000 --concurrency 16 --path / --path /pdf
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "dev": lambda port: [
+        sys.executable, "-c",
+        f"import endpoint; endpoint.app.run(host='127.0.0.1', port={port}, debug=False, use_reloader=False)",
+    ],
+    "gunicorn": lambda port: [sys.executable, "serve.py", "--bind", f"127.0.0.1:{port}"],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(port, path, total_requests, concurrency):
+    """Sends total_requests GETs from `concurrency` keep-alive clients; returns latencies and errors."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [total_requests]
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def bench_server(name, paths, total_requests, concurrency, warmup):
+    port = free_port()
+    process = subprocess.Popen(SERVERS[name](port), cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    results = {}
+    try:
+        wait_for_port(port)
+        for path in paths:
+            run_load(port, path, warmup, min(concurrency, warmup) or 1)
+            latencies, errors, wall = run_load(port, path, total_requests, concurrency)
+            results[path] = {
+                "rps": len(latencies) / wall if wall else 0.0,
+                "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+                "p99_ms": percentile(latencies, 99) * 1000 if latencies else float("nan"),
+                "errors": errors,
+            }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dev server with the gunicorn serving mode.")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per path per server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--path", action="append", dest="paths", help="path to request (repeatable)")
+    parser.add_argument("--server", action="append", dest="servers", choices=sorted(SERVERS))
+    args = parser.parse_args()
+    paths = args.paths or ["/"]
+    servers = args.servers or ["dev", "gunicorn"]
+
+    print(f"{'server':<10} {'path':<20} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for name in servers:
+        for path, result in bench_server(name, paths, args.requests, args.concurrency, args.warmup).items():
+            print(f"{name:<10} {path:<20} {result['rps']:>10.1f} {result['p50_ms']:>10.2f} "
+                  f"{result['p99_ms']:>10.2f} {result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Cold-start benchmark for endpoint.py, based on `python -X importtime`.
+#
+# Imports endpoint in fresh interpreters, takes the median cumulative import
+# time of the `endpoint` module and fails (exit status 1) when it exceeds the
+# budget or when a heavy dependency that only feature code or background
+# scripts should need gets imported at startup. With --features it also
+# times the first and second request to each lazily loaded feature module.
+#
+#   python3 benchmarks/bench_startup.py
+#   python3 benchmarks/bench_startup.py --budget-ms 200 --runs 9 --features
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 250
+# Must never be imported just by starting the web app
+HEAVY_MODULES = ("fitz", "pymupdf", "pytesseract", "PIL", "telegram", "requests", "playwright", "aiohttp", "tiktoken")
+# One path per feature module, requested through Flask's test client
+FEATURE_PATHS = ["/", "/pdf", "/epub", "/transfer", "/jobs", "/metrics"]
+
+FEATURES_SCRIPT = """
+import json, sys, time
+import endpoint
+client = endpoint.app.test_client()
+timings = {}
+for path in sys.argv[1:]:
+    times = []
+    for _ in range(2):
+        started = time.perf_counter()
+        client.get(path)
+        times.append(time.perf_counter() - started)
+    timings[path] = times
+print(json.dumps(timings))
+"""
+
+
+def parse_importtime(stderr):
+    """Returns [(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure_import():
+    """Imports endpoint once in a fresh interpreter; returns (import rows, process wall seconds)."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import endpoint"],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(f"Importing endpoint failed:\n{result.stderr[-4000:]}")
+    return parse_importtime(result.stderr), wall
+
+
+def measure_features(paths):
+    result = subprocess.run(
+        [sys.executable, "-c", FEATURES_SCRIPT, *paths], cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Feature requests failed:\n{result.stderr[-4000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check endpoint.py's cold-start import time against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="heaviest imports to list")
+    parser.add_argument("--features", action="store_true", help="also time the first request to each feature")
+    args = parser.parse_args()
+
+    import_times = []
+    walls = []
+    rows = []
+    for _ in range(args.runs):
+        rows, wall = measure_import()
+        endpoint_row = next(row for row in rows if row[0] == "endpoint")
+        import_times.append(endpoint_row[2] / 1000)
+        walls.append(wall * 1000)
+
+    print(f"{'module':<40} {'self ms':>10} {'cumulative ms':>14}")
+    heaviest = sorted((row for row in rows if row[0] != "endpoint"), key=lambda row: row[2], reverse=True)
+    for name, self_us, cumulative_us, depth in heaviest[:args.top]:
+        print(f"{'  ' * (depth - 1) + name:<40} {self_us / 1000:>10.1f} {cumulative_us / 1000:>14.1f}")
+    print()
+
+    median = statistics.median(import_times)
+    print(f"endpoint import: median {median:.1f} ms, min {min(import_times):.1f} ms over {args.runs} runs")
+    print(f"process start + import: median {statistics.median(walls):.1f} ms")
+
+    if args.features:
+        print()
+        print(f"{'path':<12} {'first ms':>10} {'second ms':>10}")
+        for path, (first, second) in measure_features(FEATURE_PATHS).items():
+            print(f"{path:<12} {first * 1000:>10.1f} {second * 1000:>10.1f}")
+    print()
+
+    loaded = {row[0] for row in rows}
+    heavy = sorted(name for name in HEAVY_MODULES if name in loaded)
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median import time {median:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"OK: within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
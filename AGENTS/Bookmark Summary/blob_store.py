@@ -0,0 +1,203 @@
+# Content-addressed storage for uploaded files.
+#
+# Uploads are written straight from the request body into a temporary file
+# next to the blobs, hashed with SHA-256 as the chunks arrive, and then
+# renamed to blobs/<ab>/<sha256>. The names users see (in transfers/ or
+# pdf_uploads/) are hard links to the blob, so uploading the same bytes again
+# costs no disk, and memory stays flat however large the file is. Removing a
+# name deletes its blob when that was the last link; a full sweep for blobs
+# left behind (e.g. removed within the grace period) runs at most every
+# GC_INTERVAL seconds.
+
+import hashlib
+import os
+import tempfile
+import time
+
+BLOB_DIR = "/home/debian/bookmark_bot/blobs"
+CHUNK_SIZE = 1024 * 1024
+# Unlinked blobs younger than this (or uploaded again since) are kept; another
+# request may be about to link them
+GC_GRACE_SECONDS = 3600
+GC_INTERVAL = 6 * 3600       # Seconds between full sweeps triggered by remove()
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class HashingFile:
+    """Writable temp file that hashes and counts bytes as they are written.
+
+    Also readable and seekable, so werkzeug can use it as an upload stream.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix="upload-", delete=False)
+        self.path = self._file.name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.committed = False
+        self._digest = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {self.max_bytes} byte limit")
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def __getattr__(self, name):
+        # read/readline/seek/tell/flush/close go to the underlying file
+        return getattr(self._file, name)
+
+    def discard(self):
+        """Removes the temp file unless it has been committed to the store."""
+        self._file.close()
+        if not self.committed:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class BlobStore:
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        # One empty file per blob uploaded again, so its grace period restarts
+        # without touching the blob (whose mtime every linked name shares)
+        self.recent_dir = os.path.join(root, "recent")
+        self.gc_marker = os.path.join(root, ".last_gc")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        os.makedirs(self.recent_dir, exist_ok=True)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def open_upload(self, max_bytes=None):
+        """Returns a HashingFile to write an upload into; pass it to commit() when done."""
+        return HashingFile(self.tmp_dir, max_bytes)
+
+    def commit(self, upload):
+        """Moves a finished upload into the store; returns (sha256, size, created).
+
+        When a blob with the same hash already exists the upload is dropped.
+        """
+        upload.flush()
+        upload.close()
+        digest = upload.hexdigest()
+        target = self.blob_path(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.unlink(upload.path)
+            self._mark_recent(digest)  # Restart the GC grace period before it is linked again
+            created = False
+        else:
+            os.replace(upload.path, target)
+            created = True
+        upload.committed = True
+        return digest, upload.size, created
+
+    def save_stream(self, stream, max_bytes=None):
+        """Copies a readable stream into the store in CHUNK_SIZE pieces."""
+        upload = self.open_upload(max_bytes)
+        try:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                upload.write(chunk)
+            return self.commit(upload)
+        finally:
+            upload.discard()
+
+    def _mark_recent(self, digest):
+        marker = os.path.join(self.recent_dir, digest)
+        with open(marker, "a"):
+            os.utime(marker)
+
+    def _unused(self, digest, stat, cutoff):
+        """True if the blob has no names left and neither it nor a re-upload of it is recent."""
+        if stat.st_nlink != 1 or stat.st_mtime >= cutoff:
+            return False
+        try:
+            return os.stat(os.path.join(self.recent_dir, digest)).st_mtime < cutoff
+        except FileNotFoundError:
+            return True
+
+    def link(self, digest, dest_path):
+        """Makes dest_path name the blob, replacing whatever was there."""
+        temp_path = f"{dest_path}.{os.getpid()}.link"
+        os.link(self.blob_path(digest), temp_path)
+        os.replace(temp_path, dest_path)
+
+    def adopt(self, path):
+        """Brings an existing file into the store in place; returns its sha256.
+
+        If the same content is already stored the file becomes a link to that blob.
+        """
+        digest = file_sha256(path)
+        target = self.blob_path(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if not os.path.exists(target):
+            os.link(path, target)
+        elif not os.path.samefile(path, target):
+            self.link(digest, path)
+        return digest
+
+    def remove(self, path, digest=None):
+        """Removes a filename, and its blob if that was the last name linking to it.
+
+        Only this file's blob is checked (it is hashed when digest isn't given);
+        the full store is swept now and then via collect_garbage().
+        """
+        if digest is None and os.stat(path).st_nlink > 1:
+            digest = file_sha256(path)
+        os.remove(path)
+        if digest is not None:
+            target = self.blob_path(digest)
+            try:
+                if self._unused(digest, os.stat(target), time.time() - GC_GRACE_SECONDS):
+                    os.unlink(target)
+            except FileNotFoundError:
+                pass
+        self.collect_garbage_if_due()
+
+    def collect_garbage_if_due(self, interval=GC_INTERVAL):
+        """Runs collect_garbage() when the last sweep (by any process) is older than interval seconds."""
+        try:
+            if os.stat(self.gc_marker).st_mtime > time.time() - interval:
+                return None
+        except FileNotFoundError:
+            pass
+        return self.collect_garbage()
+
+    def collect_garbage(self):
+        """Deletes blobs no filename links to any more; returns how many were removed."""
+        with open(self.gc_marker, "a"):
+            os.utime(self.gc_marker)
+        cutoff = time.time() - GC_GRACE_SECONDS
+        removed = 0
+        for prefix in os.scandir(self.root):
+            if not prefix.is_dir():
+                continue
+            if prefix.path in (self.tmp_dir, self.recent_dir):
+                # Leftovers from uploads whose process died mid-request, and expired re-upload markers
+                for entry in os.scandir(prefix.path):
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                continue
+            for entry in os.scandir(prefix.path):
+                if self._unused(entry.name, entry.stat(), cutoff):
+                    os.unlink(entry.path)
+                    removed += 1
+        return removed
@@ -0,0 +1,166 @@
+# Parsers for bulk bookmark imports.
+#
+# Accepts browser exports in the Netscape bookmark HTML format (Chrome,
+# Firefox, Safari, Edge), plain lists with one URL per line, and JSON:
+# a list of URLs, a list of {"url": ..., "date_added": ...} objects, or a
+# browser's JSON bookmark tree (Chrome's Bookmarks file, Firefox backups).
+# Every parser returns [(url, date_added or None)] for http(s) links only;
+# bookmark_store.add_bookmarks() then dedupes and inserts them in one write.
+#
+#   python3 bookmark_import.py bookmarks.html [more files...]
+
+import argparse
+import json
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+
+import bookmark_store
+
+FORMATS = ("html", "json", "text")
+
+# Chrome stores times as microseconds since 1601-01-01
+_WEBKIT_EPOCH = datetime(1601, 1, 1)
+_URL_KEYS = ("url", "uri", "href")
+_DATE_KEYS = ("date_added", "dateAdded", "add_date", "added", "date")
+
+
+def _is_web_url(url):
+    return url.lower().startswith(("http://", "https://"))
+
+
+def parse_date(value):
+    """Turns an export's timestamp (epoch s/ms/us, WebKit us or ISO text) into DATE_FORMAT."""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).strftime(bookmark_store.DATE_FORMAT)
+        except ValueError:
+            return None
+    try:
+        if number > 1e16:
+            moment = _WEBKIT_EPOCH + timedelta(microseconds=number)
+        elif number > 1e14:
+            moment = datetime.fromtimestamp(number / 1e6)
+        elif number > 1e11:
+            moment = datetime.fromtimestamp(number / 1e3)
+        else:
+            moment = datetime.fromtimestamp(number)
+    except (OverflowError, OSError, ValueError):
+        return None
+    return moment.strftime(bookmark_store.DATE_FORMAT)
+
+
+class _NetscapeParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        attrs = dict(attrs)
+        url = (attrs.get("href") or "").strip()
+        if _is_web_url(url):
+            self.entries.append((url, parse_date(attrs.get("add_date"))))
+
+
+def parse_netscape_html(text):
+    parser = _NetscapeParser()
+    parser.feed(text)
+    parser.close()
+    return parser.entries
+
+
+def parse_url_list(text):
+    """One URL per line; blank lines, #comments and non-http lines are skipped."""
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        # Also reads the old bookmarks.txt format, `url,date_added,too_large`
+        parts = line.rsplit(",", 2)
+        if len(parts) == 3 and parts[2].strip().lower() in ("true", "false"):
+            url, date_added = parts[0], parse_date(parts[1])
+        else:
+            url, date_added = line.split()[0], None
+        if _is_web_url(url):
+            entries.append((url, date_added))
+    return entries
+
+
+def parse_json(text):
+    entries = []
+
+    def walk(node):
+        if isinstance(node, str):
+            if _is_web_url(node.strip()):
+                entries.append((node.strip(), None))
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+        elif isinstance(node, dict):
+            url = next((node[key] for key in _URL_KEYS if isinstance(node.get(key), str)), None)
+            if url is not None and _is_web_url(url.strip()):
+                date = next((node[key] for key in _DATE_KEYS if key in node), None)
+                entries.append((url.strip(), parse_date(date)))
+            for value in node.values():
+                if isinstance(value, (list, dict)):
+                    walk(value)
+
+    walk(json.loads(text))
+    return entries
+
+
+def detect_format(text, filename=None):
+    name = (filename or "").lower()
+    if name.endswith((".html", ".htm")):
+        return "html"
+    if name.endswith(".json"):
+        return "json"
+    head = text.lstrip()[:1024].lower()
+    if head.startswith(("[", "{")):
+        return "json"
+    if head.startswith("<") or "<dl>" in head or "netscape-bookmark-file" in head:
+        return "html"
+    return "text"
+
+
+def parse_bookmarks(text, filename=None, fmt=None):
+    """Parses an import in the given (or detected) format; returns [(url, date_added)].
+
+    Raises ValueError for malformed JSON or an unknown format.
+    """
+    fmt = fmt or detect_format(text, filename)
+    if fmt == "html":
+        return parse_netscape_html(text)
+    if fmt == "json":
+        return parse_json(text)
+    if fmt == "text":
+        return parse_url_list(text)
+    raise ValueError(f"Unknown import format: {fmt}")
+
+
+def decode_upload(data):
+    return data.decode("utf-8-sig", "replace")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import bookmarks into the bookmark store.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--format", choices=FORMATS, help="default: detect from the name and contents")
+    parser.add_argument("--db", default=bookmark_store.DB_FILE)
+    args = parser.parse_args()
+
+    for path in args.files:
+        with open(path, "rb") as f:
+            entries = parse_bookmarks(decode_upload(f.read()), filename=path, fmt=args.format)
+        added, skipped = bookmark_store.add_bookmarks(entries, db_path=args.db)
+        print(f"{path}: {len(entries)} links, {added} added, {skipped} already stored or repeated.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+# SQLite bookmark store shared by endpoint.py and runner.py.
+#
+# Replaces the old bookmarks.txt CSV. The database runs in WAL mode so the
+# Flask process and the runner can read and write at the same time, and every
+# add/remove/status change touches a single indexed row. Each bookmark also
+# stores its url_canon.canonical_url() key, indexed, so the same page saved
+# under another URL is recognised. Uploaded PDFs (the old pdfs.txt) live in
+# the same database, keyed by content hash.
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from url_canon import canonical_url
+
+DB_FILE = "/home/debian/bookmark_bot/bookmarks.db"
+LEGACY_BOOKMARK_FILE = "/home/debian/bookmark_bot/bookmarks.txt"
+LEGACY_PDF_LIST_FILE = "/home/debian/bookmark_bot/pdfs.txt"
+
+# Bookmark statuses
+STATUS_PENDING = "pending"
+STATUS_TOO_LARGE = "too_large"
+STATUS_FAILED = "failed"
+STATUS_DUPLICATE = "duplicate"  # Same page as another bookmark; collapsed by the runner
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Delivered pages are only collapsed against for this long; older ones may have changed
+SEEN_PAGE_TTL_DAYS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookmarks (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    date_added TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    canonical_url TEXT,
+    not_before TEXT,  -- Not picked up again before this time (the site asked us to back off)
+    recheck INTEGER NOT NULL DEFAULT 0  -- Added or requeued by hand: summarize even if the page was delivered before
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bookmarks_url ON bookmarks(url);
+CREATE INDEX IF NOT EXISTS idx_bookmarks_canonical ON bookmarks(canonical_url);
+CREATE INDEX IF NOT EXISTS idx_bookmarks_status ON bookmarks(status, id);
+
+-- Bumped on every change so readers can cheaply tell whether anything moved
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', 0);
+CREATE TRIGGER IF NOT EXISTS bookmarks_version_insert AFTER INSERT ON bookmarks
+BEGIN UPDATE store_meta SET value = value + 1 WHERE key = 'version'; END;
+CREATE TRIGGER IF NOT EXISTS bookmarks_version_update AFTER UPDATE ON bookmarks
+BEGIN UPDATE store_meta SET value = value + 1 WHERE key = 'version'; END;
+CREATE TRIGGER IF NOT EXISTS bookmarks_version_delete AFTER DELETE ON bookmarks
+BEGIN UPDATE store_meta SET value = value + 1 WHERE key = 'version'; END;
+
+-- Pages already summarized and delivered, with a MinHash sketch of their text (see near_dup)
+CREATE TABLE IF NOT EXISTS seen_pages (
+    canonical_url TEXT PRIMARY KEY,
+    sketch BLOB,
+    title TEXT,
+    date_seen TEXT NOT NULL
+);
+
+-- One row per distinct PDF; re-uploading the same bytes finds the existing row
+CREATE TABLE IF NOT EXISTS pdfs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    sha256 TEXT,
+    size INTEGER,
+    date_uploaded TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pdfs_path ON pdfs(path);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pdfs_sha256 ON pdfs(sha256);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('pdf_version', 0);
+CREATE TRIGGER IF NOT EXISTS pdfs_version_insert AFTER INSERT ON pdfs
+BEGIN UPDATE store_meta SET value = value + 1 WHERE key = 'pdf_version'; END;
+CREATE TRIGGER IF NOT EXISTS pdfs_version_update AFTER UPDATE ON pdfs
+BEGIN UPDATE store_meta SET value = value + 1 WHERE key = 'pdf_version'; END;
+CREATE TRIGGER IF NOT EXISTS pdfs_version_delete AFTER DELETE ON pdfs
+BEGIN UPDATE store_meta SET value = value + 1 WHERE key = 'pdf_version'; END;
+"""
+
+# Sort keys accepted by list_bookmarks(), mapped to indexed columns
+SORT_COLUMNS = {
+    "date": "id",
+    "url": "url",
+    "status": "status",
+}
+
+# Sort keys accepted by list_pdfs()
+PDF_SORT_COLUMNS = {
+    "date": "id",
+    "filename": "path",
+}
+
+_local = threading.local()
+
+
+def connect(db_path=None):
+    """Returns this thread's connection to the store, opening it on first use."""
+    db_path = db_path or DB_FILE
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _migrate(conn)
+        conn.executescript(SCHEMA)
+        _backfill_canonical(conn)
+        connections[db_path] = conn
+    return conn
+
+
+def _migrate(conn):
+    """Adds columns introduced after a database was first created."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(bookmarks)")}
+    if columns and "attempts" not in columns:
+        conn.execute("ALTER TABLE bookmarks ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    if columns and "canonical_url" not in columns:
+        conn.execute("ALTER TABLE bookmarks ADD COLUMN canonical_url TEXT")
+    if columns and "not_before" not in columns:
+        conn.execute("ALTER TABLE bookmarks ADD COLUMN not_before TEXT")
+    if columns and "recheck" not in columns:
+        conn.execute("ALTER TABLE bookmarks ADD COLUMN recheck INTEGER NOT NULL DEFAULT 0")
+
+
+def _backfill_canonical(conn):
+    """Fills in canonical keys for rows written before the column existed."""
+    rows = conn.execute("SELECT id, url FROM bookmarks WHERE canonical_url IS NULL").fetchall()
+    if rows:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE bookmarks SET canonical_url = ? WHERE id = ?", [(canonical_url(url), id) for id, url in rows]
+            )
+
+
+def _now():
+    return datetime.now().strftime(DATE_FORMAT)
+
+
+def _to_dict(row):
+    return {
+        "url": row["url"],
+        "date_added": row["date_added"],
+        "status": row["status"],
+    }
+
+
+def init_db(db_path=None, legacy_file=LEGACY_BOOKMARK_FILE):
+    """Creates the schema and performs the one-time import from bookmarks.txt."""
+    conn = connect(db_path)
+    if legacy_file and os.path.exists(legacy_file):
+        # Both processes may get here at once; the import is idempotent and
+        # whoever loses the rename race simply skips it.
+        try:
+            imported = import_text_file(legacy_file, db_path)
+            os.rename(legacy_file, legacy_file + ".imported")
+            print(f"Imported {imported} bookmarks from {legacy_file}.")
+        except FileNotFoundError:
+            pass
+    return conn
+
+
+def import_text_file(file_path, db_path=None):
+    """Imports the old `url,date_added,too_large` format; returns the number of new rows."""
+    rows = []
+    with open(file_path, "r") as file:
+        for line in file:
+            parts = line.strip().split(",")
+            if len(parts) != 3 or not parts[0]:
+                continue
+            url, date_added, too_large = parts
+            status = STATUS_TOO_LARGE if too_large.strip().lower() == "true" else STATUS_PENDING
+            rows.append((url, date_added, status, canonical_url(url)))
+    conn = connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # rowcount, not total_changes: the version triggers' updates would be counted too
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO bookmarks (url, date_added, status, canonical_url) VALUES (?, ?, ?, ?)", rows
+        )
+        return cursor.rowcount
+
+
+def get_bookmarks(db_path=None):
+    """Returns every bookmark in insertion order."""
+    rows = connect(db_path).execute("SELECT url, date_added, status FROM bookmarks ORDER BY id")
+    return [_to_dict(row) for row in rows]
+
+
+def store_version(db_path=None):
+    """Returns a counter that increases on every bookmark change."""
+    row = connect(db_path).execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()
+    return row[0] if row else 0
+
+
+def count_bookmarks(db_path=None):
+    return connect(db_path).execute("SELECT COUNT(*) FROM bookmarks").fetchone()[0]
+
+
+def count_by_status(db_path=None):
+    """Returns {status: count} for every status in use."""
+    rows = connect(db_path).execute("SELECT status, COUNT(*) FROM bookmarks GROUP BY status")
+    return {status: count for status, count in rows}
+
+
+def list_bookmarks(offset=0, limit=100, sort="date", descending=False, db_path=None):
+    """Returns one page of bookmarks with the date already formatted as dd/mm/YYYY."""
+    column = SORT_COLUMNS.get(sort, "id")
+    direction = "DESC" if descending else "ASC"
+    # Secondary sort on id keeps pages stable when the sort column has duplicates
+    query = (
+        "SELECT url, date_added, status, "
+        "COALESCE(strftime('%d/%m/%Y', date_added), date_added) AS date_display "
+        f"FROM bookmarks ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?"
+    )
+    bookmarks = []
+    for row in connect(db_path).execute(query, (limit, offset)):
+        bookmark = _to_dict(row)
+        bookmark["date_display"] = row["date_display"]
+        bookmarks.append(bookmark)
+    return bookmarks
+
+
+def pending_bookmarks(limit=None, db_path=None, retry_delay=None):
+    """Returns bookmarks still waiting to be summarized, oldest first.
+
+    With `retry_delay` (seconds), bookmarks that failed more recently than that are skipped.
+    Bookmarks deferred with defer_bookmark() are skipped until their time has come.
+    `recheck` is True for bookmarks added or requeued by hand (see near_dup.Deduper).
+    """
+    query = "SELECT url, date_added, status, recheck FROM bookmarks WHERE status = ? AND (not_before IS NULL OR not_before <= ?)"
+    params = [STATUS_PENDING, _now()]
+    if retry_delay:
+        cutoff = datetime.fromtimestamp(time.time() - retry_delay).strftime(DATE_FORMAT)
+        query += " AND (attempts = 0 OR updated_at <= ?)"
+        params.append(cutoff)
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return [{**_to_dict(row), "recheck": bool(row["recheck"])} for row in connect(db_path).execute(query, params)]
+
+
+def add_bookmark(url, date_added=None, db_path=None):
+    """Adds a bookmark; returns False if the URL (or another URL for the same page) is stored.
+
+    A page that was delivered before is summarized again: adding it by hand asks for that.
+    """
+    key = canonical_url(url)
+    conn = connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM bookmarks WHERE canonical_url = ?", (key,)).fetchone():
+            return False
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO bookmarks (url, date_added, status, canonical_url, recheck) VALUES (?, ?, ?, ?, 1)",
+            (url, date_added or _now(), STATUS_PENDING, key),
+        )
+        return cursor.rowcount == 1
+
+
+def remove_bookmark(url, db_path=None):
+    """Removes a bookmark; returns False if the URL was not stored."""
+    cursor = connect(db_path).execute("DELETE FROM bookmarks WHERE url = ?", (url,))
+    return cursor.rowcount == 1
+
+
+def add_bookmarks(entries, db_path=None):
+    """Adds many (url, date_added) pairs in a single transaction; returns (added, skipped).
+
+    A URL is skipped when its canonical key matches a stored bookmark or an earlier entry.
+    """
+    now = _now()
+    conn = connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        seen = {key for (key,) in conn.execute("SELECT canonical_url FROM bookmarks")}
+        rows = []
+        total = 0
+        for url, date_added in entries:
+            total += 1
+            key = canonical_url(url)
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append((url, date_added or now, STATUS_PENDING, key))
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO bookmarks (url, date_added, status, canonical_url) VALUES (?, ?, ?, ?)", rows
+        )
+        added = cursor.rowcount if rows else 0
+    return added, total - added
+
+
+def remove_bookmarks(urls, db_path=None):
+    """Removes many bookmarks in a single transaction; returns how many were stored."""
+    conn = connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.executemany("DELETE FROM bookmarks WHERE url = ?", [(url,) for url in urls])
+        return max(cursor.rowcount, 0)
+
+
+def requeue_bookmarks(urls=None, statuses=None, db_path=None):
+    """Puts bookmarks back to pending with a fresh attempt count; returns how many changed.
+
+    Selects the given URLs, every bookmark in one of `statuses`, or both. They
+    are summarized even if they duplicate a delivered page.
+    """
+    now = _now()
+    changed = 0
+    conn = connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        update = (
+            "UPDATE bookmarks SET status = ?, attempts = 0, updated_at = ?, not_before = NULL, recheck = 1 "
+            "WHERE (status != ? OR attempts > 0 OR not_before IS NOT NULL)"
+        )
+        if urls:
+            cursor = conn.executemany(
+                update + " AND url = ?", [(STATUS_PENDING, now, STATUS_PENDING, url) for url in urls]
+            )
+            changed += max(cursor.rowcount, 0)
+        if statuses:
+            placeholders = ", ".join("?" for _ in statuses)
+            cursor = conn.execute(
+                update + f" AND status IN ({placeholders})", (STATUS_PENDING, now, STATUS_PENDING, *statuses)
+            )
+            changed += cursor.rowcount
+    return changed
+
+
+def set_status(url, status, db_path=None):
+    """Updates the status of a single bookmark."""
+    connect(db_path).execute(
+        "UPDATE bookmarks SET status = ?, updated_at = ? WHERE url = ?", (status, _now(), url)
+    )
+
+
+def set_canonical(url, key, db_path=None):
+    """Records a better canonical key for a bookmark, e.g. from the page's <link rel=canonical>."""
+    connect(db_path).execute(
+        "UPDATE bookmarks SET canonical_url = ? WHERE url = ? AND canonical_url IS NOT ?", (key, url, key)
+    )
+
+
+def record_seen_page(key, sketch, title, db_path=None):
+    """Remembers a delivered page so later copies of it can be collapsed."""
+    connect(db_path).execute(
+        "INSERT OR REPLACE INTO seen_pages (canonical_url, sketch, title, date_seen) VALUES (?, ?, ?, ?)",
+        (key, sketch, title, _now()),
+    )
+
+
+def seen_pages(db_path=None, max_age_days=SEEN_PAGE_TTL_DAYS):
+    """Returns [(canonical_url, sketch)] for pages delivered in the last max_age_days."""
+    cutoff = datetime.fromtimestamp(time.time() - max_age_days * 86400).strftime(DATE_FORMAT)
+    return connect(db_path).execute(
+        "SELECT canonical_url, sketch FROM seen_pages WHERE date_seen >= ?", (cutoff,)
+    ).fetchall()
+
+
+def defer_bookmark(url, seconds, db_path=None):
+    """Keeps a pending bookmark out of pending_bookmarks() for `seconds` (e.g. a site's Retry-After)."""
+    not_before = datetime.fromtimestamp(time.time() + seconds).strftime(DATE_FORMAT)
+    connect(db_path).execute("UPDATE bookmarks SET not_before = ? WHERE url = ?", (not_before, url))
+
+
+def seconds_until_next_deferral(db_path=None):
+    """Seconds until the earliest deferred pending bookmark becomes due, or None if there is none."""
+    row = connect(db_path).execute(
+        "SELECT MIN(not_before) FROM bookmarks WHERE status = ? AND not_before > ?", (STATUS_PENDING, _now())
+    ).fetchone()
+    if row[0] is None:
+        return None
+    return max(0.0, datetime.strptime(row[0], DATE_FORMAT).timestamp() - time.time())
+
+
+def record_failure(url, max_attempts, db_path=None):
+    """Counts a failed attempt; the bookmark becomes `failed` after max_attempts."""
+    connect(db_path).execute(
+        "UPDATE bookmarks SET attempts = attempts + 1, updated_at = ?, "
+        "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE status END WHERE url = ?",
+        (_now(), max_attempts, STATUS_FAILED, url),
+    )
+
+
+# ------------------------------
+# PDFs
+# ------------------------------
+
+def _pdf_to_dict(row):
+    return {
+        "path": row["path"],
+        "filename": os.path.basename(row["path"]),
+        "sha256": row["sha256"],
+        "size": row["size"],
+        "date_uploaded": row["date_uploaded"],
+    }
+
+
+def import_pdf_list(file_path, hash_file, db_path=None):
+    """Imports the old `full_path,date_uploaded` pdfs.txt; returns the number of new rows.
+
+    `hash_file(path)` supplies the content hash; entries whose file is gone are skipped.
+    """
+    rows = []
+    with open(file_path, "r") as file:
+        for line in file:
+            parts = line.strip().split(",")
+            if len(parts) < 2 or not os.path.exists(parts[0]):
+                continue
+            rows.append((parts[0], hash_file(parts[0]), os.path.getsize(parts[0]), parts[1]))
+    conn = connect(db_path)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO pdfs (path, sha256, size, date_uploaded) VALUES (?, ?, ?, ?)", rows
+        )
+        return cursor.rowcount
+
+
+def init_pdfs(hash_file, db_path=None, legacy_file=LEGACY_PDF_LIST_FILE):
+    """Performs the one-time import from pdfs.txt, like init_db() does for bookmarks."""
+    connect(db_path)
+    if legacy_file and os.path.exists(legacy_file):
+        try:
+            imported = import_pdf_list(legacy_file, hash_file, db_path)
+            os.rename(legacy_file, legacy_file + ".imported")
+            print(f"Imported {imported} PDFs from {legacy_file}.")
+        except FileNotFoundError:
+            pass
+
+
+def pdf_version(db_path=None):
+    """Returns a counter that increases whenever a PDF is added or removed."""
+    row = connect(db_path).execute("SELECT value FROM store_meta WHERE key = 'pdf_version'").fetchone()
+    return row[0] if row else 0
+
+
+def count_pdfs(db_path=None):
+    return connect(db_path).execute("SELECT COUNT(*) FROM pdfs").fetchone()[0]
+
+
+def list_pdfs(offset=0, limit=100, sort="date", descending=False, db_path=None):
+    column = PDF_SORT_COLUMNS.get(sort, "id")
+    direction = "DESC" if descending else "ASC"
+    query = (
+        "SELECT path, sha256, size, date_uploaded "
+        f"FROM pdfs ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?"
+    )
+    return [_pdf_to_dict(row) for row in connect(db_path).execute(query, (limit, offset))]
+
+
+def find_pdf(sha256, db_path=None):
+    """Returns the PDF with this content hash, or None."""
+    row = connect(db_path).execute(
+        "SELECT path, sha256, size, date_uploaded FROM pdfs WHERE sha256 = ?", (sha256,)
+    ).fetchone()
+    return _pdf_to_dict(row) if row else None
+
+
+def add_pdf(path, sha256, size, date_uploaded=None, db_path=None):
+    """Records an uploaded PDF; returns (pdf, created).
+
+    If the same content is already stored (under any name) that row is returned instead.
+    """
+    existing = find_pdf(sha256, db_path)
+    if existing is not None:
+        return existing, False
+    try:
+        # New content under an existing name replaces that entry, as overwriting the file would
+        connect(db_path).execute(
+            "INSERT INTO pdfs (path, sha256, size, date_uploaded) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET sha256 = excluded.sha256, size = excluded.size, "
+            "date_uploaded = excluded.date_uploaded",
+            (path, sha256, size, date_uploaded or _now()),
+        )
+    except sqlite3.IntegrityError:
+        # The same content was added concurrently
+        return find_pdf(sha256, db_path), False
+    return find_pdf(sha256, db_path), True
+
+
+def remove_pdf(path, db_path=None):
+    """Removes a PDF record; returns False if the path was not stored."""
+    cursor = connect(db_path).execute("DELETE FROM pdfs WHERE path = ?", (path,))
+    return cursor.rowcount == 1
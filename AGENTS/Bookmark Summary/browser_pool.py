@@ -0,0 +1,315 @@
+# Long-lived Chromium pool for the bookmark scraper.
+#
+# One browser process is launched once and a small set of contexts/pages is
+# reused across URLs. Pages are recycled after a fixed number of uses and the
+# whole browser is relaunched when it crashes or grows past a memory ceiling.
+#
+# Only page text is extracted, so a resource policy aborts images, media,
+# fonts, stylesheets and tracker requests, and navigation waits for
+# DOMContentLoaded plus a short network-idle budget instead of the full load.
+# The rendered DOM goes through html_extract too, for the main-content pick.
+
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+import html_extract
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/114.0.0.0 Safari/537.36"
+)
+
+POOL_SIZE = 2                 # Number of reusable contexts/pages
+MAX_PAGES_PER_CONTEXT = 50    # Recycle a context after this many page loads
+MAX_BROWSER_RSS_MB = 1024     # Relaunch the browser above this resident size
+PAGE_TIMEOUT_MS = 30000
+NETWORK_IDLE_BUDGET_MS = 1500 # Extra wait for late XHR-rendered text after DOMContentLoaded
+
+# Requests aborted by the default resource policy
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+TRACKER_DOMAINS = {
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com", "google-analytics.com",
+    "googleadservices.com", "adservice.google.com", "facebook.net", "connect.facebook.net",
+    "scorecardresearch.com", "quantserve.com", "taboola.com", "outbrain.com", "criteo.com",
+    "amazon-adsystem.com", "adnxs.com", "hotjar.com", "segment.io", "segment.com",
+    "chartbeat.com", "newrelic.com", "nr-data.net", "moatads.com", "pubmatic.com",
+    "rubiconproject.com", "openx.net", "casalemedia.com", "bing.com", "clarity.ms",
+}
+
+
+def _descendants_rss_mb(pid):
+    """Returns the resident memory (MB) of every descendant of a process, or 0 if unknown.
+
+    The Playwright driver and Chromium are both children of this Python process,
+    so summing our descendants gives the memory held by the browser stack.
+    """
+    total_kb = 0
+    pids = _children(pid)
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (FileNotFoundError, ProcessLookupError, PermissionError, ValueError):
+            continue
+        pids.extend(_children(current))
+    return total_kb // 1024
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except (FileNotFoundError, PermissionError, ValueError):
+        return []
+
+
+class ResourcePolicy:
+    """Decides which subresource requests are aborted, and counts what got through."""
+
+    def __init__(self, blocked_types=BLOCKED_RESOURCE_TYPES, blocked_domains=TRACKER_DOMAINS):
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = set(blocked_domains)
+        self.requests_blocked = 0
+        self.requests_allowed = 0
+        self.bytes_received = 0
+
+    def is_blocked_host(self, host):
+        parts = host.lower().split(".")
+        return any(".".join(parts[i:]) in self.blocked_domains for i in range(len(parts) - 1))
+
+    def should_block(self, request):
+        if request.is_navigation_request():
+            return False
+        if request.resource_type in self.blocked_types:
+            return True
+        return self.is_blocked_host(urlsplit(request.url).hostname or "")
+
+    async def handle_route(self, route):
+        if self.should_block(route.request):
+            self.requests_blocked += 1
+            await route.abort()
+        else:
+            self.requests_allowed += 1
+            await route.continue_()
+
+    def on_response(self, response):
+        # Content-Length is the compressed size on the wire; chunked responses aren't counted
+        try:
+            self.bytes_received += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+
+class _Slot:
+    """A reusable context/page pair plus its usage counter and the browser launch it belongs to."""
+
+    def __init__(self, generation=0):
+        self.context = None
+        self.page = None
+        self.uses = 0
+        self.generation = generation
+
+    @classmethod
+    async def open(cls, browser, policy=None, generation=0):
+        slot = cls(generation)
+        slot.context = await browser.new_context(user_agent=USER_AGENT)
+        slot.context.set_default_timeout(PAGE_TIMEOUT_MS)
+        if policy is not None:
+            await slot.context.route("**/*", policy.handle_route)
+            slot.context.on("response", policy.on_response)
+        slot.page = await slot.context.new_page()
+        return slot
+
+    async def close(self):
+        if self.context is None:
+            return
+        try:
+            await self.context.close()
+        except PlaywrightError:
+            pass
+
+
+class BrowserPool:
+    """Keeps one Chromium process and POOL_SIZE reusable pages alive between scrapes.
+
+    Up to POOL_SIZE scrapes run concurrently; further callers wait for a free page.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_pages=MAX_PAGES_PER_CONTEXT, max_rss_mb=MAX_BROWSER_RSS_MB,
+                 policy=None, network_idle_ms=NETWORK_IDLE_BUDGET_MS):
+        self.size = size
+        # Pass policy=False to load every resource
+        self.policy = ResourcePolicy() if policy is None else (policy or None)
+        self.network_idle_ms = network_idle_ms
+        self.render_seconds = 0.0
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._playwright = None
+        self._browser = None
+        self._slots = asyncio.LifoQueue()
+        self._lock = asyncio.Lock()
+        # Bumped on every launch; slots from an older browser are dropped, never re-queued
+        self.generation = 0
+        self.pages_served = 0
+        self.restarts = 0
+
+    async def start(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        await self._launch()
+        return self
+
+    async def _launch(self):
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self.generation += 1
+        for _ in range(self.size):
+            self._slots.put_nowait(await self._open_slot())
+
+    async def _open_slot(self):
+        return await _Slot.open(self._browser, self.policy, self.generation)
+
+    def _placeholder(self):
+        """An empty slot that holds the pool size; the next acquire() opens a real page in its place."""
+        slot = _Slot(self.generation)
+        slot.uses = self.max_pages
+        return slot
+
+    async def _drain_slots(self):
+        while True:
+            try:
+                slot = self._slots.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            await slot.close()
+
+    async def restart(self):
+        """Tears down and relaunches the browser, e.g. after a crash or memory ceiling."""
+        async with self._lock:
+            if self.is_healthy():
+                # Another caller already relaunched it while we waited for the lock.
+                return
+            await self._drain_slots()
+            try:
+                await self._browser.close()
+            except PlaywrightError:
+                pass
+            await self._launch()
+            self.restarts += 1
+
+    def is_healthy(self):
+        """Checks the browser is still connected and under the memory ceiling."""
+        if self._browser is None or not self._browser.is_connected():
+            return False
+        if self.max_rss_mb and _descendants_rss_mb(os.getpid()) > self.max_rss_mb:
+            print(f"Browser RSS above {self.max_rss_mb} MB, recycling.")
+            return False
+        return True
+
+    async def acquire(self):
+        """Checks out a page, relaunching the browser first if it is unhealthy."""
+        if not self.is_healthy():
+            await self.restart()
+        slot = await self._slots.get()
+        if slot.uses >= self.max_pages or slot.generation != self.generation:
+            await slot.close()
+            try:
+                slot = await self._open_slot()
+            except BaseException:
+                # Keep the pool size, or enough failures here would leave acquire() waiting forever
+                self._slots.put_nowait(self._placeholder())
+                raise
+        return slot
+
+    async def release(self, slot, broken=False):
+        slot.uses += 1
+        self.pages_served += 1
+        if slot.generation != self.generation:
+            # Checked out across a restart: _launch() already refilled the pool
+            await slot.close()
+            return
+        if broken:
+            await slot.close()
+            try:
+                slot = await self._open_slot()
+            except PlaywrightError:
+                # The browser itself is gone; keep an empty placeholder so the pool
+                # size holds and the next acquire() replaces it after relaunching.
+                slot = self._placeholder()
+        self._slots.put_nowait(slot)
+
+    async def scrape(self, url):
+        """Loads a URL in a pooled page and returns title, meta description, visible text and validators."""
+        slot = await self.acquire()
+        broken = False
+        started = time.monotonic()
+        try:
+            page = slot.page
+            response = await page.goto(url, wait_until="domcontentloaded")
+            if self.network_idle_ms:
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=self.network_idle_ms)
+                except PlaywrightTimeoutError:
+                    pass  # Pages with polling/ads never go idle; take what has rendered
+            await page.wait_for_selector("body")
+            headers = response.headers if response is not None else {}
+            rendered = await page.content()
+            data = {
+                "title": await page.title(),
+                "meta_description": await page.evaluate("() => document.querySelector('meta[name=\"description\"]')?.content || 'No Description'"),
+                "content": await page.evaluate("() => document.body.innerText"),
+                "canonical_url": await page.evaluate("() => document.querySelector('link[rel=\"canonical\"]')?.href || null"),
+                # Validators for conditional re-fetches by the scrape cache
+                "etag": headers.get("etag"),
+                "last_modified": headers.get("last-modified"),
+                # Lets the fetcher spot rate limiting (429 / Retry-After)
+                "status": response.status if response is not None else None,
+                "retry_after": headers.get("retry-after"),
+            }
+        except PlaywrightError:
+            broken = True
+            raise
+        finally:
+            self.render_seconds += time.monotonic() - started
+            await self.release(slot, broken=broken)
+        # Parsed in a thread, after the page is back in the pool, so other scrapes keep running
+        data["main_content"] = (await asyncio.to_thread(html_extract.extract, rendered))["main_content"]
+        return data
+
+    def stats(self):
+        stats = {
+            "pages_served": self.pages_served,
+            "restarts": self.restarts,
+            "render_seconds": round(self.render_seconds, 2),
+        }
+        if self.policy is not None:
+            stats.update({
+                "requests_blocked": self.policy.requests_blocked,
+                "requests_allowed": self.policy.requests_allowed,
+                "bytes_received": self.policy.bytes_received,
+            })
+        return stats
+
+    async def close(self):
+        await self._drain_slots()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except PlaywrightError:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,119 @@
+# Map-reduce summarization for pages that don't fit in one LLM context.
+#
+# Content is split on paragraph/heading boundaries into chunks that fit a
+# token budget, the chunks are summarized concurrently, and the partial
+# summaries are merged in rounds until a single summary remains.
+
+import asyncio
+import re
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its BPE file can't be fetched
+    _encoding = None
+
+CHUNK_TOKENS = 6000          # Max tokens of page text per map request
+REDUCE_INPUT_TOKENS = 6000   # Max tokens of partial summaries per reduce request
+MAP_CONCURRENCY = 4          # Chunk summaries in flight at once
+
+CHUNK_PROMPT = (
+    "You are summarizing one section of a longer webpage. Summarize this section, "
+    "keeping the key facts, names and numbers. Ensure all responses are in English."
+)
+REDUCE_PROMPT = (
+    "Below are summaries of consecutive sections of one webpage. Combine them into a "
+    "single coherent summary of the whole page. Ensure all responses are in English."
+)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text):
+    """Counts tokens with tiktoken when available, otherwise a word/punctuation estimate."""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # BPE tokenizers average ~1.3 tokens per English word
+    return int(len(_TOKEN_RE.findall(text)) * 1.3) + 1
+
+
+def _looks_like_heading(line):
+    line = line.strip()
+    return 0 < len(line) < 80 and not line.endswith((".", ",", ";", ":", "!", "?"))
+
+
+def _split_oversized(block, budget):
+    """Splits a single paragraph that is over budget on sentences, then on words."""
+    pieces, current, current_tokens = [], [], 0
+    for sentence in _SENTENCE_RE.split(block):
+        tokens = count_tokens(sentence)
+        if tokens > budget:
+            words = sentence.split()
+            step = max(1, int(len(words) * budget / tokens))
+            pieces.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+            continue
+        if current and current_tokens + tokens > budget:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_into_chunks(text, budget=CHUNK_TOKENS):
+    """Packs paragraphs into chunks of at most `budget` tokens.
+
+    A new chunk is started early at a heading once the current one is half full,
+    so sections tend to stay together.
+    """
+    blocks = [b.strip() for b in re.split(r"\n\s*\n|\n(?=\S)", text) if b.strip()]
+    chunks, current, current_tokens = [], [], 0
+    for block in blocks:
+        tokens = count_tokens(block)
+        parts = [block] if tokens <= budget else _split_oversized(block, budget)
+        for part in parts:
+            part_tokens = tokens if len(parts) == 1 else count_tokens(part)
+            full = current_tokens + part_tokens > budget
+            section_break = _looks_like_heading(part) and current_tokens > budget // 2
+            if current and (full or section_break):
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+async def map_reduce_summary(complete, title, content, chunk_tokens=CHUNK_TOKENS,
+                             reduce_tokens=REDUCE_INPUT_TOKENS, concurrency=MAP_CONCURRENCY):
+    """Summarizes long content via `complete(system_prompt, user_content) -> str`.
+
+    Raises whatever `complete` raises, so one failed chunk fails the whole summary.
+    """
+    chunks = split_into_chunks(content, chunk_tokens)
+    print(f"Summarizing {title!r} in {len(chunks)} chunks.")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(system_prompt, user_content):
+        async with semaphore:
+            return await complete(system_prompt, user_content)
+
+    partials = await asyncio.gather(*(
+        run(CHUNK_PROMPT, f"Title: {title}\n\nSection {i + 1} of {len(chunks)}:\n\n{chunk}")
+        for i, chunk in enumerate(chunks)
+    ))
+
+    # Reduce hierarchically: merge as many partials as fit per request, repeat
+    while len(partials) > 1:
+        groups = split_into_chunks("\n\n".join(partials), reduce_tokens)
+        if len(groups) >= len(partials):
+            # Partials are individually too big to combine; pair them up regardless
+            groups = ["\n\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+        partials = await asyncio.gather(*(
+            run(REDUCE_PROMPT, f"Title: {title}\n\n{group}") for group in groups
+        ))
+    return partials[0]
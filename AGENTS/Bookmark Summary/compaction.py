@@ -0,0 +1,100 @@
+# Prompt compaction between scraping and the LLM.
+#
+# Scrapers return the whole visible page. Before it is summarized the text is
+# cut down to what the model needs:
+#   1. the main content picked by html_extract (DOM text density) when the
+#      fetch tier provided one, otherwise the full page text;
+#   2. lines repeated within the page (share/reply buttons, "Advertisement",
+#      per-comment bylines, repeated headers) are kept once or, when short and
+#      frequent, dropped;
+#   3. whitespace is collapsed;
+#   4. a hard token cap keeps the head and the tail of what is left, since
+#      articles front-load the story and end with the conclusion.
+#
+# The cap is only a ceiling for runaway pages. Long articles are summarized
+# by chunker's map-reduce, which already keeps every request within
+# CHUNK_TOKENS, so the cap is set to many rounds of map requests; cutting
+# to a single prompt's size here would drop the middle of every long article.
+
+import re
+
+from chunker import CHUNK_TOKENS, MAP_CONCURRENCY, count_tokens
+
+MAX_PROMPT_TOKENS = CHUNK_TOKENS * MAP_CONCURRENCY * 4   # 96k tokens: 16 map chunks, 4 concurrent rounds
+HEAD_SHARE = 0.75             # Share of the cap kept from the start of the page
+SHORT_LINE_CHARS = 40         # Repeated lines up to this long are UI text, not content
+SHORT_LINE_REPEATS = 3        # ...and are dropped entirely once they appear this often
+OMISSION_MARKER = "[... {tokens} tokens omitted ...]"
+
+_SPACE_RE = re.compile(r"[ \t\r\f\v\xa0\u200b]+")
+
+
+def collapse_whitespace(text):
+    lines = (_SPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def drop_repeated_lines(text):
+    """Keeps the first copy of each repeated line and drops short lines that repeat often."""
+    lines = text.split("\n")
+    counts = {}
+    for line in lines:
+        key = line.casefold()
+        counts[key] = counts.get(key, 0) + 1
+    seen = set()
+    kept = []
+    for line in lines:
+        key = line.casefold()
+        if key in seen:
+            continue
+        if counts[key] >= SHORT_LINE_REPEATS and len(line) <= SHORT_LINE_CHARS:
+            continue
+        seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def cap_tokens(text, max_tokens=MAX_PROMPT_TOKENS, head_share=HEAD_SHARE):
+    """Cuts text to max_tokens by whole lines, keeping the head and tail around an omission marker."""
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    lines = text.split("\n")
+    tokens = [count_tokens(line) for line in lines]
+    budget = max_tokens - count_tokens(OMISSION_MARKER.format(tokens=total))
+
+    head, used = [], 0
+    for line, n in zip(lines, tokens):
+        if used + n > budget * head_share:
+            if not head:
+                # A single huge first line: keep a proportional prefix of it
+                head.append(line[:int(len(line) * budget * head_share / n)])
+                used += int(budget * head_share)
+            break
+        head.append(line)
+        used += n
+    tail, tail_used = [], 0
+    for line, n in zip(reversed(lines[len(head):]), reversed(tokens[len(head):])):
+        if used + tail_used + n > budget:
+            break
+        tail.append(line)
+        tail_used += n
+    tail.reverse()
+    omitted = total - used - tail_used
+    return "\n".join(head + [OMISSION_MARKER.format(tokens=omitted)] + tail)
+
+
+def compact(data, max_tokens=MAX_PROMPT_TOKENS):
+    """Returns (prompt text, stats) for a scraped page; stats has tokens_in, tokens_out and ratio."""
+    raw = data["content"]
+    tokens_in = count_tokens(raw)
+    text = collapse_whitespace(data.get("main_content") or raw)
+    text = drop_repeated_lines(text)
+    text = cap_tokens(text, max_tokens)
+    tokens_out = count_tokens(text)
+    return text, {
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "ratio": round(tokens_out / tokens_in, 3) if tokens_in else 1.0,
+        "main_content": bool(data.get("main_content")),
+    }
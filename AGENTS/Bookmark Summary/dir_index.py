@@ -0,0 +1,116 @@
+# Cached, sorted listings of the transfer and EPUB folders.
+#
+# The directory is scanned once with os.scandir (name, size, mtime) and kept
+# in memory pre-sorted by every sort key, so a listing page is a slice rather
+# than a scan. The index is rebuilt only after the folder changes: inotify
+# (via the optional inotify_simple package) marks it dirty, and without
+# inotify a single stat of the directory's mtime is checked per request.
+
+import os
+import threading
+import zlib
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+SORT_KEYS = {
+    "name": lambda entry: entry["name"].lower(),
+    "size": lambda entry: entry["size"],
+    "date": lambda entry: entry["mtime"],
+}
+
+
+class DirectoryIndex:
+    def __init__(self, path, include=None, use_inotify=True):
+        self.path = path
+        self.include = include or (lambda name: True)
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._sorted = None
+        self._version = None
+        self._dir_mtime = None
+        self._dirty = True
+        self._inotify = None
+        if use_inotify and INotify is not None:
+            try:
+                self._inotify = INotify()
+                self._inotify.add_watch(
+                    path,
+                    flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO
+                    | flags.CLOSE_WRITE | flags.ATTRIB,
+                )
+                threading.Thread(target=self._watch, name=f"dir-index-{os.path.basename(path)}", daemon=True).start()
+            except OSError as e:
+                print(f"inotify unavailable for {path} ({e}); checking the directory mtime instead.")
+                self._inotify = None
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify is not None else "mtime"
+
+    def _watch(self):
+        while True:
+            try:
+                events = self._inotify.read()
+            except (OSError, ValueError):
+                return  # Closed
+            if events:
+                self._dirty = True
+
+    def _stale(self):
+        if self._sorted is None:
+            return True
+        if self._inotify is not None:
+            return self._dirty
+        return os.stat(self.path).st_mtime_ns != self._dir_mtime
+
+    def _rebuild(self):
+        # Cleared before scanning so changes made during the scan trigger another rebuild
+        self._dirty = False
+        self._dir_mtime = os.stat(self.path).st_mtime_ns
+        entries = []
+        with os.scandir(self.path) as scan:
+            for entry in scan:
+                if not entry.is_file() or not self.include(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append({"name": entry.name, "size": stat.st_size, "mtime": stat.st_mtime})
+        self._sorted = {key: sorted(entries, key=sort_key) for key, sort_key in SORT_KEYS.items()}
+        # Derived from the contents so every worker process computes the same value
+        names = "\0".join(entry["name"] for entry in self._sorted["name"]).encode("utf-8", "surrogateescape")
+        self._version = "{:x}-{:x}-{:x}-{:x}".format(
+            len(entries), zlib.crc32(names), sum(entry["size"] for entry in entries),
+            int(max((entry["mtime"] for entry in entries), default=0) * 1000),
+        )
+        self.rebuilds += 1
+
+    def _current(self):
+        with self._lock:
+            if self._stale():
+                self._rebuild()
+            return self._sorted, self._version
+
+    def version(self):
+        """Returns a string that changes whenever the listing does."""
+        return self._current()[1]
+
+    def list(self, offset=0, limit=50, sort="name", descending=False, query=None):
+        """Returns (page of entries, total matching) without touching the disk."""
+        ordered = self._current()[0][sort if sort in SORT_KEYS else "name"]
+        if query:
+            needle = query.lower()
+            ordered = [entry for entry in ordered if needle in entry["name"].lower()]
+        total = len(ordered)
+        if descending:
+            end = max(0, total - offset)
+            return ordered[max(0, end - limit):end][::-1], total
+        return ordered[offset:offset + limit], total
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
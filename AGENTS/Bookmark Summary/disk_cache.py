@@ -0,0 +1,132 @@
+# Small persistent key/value cache used by the scraper and summarizer.
+#
+# Values are JSON-serialisable dicts stored zlib-compressed in an SQLite file.
+# The cache keeps to a byte budget by evicting the least recently used entries
+# and counts hits/misses so runs can report how well it is doing.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from metrics import registry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+"""
+
+
+class DiskCache:
+    """Compressed, size-bounded LRU cache on disk."""
+
+    def __init__(self, path, max_bytes, compress_level=6):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Running size estimate; other processes may write too, so the real
+        # total is recomputed before anything is evicted.
+        self._total = self._sum_sizes()
+
+    def _sum_sizes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """Returns the stored dict (with `created_at`) or None, refreshing its LRU position."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                registry.inc("cache_lookups_total", cache=self.name, result="miss")
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        registry.inc("cache_lookups_total", cache=self.name, result="hit")
+        value = json.loads(zlib.decompress(row[0]))
+        value["created_at"] = row[1]
+        return value
+
+    def set(self, key, value):
+        """Stores a dict under key, evicting old entries if the budget is exceeded."""
+        blob = zlib.compress(json.dumps(value).encode("utf-8"), self.compress_level)
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._total += len(blob) - (old[0] if old else 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict()
+
+    def touch(self, key):
+        """Marks an entry as freshly validated without rewriting its value."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET created_at = ?, last_access = ? WHERE key = ?", (now, now, key)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        self._total = self._sum_sizes()
+        if self._total <= self.max_bytes:
+            return
+        # Evict down to a low-water mark so the next few inserts don't rescan.
+        excess = self._total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+        self._total -= freed
+
+    def total_bytes(self):
+        with self._lock:
+            return self._sum_sizes()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,132 @@
+# Tiered page fetcher: scrape cache, then plain HTTP, then headless Chromium.
+#
+# Most bookmarks are static pages whose text is already in the HTML, so a
+# pooled GET plus html_extract is tried first. The browser is only used when
+# the response looks like a JavaScript-rendered shell (almost no text, a
+# noscript wall, an empty app root) or isn't HTML at all.
+#
+# A 429 (or a 503 with Retry-After) from either tier raises HostBusy instead,
+# so the host scheduler can pause that host and retry the page later.
+
+import asyncio
+import re
+from urllib.parse import urljoin
+
+import aiohttp
+
+import html_extract
+from browser_pool import USER_AGENT
+from host_scheduler import HostBusy, parse_retry_after
+from metrics import registry, span
+
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=20, sock_connect=5)
+MAX_HTML_BYTES = 5 * 1024 * 1024
+MIN_TEXT_CHARS = 400          # Less visible text than this means "probably rendered by JS"
+MIN_TEXT_RATIO = 0.02         # Visible text / HTML size below this on large pages is suspicious
+
+_JS_WALL_RE = re.compile(r"enable javascript|javascript is (disabled|required)|requires javascript", re.I)
+_APP_ROOT_RE = re.compile(
+    r"<(div|main)[^>]+id=[\"'](root|app|__next|__nuxt|svelte|ember-app)[\"'][^>]*>\s*</\1>", re.I
+)
+
+TIER_CACHE = "cache"
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+
+
+def check_busy(url, status, retry_after):
+    """Raises HostBusy for rate-limit responses."""
+    if status == 429 or (status == 503 and retry_after):
+        raise HostBusy(url, status, parse_retry_after(retry_after))
+
+
+def looks_like_js_shell(html, extracted):
+    """Heuristic for pages whose real content only appears after client-side rendering."""
+    text = extracted["content"]
+    if len(text) < MIN_TEXT_CHARS:
+        return True
+    if _JS_WALL_RE.search(extracted.get("noscript", "")) and len(text) < MIN_TEXT_CHARS * 4:
+        return True
+    if _APP_ROOT_RE.search(html) and len(text) < MIN_TEXT_CHARS * 4:
+        return True
+    if len(html) > 200_000 and len(text) / len(html) < MIN_TEXT_RATIO:
+        return True
+    return False
+
+
+async def read_limited(response, limit):
+    """Reads the body up to limit bytes (a single read() only returns what is buffered)."""
+    body = bytearray()
+    while len(body) < limit:
+        chunk = await response.content.read(limit - len(body))
+        if not chunk:
+            break
+        body += chunk
+    return bytes(body)
+
+
+class Fetcher:
+    def __init__(self, session, get_browser_pool, scrape_cache):
+        self.session = session
+        self.get_browser_pool = get_browser_pool
+        self.cache = scrape_cache
+        self.counts = {TIER_CACHE: 0, TIER_HTTP: 0, TIER_BROWSER: 0}
+
+    async def fetch(self, url):
+        """Returns title, meta_description and content for a URL using the cheapest tier that works."""
+        entry = self.cache.get(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            return self._count(TIER_CACHE, entry)
+
+        headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"}
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
+
+        data = None
+        try:
+            async with self.session.get(url, headers=headers, timeout=HTTP_TIMEOUT, allow_redirects=True) as response:
+                if response.status == 304 and entry is not None:
+                    self.cache.mark_revalidated(url)
+                    return self._count(TIER_CACHE, entry)
+                check_busy(url, response.status, response.headers.get("Retry-After"))
+                if entry is not None and response.status == 200:
+                    self.cache.mark_changed()
+                content_type = response.headers.get("Content-Type", "")
+                if response.status == 200 and "html" in content_type:
+                    body = await read_limited(response, MAX_HTML_BYTES)
+                    html = body.decode(response.charset or "utf-8", "replace")
+                    with span("extract", url=url):
+                        extracted = await asyncio.to_thread(html_extract.extract, html)
+                    if not looks_like_js_shell(html, extracted):
+                        data = {
+                            "title": extracted["title"] or url,
+                            "meta_description": extracted["meta_description"],
+                            "content": extracted["content"],
+                            "main_content": extracted["main_content"],
+                            "canonical_url": urljoin(str(response.url), extracted["canonical"]) if extracted["canonical"] else None,
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                        }
+        except (aiohttp.ClientError, asyncio.TimeoutError, LookupError) as e:
+            print(f"HTTP fast path failed for {url}: {e}")
+
+        if data is not None:
+            self.cache.put(url, data, etag=data["etag"], last_modified=data["last_modified"])
+            return self._count(TIER_HTTP, data)
+
+        print(f"Rendering with Chromium: {url}")
+        pool = await self.get_browser_pool()
+        with span("browser", url=url):
+            data = await pool.scrape(url)
+        check_busy(url, data.get("status"), data.get("retry_after"))
+        self.cache.put(url, data, etag=data.get("etag"), last_modified=data.get("last_modified"))
+        return self._count(TIER_BROWSER, data)
+
+    def _count(self, tier, data):
+        self.counts[tier] += 1
+        registry.inc("fetch_tier_total", tier=tier)
+        return data
+
+    def stats(self):
+        total = sum(self.counts.values())
+        return {tier: {"count": n, "share": n / total if total else 0.0} for tier, n in self.counts.items()}
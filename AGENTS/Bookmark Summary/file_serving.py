@@ -0,0 +1,128 @@
+# Range-aware, zero-copy file responses for downloads and PDF viewing.
+#
+# Supports conditional GETs (ETag / If-Modified-Since -> 304) and single
+# byte ranges (Range / If-Range -> 206), so downloads resume and PDF viewers
+# can fetch just the pages they jump to. The body is handed to the server
+# as a wsgi.file_wrapper positioned at the start of the range; gunicorn
+# sends that with os.sendfile, straight from the page cache to the socket.
+# Behind nginx/Apache, set SENDFILE_HEADER and the proxy serves the file.
+
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import Response, abort, request
+from werkzeug.http import http_date
+from werkzeug.security import safe_join
+
+# "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache, lighttpd) to let a front proxy send files
+SENDFILE_HEADER = None
+# For X-Accel-Redirect: served directory -> nginx `internal` location mapped onto it
+ACCEL_LOCATIONS = {}
+CHUNK_SIZE = 256 * 1024    # Read size when the server can't sendfile
+
+
+class _FileRange:
+    """Iterates exactly `length` bytes of a file from its current position."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def __iter__(self):
+        while self.remaining > 0:
+            data = self.file.read(min(CHUNK_SIZE, self.remaining))
+            if not data:
+                break
+            self.remaining -= len(data)
+            yield data
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    # Blobs are content-addressed, so inode + size + mtime identifies the content
+    return f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def content_disposition(filename):
+    ascii_name = filename.encode("ascii", "ignore").decode("ascii").replace('"', "") or "download"
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def _not_modified(etag, mtime):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and int(mtime) <= since.timestamp()
+
+
+def _requested_range(etag, mtime, size):
+    """Returns (start, stop) for a satisfiable single range, None to send it all, or False for 416."""
+    byte_range = request.range
+    if byte_range is None or request.method not in ("GET", "HEAD"):
+        return None
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None and int(mtime) > if_range.date.timestamp():
+        return None
+    if len(byte_range.ranges) != 1:
+        # Multipart ranges aren't worth it here; the whole file is a valid answer
+        return None
+    bounds = byte_range.range_for_length(size)
+    return bounds if bounds is not None else False
+
+
+def serve_file(directory, filename, as_attachment=False, mimetype=None):
+    """Returns a response for directory/filename honouring Range and conditional headers."""
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    stat = os.stat(path)
+    etag = file_etag(stat)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{etag}"',
+        "Last-Modified": http_date(stat.st_mtime),
+        "Content-Type": mimetype or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+    }
+    if as_attachment:
+        headers["Content-Disposition"] = content_disposition(filename)
+
+    if _not_modified(etag, stat.st_mtime):
+        return Response(status=304, headers=headers)
+
+    if SENDFILE_HEADER == "X-Accel-Redirect":
+        location = ACCEL_LOCATIONS.get(os.path.abspath(directory))
+        if location is not None:
+            headers[SENDFILE_HEADER] = f"{location.rstrip('/')}/{quote(os.path.relpath(path, directory))}"
+            return Response(status=200, headers=headers)
+    elif SENDFILE_HEADER == "X-Sendfile":
+        headers[SENDFILE_HEADER] = path
+        return Response(status=200, headers=headers)
+
+    bounds = _requested_range(etag, stat.st_mtime, stat.st_size)
+    if bounds is False:
+        headers["Content-Range"] = f"bytes */{stat.st_size}"
+        return Response(status=416, headers=headers)
+    start, stop = bounds or (0, stat.st_size)
+    status = 206 if bounds else 200
+    if bounds:
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{stat.st_size}"
+    headers["Content-Length"] = str(stop - start)
+    if request.method == "HEAD":
+        return Response(status=status, headers=headers)
+
+    file = open(path, "rb")
+    file.seek(start)
+    file_wrapper = request.environ.get("wsgi.file_wrapper")
+    # gunicorn's wrapper sendfiles exactly Content-Length bytes from the current offset;
+    # other servers' wrappers read to EOF, so they only get whole-file tails.
+    if file_wrapper is not None and ("gunicorn.socket" in request.environ or stop == stat.st_size):
+        body = file_wrapper(file, CHUNK_SIZE)
+    else:
+        body = _FileRange(file, stop - start)
+    return Response(body, status=status, headers=headers, direct_passthrough=True)
@@ -0,0 +1,219 @@
+# Host-aware scheduling of page fetches for the runner's scrape stage.
+#
+# Bookmarks cluster on a few sites (a blog archive can be hundreds of links),
+# and fetching them back to back gets the bot 429s and CAPTCHA walls. The
+# scheduler stands in for the scrape queue and hands bookmarks to the scrape
+# workers host by host:
+#   - at most HOST_CONCURRENCY fetches run against one host at a time;
+#   - each host has a token bucket (HOST_RATE requests/s, HOST_BURST burst),
+#     so requests to it are spaced out politely;
+#   - a 429/503 with Retry-After puts the bookmark back and pauses the host,
+#     which then restarts with one request and no further bursts;
+#     pauses longer than MAX_RETRY_WAIT close the host for the rest of the run;
+#   - ready hosts are served round-robin, so a throttled host never holds up
+#     bookmarks for other sites.
+
+import asyncio
+import collections
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+HOST_CONCURRENCY = 2          # Fetches in flight per host
+HOST_RATE = 1.0               # Sustained requests per second per host
+HOST_BURST = 3                # Requests a quiet host may get back to back
+DEFAULT_RETRY_AFTER = 30      # Pause when a 429/503 names no Retry-After
+MAX_RETRY_WAIT = 120          # Longer pauses leave the host's bookmarks for the next run
+MAX_DEFERRALS = 3             # Busy responses per bookmark before it's left for the next run
+
+
+class HostBusy(Exception):
+    """The host answered 429/503; retry_after is the pause it asked for, in seconds."""
+
+    def __init__(self, url, status, retry_after):
+        super().__init__(f"HTTP {status} from {host_key(url)}, retry after {retry_after:.0f}s")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value, default=DEFAULT_RETRY_AFTER):
+    """Seconds to wait for a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def host_key(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def interleave_by_host(bookmarks):
+    """Reorders bookmarks round-robin across hosts, keeping each host's own order."""
+    by_host = collections.OrderedDict()
+    for bookmark in bookmarks:
+        by_host.setdefault(host_key(bookmark["url"]), collections.deque()).append(bookmark)
+    ordered = []
+    while by_host:
+        for host in list(by_host):
+            queue = by_host[host]
+            ordered.append(queue.popleft())
+            if not queue:
+                del by_host[host]
+    return ordered
+
+
+class _Host:
+    __slots__ = ("pending", "active", "burst", "tokens", "refilled", "paused_until", "closed")
+
+    def __init__(self, burst):
+        self.pending = collections.deque()
+        self.active = 0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+        self.closed = False
+
+
+class HostScheduler:
+    """An asyncio.Queue-like scrape queue (put/get/task_done/join/qsize) that paces hosts.
+
+    Workers call get() for the next bookmark whose host is ready, then
+    task_done(bookmark) when its fetch is over. defer() returns a bookmark
+    whose host said it was busy.
+    """
+
+    def __init__(self, maxsize=0, concurrency=HOST_CONCURRENCY, rate=HOST_RATE, burst=HOST_BURST):
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self._hosts = collections.OrderedDict()
+        self._pending = 0
+        self._unfinished = 0
+        self._deferrals = {}
+        # Set on every state change; waiters re-check and clear it (single-threaded, no lock needed)
+        self._changed = asyncio.Event()
+        self.deferred = 0
+
+    def _host(self, url):
+        key = host_key(url)
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = _Host(self.burst)
+        return host
+
+    def _refill(self, host, now):
+        if now > host.refilled:
+            host.tokens = min(host.burst, host.tokens + (now - host.refilled) * self.rate)
+            host.refilled = now
+
+    def _next_ready(self, now):
+        """Pops the next bookmark from the first ready host, rotating it to the back; else (None, wait)."""
+        wait = None
+        for key in list(self._hosts):
+            host = self._hosts[key]
+            if not host.pending:
+                continue
+            if host.closed:
+                ready_in = 0.0
+            elif host.active >= self.concurrency:
+                continue  # Becomes ready on task_done(), which notifies
+            else:
+                self._refill(host, now)
+                ready_in = max(host.paused_until - now, (1 - host.tokens) / self.rate if host.tokens < 1 else 0.0)
+            if ready_in > 0:
+                wait = ready_in if wait is None else min(wait, ready_in)
+                continue
+            self._hosts.move_to_end(key)
+            if not host.closed:
+                host.tokens -= 1
+            host.active += 1
+            self._pending -= 1
+            return host.pending.popleft(), None
+        return None, wait
+
+    async def _wait(self, timeout=None):
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def put(self, bookmark):
+        while self.maxsize and self._pending >= self.maxsize:
+            await self._wait()
+        self._host(bookmark["url"]).pending.append(bookmark)
+        self._pending += 1
+        self._unfinished += 1
+        self._changed.set()
+
+    async def get(self):
+        while True:
+            bookmark, wait = self._next_ready(time.monotonic())
+            if bookmark is not None:
+                self._changed.set()
+                return bookmark
+            await self._wait(wait)
+
+    def task_done(self, bookmark):
+        self._host(bookmark["url"]).active -= 1
+        self._unfinished -= 1
+        self._changed.set()
+
+    def defer(self, bookmark, retry_after):
+        """Pauses the bookmark's host and requeues it; False if it should be left for the next run."""
+        url = bookmark["url"]
+        host = self._host(url)
+        self.deferred += 1
+        self._deferrals[url] = self._deferrals.get(url, 0) + 1
+        host.paused_until = max(host.paused_until, time.monotonic() + retry_after)
+        if retry_after > MAX_RETRY_WAIT:
+            host.closed = True
+        else:
+            # One request when the pause ends, then the steady rate without bursts
+            host.burst = 1
+            host.tokens = 1.0
+            host.refilled = host.paused_until
+        if host.closed or self._deferrals[url] > MAX_DEFERRALS:
+            return False
+        host.pending.appendleft(bookmark)
+        self._pending += 1
+        self._unfinished += 1
+        self._changed.set()
+        return True
+
+    def pause_left(self, url):
+        """Seconds until the bookmark's host may be fetched again."""
+        return max(0.0, self._host(url).paused_until - time.monotonic())
+
+    def is_closed(self, url):
+        """True once the host asked for a pause longer than this run should wait."""
+        return self._host(url).closed
+
+    def qsize(self):
+        return self._pending
+
+    async def join(self):
+        while self._unfinished:
+            await self._wait()
+
+    def stats(self):
+        return {
+            "hosts": len(self._hosts),
+            "deferred": self.deferred,
+            "closed_hosts": sorted(key for key, host in self._hosts.items() if host.closed),
+        }
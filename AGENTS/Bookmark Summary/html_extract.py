@@ -0,0 +1,273 @@
+# Plain-HTML text extraction for the HTTP fast path.
+#
+# Produces the same fields the browser scrape returns (title, meta description,
+# the <link rel=canonical> target and roughly what document.body.innerText
+# would give) from raw HTML using only the standard library parser.
+#
+# It also picks out the main content by text density: every run of text
+# between block boundaries scores its enclosing container (and half of that
+# for the container's parent) by length and commas, discounted by how much of
+# it is link text. The best container, plus siblings that score nearly as
+# well, is the article; navigation, footers, sidebars, cookie banners, share
+# bars and comment threads (by tag, role, class or id) never count.
+
+import re
+from html.parser import HTMLParser
+
+# Elements whose contents never show up in innerText
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head", "iframe", "object", "canvas"}
+# Elements that start a new line in innerText
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "tr", "ul",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Elements that can hold an article; only these are scored as candidates
+CONTAINER_TAGS = {
+    "article", "aside", "blockquote", "body", "div", "dl", "fieldset", "figure", "footer", "form",
+    "header", "main", "nav", "ol", "section", "table", "ul",
+}
+BOILERPLATE_TAGS = {"nav", "footer", "aside", "form", "button", "select", "dialog"}
+BOILERPLATE_ROLES = {"navigation", "contentinfo", "complementary", "banner", "dialog", "alertdialog", "menu"}
+BOILERPLATE_RE = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|footer|sidebar|side-bar|widget|breadcrumbs?|comments?|comment-list|disqus|"
+    r"replies|respond|cookies?|consent|gdpr|banner|share|sharing|social|related|recommended|popular|"
+    r"newsletter|subscribe|signup|promo|sponsored|ads?|advert|advertisement|popup|modal|paywall)([\s_-]|$)",
+    re.I,
+)
+POSITIVE_RE = re.compile(r"article|body|content|entry|main|post|story|text|blog", re.I)
+# Never dropped as boilerplate, whatever their classes say
+NEVER_BOILERPLATE = {"html", "body", "article", "main"}
+MIN_PARAGRAPH_CHARS = 25      # Shorter text runs (labels, buttons) don't score
+MIN_MAIN_CHARS = 250          # A main-content pick shorter than this is not trusted
+SIBLING_SHARE = 0.25          # Siblings scoring this share of the best are part of the article
+
+
+class _Node:
+    __slots__ = ("tag", "parent", "start", "end", "score", "chars", "link_chars", "weight", "children")
+
+    def __init__(self, tag, parent, start, weight):
+        self.tag = tag
+        self.parent = parent
+        self.start = start
+        self.end = None
+        self.score = 0.0
+        self.chars = 0
+        self.link_chars = 0
+        self.weight = weight
+        self.children = []
+
+    def final_score(self):
+        link_density = self.link_chars / self.chars if self.chars else 1.0
+        return self.score * (1 - link_density) * self.weight
+
+
+def _is_boilerplate(tag, attrs):
+    if tag in NEVER_BOILERPLATE:
+        return False
+    if tag in BOILERPLATE_TAGS or (attrs.get("role") or "").lower() in BOILERPLATE_ROLES:
+        return True
+    if (attrs.get("aria-hidden") or "").lower() == "true":
+        return True
+    return bool(BOILERPLATE_RE.search(f"{attrs.get('class') or ''} {attrs.get('id') or ''}"))
+
+
+def _weight(tag, attrs):
+    if tag in ("article", "main") or (attrs.get("role") or "").lower() == "main" or attrs.get("itemprop") == "articleBody":
+        return 1.5
+    if POSITIVE_RE.search(f"{attrs.get('class') or ''} {attrs.get('id') or ''}"):
+        return 1.25
+    return 1.0
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title_parts = []
+        self.meta_description = None
+        self.canonical = None
+        self.noscript_parts = []
+        self.parts = []
+        self.boilerplate = []      # Per entry of parts: was it inside boilerplate?
+        self.nodes = []            # Closed and open containers, in document order
+        self.body_seen = False
+        self._skip_depth = 0
+        self._in_title = False
+        self._in_noscript = False
+        self._stack = []           # Open elements we track: (tag, node or None, is_boilerplate)
+        self._boilerplate_depth = 0
+        self._link_depth = 0
+        self._run_chars = 0
+        self._run_link_chars = 0
+        self._run_commas = 0
+
+    def _container(self):
+        for _, node, _ in reversed(self._stack):
+            if node is not None:
+                return node
+        return None
+
+    def _end_run(self):
+        """Scores the text run since the last block boundary into its containers."""
+        chars, link_chars, commas = self._run_chars, self._run_link_chars, self._run_commas
+        self._run_chars = self._run_link_chars = self._run_commas = 0
+        node = self._container()
+        if node is None or chars < MIN_PARAGRAPH_CHARS:
+            return
+        score = (1 + commas + min(chars // 100, 3)) * (1 - link_chars / chars)
+        node.score += score
+        if node.parent is not None:
+            node.parent.score += score / 2
+
+    def _open(self, tag, attrs):
+        boilerplate = _is_boilerplate(tag, attrs)
+        node = None
+        if tag in CONTAINER_TAGS or tag == "html":
+            node = _Node(tag, self._container(), len(self.parts), _weight(tag, attrs))
+            if node.parent is not None:
+                node.parent.children.append(node)
+            if not boilerplate and not self._boilerplate_depth:
+                self.nodes.append(node)
+        self._stack.append((tag, node, boilerplate))
+        if boilerplate:
+            self._boilerplate_depth += 1
+
+    def _close(self, tag):
+        if not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, node, boilerplate = self._stack.pop()
+            if boilerplate:
+                self._boilerplate_depth -= 1
+            if node is not None:
+                node.end = len(self.parts)
+                if node.parent is not None and not boilerplate:
+                    node.parent.chars += node.chars
+                    node.parent.link_chars += node.link_chars
+            if open_tag == tag:
+                return
+
+    def close(self):
+        super().close()
+        self._end_run()
+        while self._stack:
+            self._close(self._stack[-1][0])
+
+    def main_content(self):
+        """Text of the densest container and its strong siblings, or of the whole page minus boilerplate."""
+        candidates = {node for node in self.nodes if node.end is not None and node.score > 0}
+        if candidates:
+            best = max(candidates, key=_Node.final_score)
+            picked = [best]
+            if best.parent is not None:
+                threshold = best.final_score() * SIBLING_SHARE
+                picked = [
+                    node for node in best.parent.children
+                    if node is best or (node in candidates and node.final_score() >= threshold)
+                ]
+            text = _collapse("".join(
+                part for node in picked for part, dropped in
+                zip(self.parts[node.start:node.end], self.boilerplate[node.start:node.end]) if not dropped
+            ))
+            if len(text) >= MIN_MAIN_CHARS:
+                return text
+        text = _collapse("".join(part for part, dropped in zip(self.parts, self.boilerplate) if not dropped))
+        return text if len(text) >= MIN_MAIN_CHARS else _collapse("".join(self.parts))
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.body_seen = True
+            # An unclosed <head> must not swallow the page
+            self._skip_depth = 0
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            if (attrs.get("name") or "").lower() == "description" and self.meta_description is None:
+                self.meta_description = (attrs.get("content") or "").strip()
+        elif tag == "link" and self.canonical is None:
+            attrs = dict(attrs)
+            if "canonical" in (attrs.get("rel") or "").lower().split():
+                self.canonical = (attrs.get("href") or "").strip() or None
+        if tag == "noscript":
+            self._in_noscript = True
+        if tag in SKIP_TAGS and tag not in VOID_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._end_run()
+            self._add("\n")
+        if tag == "a":
+            self._link_depth += 1
+        elif not self._skip_depth and tag not in VOID_TAGS and (
+                tag in CONTAINER_TAGS or tag in BOILERPLATE_TAGS or tag == "html"):
+            self._open(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+        elif tag not in VOID_TAGS:
+            self._close(tag)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag == "noscript":
+            self._in_noscript = False
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._end_run()
+            self._add("\n")
+        if tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+        elif not self._skip_depth:
+            self._close(tag)
+
+    def _add(self, text):
+        self.parts.append(text)
+        self.boilerplate.append(self._boilerplate_depth > 0)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+        elif self._in_noscript:
+            self.noscript_parts.append(data)
+        elif not self._skip_depth:
+            self._add(data)
+            if self._boilerplate_depth:
+                return
+            chars = len(data.strip())
+            self._run_chars += chars
+            self._run_commas += data.count(",")
+            node = self._container()
+            if node is not None:
+                node.chars += chars
+            if self._link_depth:
+                self._run_link_chars += chars
+                if node is not None:
+                    node.link_chars += chars
+
+
+def _collapse(text):
+    lines = (re.sub(r"[ \t\r\f\v\xa0]+", " ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def extract(html):
+    """Returns title, meta_description, canonical (href as written), content, main_content and noscript text."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return {
+        "title": _collapse("".join(parser.title_parts)),
+        "meta_description": parser.meta_description or "No Description",
+        "canonical": parser.canonical,
+        "content": _collapse("".join(parser.parts)),
+        "main_content": parser.main_content(),
+        "noscript": _collapse(" ".join(parser.noscript_parts)),
+    }
@@ -0,0 +1,293 @@
+# Persistent background job queue for endpoint.py.
+#
+# Jobs (EPUB conversions, PDF summaries) are stored in SQLite so they survive
+# restarts and are shared by every gunicorn worker. The web workers only
+# submit jobs; they run in one dedicated process (`python3 web_jobs.py`,
+# started by serve.py), which gunicorn's worker recycling and reloads never
+# touch, and which lets running jobs finish before it exits. The number of
+# jobs running at once is capped. Submitting a job that is already queued or
+# running returns the existing job instead of a duplicate. Every job writes
+# its own log file.
+#
+# A job whose process died mid-run is marked failed rather than run again:
+# it may already have sent its summary or written its EPUB.
+
+import os
+import re
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+import traceback
+
+from metrics import pid_alive, process_start_time
+
+JOBS_DB = "/home/debian/bookmark_bot/jobs.db"
+JOB_LOG_DIR = "/home/debian/bookmark_bot/job_logs"
+MAX_RUNNING_JOBS = 2       # Across all worker processes
+POLL_INTERVAL = 2.0        # Seconds between queue checks when nothing wakes the dispatcher
+DRAIN_TIMEOUT = 600        # Seconds running jobs get to finish when the job process is stopped
+ORPHAN_ERROR = "The job process exited mid-run; outcome unknown"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    arg TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    note TEXT,
+    error TEXT,
+    worker_pid INTEGER,
+    worker_start INTEGER,
+    child_pid INTEGER,
+    child_start INTEGER,
+    log_path TEXT,
+    queued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+-- At most one queued/running job per (kind, arg)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active ON jobs(kind, arg) WHERE status IN ('queued', 'running');
+"""
+
+_PROGRESS_RE = re.compile(r"^PROGRESS\s+([0-9.]+)\s*(.*)$")
+
+
+def _migrate(conn):
+    """Adds columns introduced after a database was first created."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column in ("worker_start", "child_pid", "child_start"):
+        if columns and column not in columns:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} INTEGER")
+
+
+class JobContext:
+    """Handed to job handlers: a log file and a progress callback."""
+
+    def __init__(self, queue, job, log):
+        self.queue = queue
+        self.job = job
+        self.log = log
+
+    def progress(self, fraction, note=None):
+        self.queue._update(self.job["id"], progress=max(0.0, min(1.0, fraction)), note=note)
+
+
+class JobQueue:
+    def __init__(self, db_path=JOBS_DB, log_dir=JOB_LOG_DIR, max_running=MAX_RUNNING_JOBS):
+        self.db_path = db_path
+        self.log_dir = log_dir
+        self.max_running = max_running
+        self.handlers = {}
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._dispatcher = None
+        self._running = set()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        os.makedirs(log_dir, exist_ok=True)
+        conn = self._conn()
+        _migrate(conn)
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind, handler):
+        """Registers handler(ctx, arg) for a job kind; raising marks the job failed."""
+        self.handlers[kind] = handler
+
+    def submit(self, kind, arg):
+        """Queues a job and returns (job, created); an identical pending job is reused."""
+        conn = self._conn()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, arg, status, queued_at) VALUES (?, ?, ?, ?)",
+                (kind, arg, STATUS_QUEUED, time.time()),
+            )
+            created = True
+            job_id = cursor.lastrowid
+        except sqlite3.IntegrityError:
+            created = False
+            job_id = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND arg = ? AND status IN (?, ?)",
+                (kind, arg, STATUS_QUEUED, STATUS_RUNNING),
+            ).fetchone()[0]
+        self._wake.set()
+        return self.get(job_id), created
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit=50):
+        rows = self._conn().execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def _to_dict(self, row):
+        job = dict(row)
+        now = time.time()
+        started = job["started_at"]
+        job["wait_seconds"] = round((started or now) - job["queued_at"], 3)
+        job["run_seconds"] = round((job["finished_at"] or now) - started, 3) if started else None
+        return job
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        self._conn().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    # --- Dispatching
+
+    def start(self):
+        """Starts the dispatcher thread in this process; only the job process should call it."""
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._stop.clear()
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+        return self
+
+    def serve_forever(self, drain_timeout=DRAIN_TIMEOUT):
+        """Runs jobs until SIGTERM/SIGINT, then waits up to drain_timeout for running ones to finish."""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: self._stop.set())
+        print(f"Job process {os.getpid()} running {', '.join(self.handlers)} jobs")
+        self.start()
+        while not self._stop.wait(1.0):
+            pass
+        self._wake.set()
+        self._dispatcher.join()
+        deadline = time.monotonic() + drain_timeout
+        for thread in list(self._running):
+            thread.join(max(0.0, deadline - time.monotonic()))
+        left = sum(thread.is_alive() for thread in self._running)
+        print(f"Job process stopping; {left} jobs still running" if left else "Job process stopped")
+
+    def _fail_orphans(self, conn):
+        """Marks failed the running jobs whose process has died.
+
+        They are not queued again: the job may have got as far as delivering
+        its result. A job running a command is left alone until that command
+        has exited too.
+        """
+        rows = conn.execute(
+            "SELECT id, worker_pid, worker_start, child_pid, child_start FROM jobs WHERE status = ?",
+            (STATUS_RUNNING,),
+        )
+        for row in rows.fetchall():
+            if not row["worker_pid"] or pid_alive(row["worker_pid"], row["worker_start"]):
+                continue
+            if row["child_pid"] and pid_alive(row["child_pid"], row["child_start"]):
+                continue
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (STATUS_FAILED, ORPHAN_ERROR, time.time(), row["id"], STATUS_RUNNING),
+            )
+
+    def _claim(self):
+        """Atomically moves the oldest runnable queued job to running, respecting the global cap."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._fail_orphans(conn)
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (STATUS_RUNNING,)).fetchone()[0]
+            if running >= self.max_running:
+                conn.execute("COMMIT")
+                return None
+            kinds = list(self.handlers)
+            if not kinds:
+                conn.execute("COMMIT")
+                return None
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = ? AND kind IN ({','.join('?' * len(kinds))}) ORDER BY id LIMIT 1",
+                (STATUS_QUEUED, *kinds),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            log_path = os.path.join(self.log_dir, f"job-{row['id']}.log")
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_pid = ?, worker_start = ?, started_at = ?, log_path = ?, "
+                "progress = 0 WHERE id = ?",
+                (STATUS_RUNNING, os.getpid(), process_start_time(os.getpid()), time.time(), log_path, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"])
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.OperationalError as e:
+                print(f"Job dispatcher: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+                continue
+            thread = threading.Thread(target=self._run, args=(job,), name=f"job-{job['id']}", daemon=True)
+            self._running.add(thread)
+            thread.start()
+
+    def _run(self, job):
+        handler = self.handlers[job["kind"]]
+        with open(job["log_path"], "a") as log:
+            log.write(f"Job {job['id']} ({job['kind']}) started for {job['arg']}\n")
+            log.flush()
+            try:
+                handler(JobContext(self, job, log), job["arg"])
+                self._update(job["id"], status=STATUS_DONE, progress=1.0, finished_at=time.time())
+                log.write("Job finished.\n")
+            except Exception as e:
+                log.write(traceback.format_exc())
+                self._update(job["id"], status=STATUS_FAILED, error=str(e)[:500], finished_at=time.time())
+        self._running.discard(threading.current_thread())
+        # A slot has freed up; let the dispatcher pick the next job straight away
+        self._wake.set()
+
+
+def run_command(ctx, command, cwd=None):
+    """Runs a command for a job, streaming its output to the job log.
+
+    Output lines of the form `PROGRESS <0..1> [note]` update the job's progress.
+    The command's pid is stored with the job, so a job whose process dies
+    keeps its slot until the command has exited too.
+    """
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        cwd=cwd, env={**os.environ}, start_new_session=True,
+    )
+    ctx.queue._update(ctx.job["id"], child_pid=process.pid, child_start=process_start_time(process.pid))
+    for line in process.stdout:
+        ctx.log.write(line)
+        ctx.log.flush()
+        match = _PROGRESS_RE.match(line.strip())
+        if match:
+            try:
+                ctx.progress(float(match.group(1)), match.group(2) or None)
+            except ValueError:
+                pass
+    process.wait()
+    ctx.queue._update(ctx.job["id"], child_pid=None, child_start=None)
+    if process.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(command[1] if len(command) > 1 else command[0])} exited with {process.returncode}")
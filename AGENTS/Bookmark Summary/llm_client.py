@@ -0,0 +1,213 @@
+# Client for the local OpenAI-compatible completions server.
+#
+# Keeps a pooled keep-alive aiohttp session, applies connect/read timeouts,
+# retries transient failures with jittered exponential backoff, and can stream
+# the completion over SSE so time-to-first-token and tokens/s are measured for
+# every request.
+
+import asyncio
+import json
+import random
+import time
+
+import aiohttp
+
+from metrics import RATE_BUCKETS, note, registry, span
+
+API_URL = "http://10.1.1.96:1234/v1/chat/completions"
+
+CONNECT_TIMEOUT = 5        # Seconds to establish a connection
+READ_TIMEOUT = 120         # Max seconds between bytes from the server
+MAX_CONNECTIONS = 4
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0         # Seconds; doubled each retry with full jitter
+BACKOFF_MAX = 30.0
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when a completion fails after all retries."""
+
+
+class CompletionStats:
+    """Timing for one completion request."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+        self.completion_tokens = 0
+        self.attempts = 0
+
+    @property
+    def ttft(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def tokens_per_second(self):
+        if self.finished_at is None:
+            return None
+        # Without streaming there is no first-token time, so use the whole request
+        generation = self.finished_at - (self.first_token_at or self.started)
+        return self.completion_tokens / generation if generation > 0 else None
+
+    def __str__(self):
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        tps = f"{self.tokens_per_second:.1f}" if self.tokens_per_second is not None else "n/a"
+        total = (self.finished_at or time.monotonic()) - self.started
+        return (f"ttft={ttft} tokens={self.completion_tokens} tok/s={tps} "
+                f"total={total:.2f}s attempts={self.attempts}")
+
+
+class LLMClient:
+    def __init__(self, api_url=API_URL, stream=True, max_connections=MAX_CONNECTIONS,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES):
+        self.api_url = api_url
+        self.stream = stream
+        self.max_retries = max_retries
+        self._timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        self._connector_limit = max_connections
+        self._session = None
+        self.last_stats = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._connector_limit, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def chat(self, model, messages, temperature=0.7, max_tokens=-1):
+        """Returns the completion text, retrying transient errors; raises LLMError."""
+        with span("llm", model=model):
+            return await self._chat(model, messages, temperature, max_tokens)
+
+    async def _chat(self, model, messages, temperature, max_tokens):
+        stats = CompletionStats()
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": self.stream,
+        }
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            stats.attempts = attempt + 1
+            try:
+                if self.stream:
+                    text = await self._chat_stream(payload, stats)
+                else:
+                    text = await self._chat_once(payload, stats)
+                stats.finished_at = time.monotonic()
+                self.last_stats = stats
+                print(f"LLM completion: {stats}")
+                self._record(model, stats)
+                return text
+            except _RetryableError as e:
+                last_error = e
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                last_error = e
+            if attempt < self.max_retries:
+                delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+                retry_after = getattr(last_error, "retry_after", None)
+                if retry_after:
+                    delay = max(delay, retry_after)
+                print(f"LLM request failed ({last_error!r}); retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+        raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {last_error!r}")
+
+    def _record(self, model, stats):
+        if stats.ttft is not None:
+            registry.observe("llm_ttft_seconds", stats.ttft, model=model)
+        if stats.tokens_per_second is not None:
+            registry.observe("llm_tokens_per_second", stats.tokens_per_second, buckets=RATE_BUCKETS, model=model)
+        registry.inc("llm_completion_tokens_total", stats.completion_tokens, model=model)
+        note(
+            "llm_calls", model=model, attempts=stats.attempts, tokens=stats.completion_tokens,
+            ttft=round(stats.ttft, 3) if stats.ttft is not None else None,
+            tokens_per_second=round(stats.tokens_per_second, 1) if stats.tokens_per_second is not None else None,
+            seconds=round(stats.finished_at - stats.started, 3),
+        )
+
+    async def _post(self, payload):
+        response = await self._get_session().post(
+            self.api_url, json=payload, headers={"Accept": "text/event-stream" if payload["stream"] else "application/json"}
+        )
+        if response.status in RETRY_STATUSES:
+            retry_after = response.headers.get("Retry-After")
+            response.release()
+            raise _RetryableError(response.status, retry_after)
+        if response.status >= 400:
+            body = await response.text()
+            response.release()
+            raise LLMError(f"LLM API returned {response.status}: {body[:200]}")
+        return response
+
+    async def _chat_once(self, payload, stats):
+        async with await self._post(payload) as response:
+            result = await response.json()
+        text = result.get("choices", [{}])[0].get("message", {}).get("content") or ""
+        stats.completion_tokens = result.get("usage", {}).get("completion_tokens", 0)
+        if not text:
+            raise LLMError("Empty completion from LLM API")
+        return text
+
+    async def _chat_stream(self, payload, stats):
+        parts = []
+        async with await self._post(payload) as response:
+            if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                # Server ignored stream=True; fall back to a plain JSON body
+                result = await response.json()
+                parts.append(result.get("choices", [{}])[0].get("message", {}).get("content") or "")
+                stats.completion_tokens = result.get("usage", {}).get("completion_tokens", 0)
+            else:
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8", "replace").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        event = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    choices = event.get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if stats.first_token_at is None:
+                            stats.first_token_at = time.monotonic()
+                        # Each SSE delta carries one generated token on llama.cpp-style servers
+                        stats.completion_tokens += 1
+                        parts.append(delta)
+                    usage = event.get("usage")
+                    if usage and usage.get("completion_tokens"):
+                        stats.completion_tokens = usage["completion_tokens"]
+        text = "".join(parts)
+        if not text:
+            raise LLMError("Empty completion from LLM API")
+        return text
+
+
+class _RetryableError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        try:
+            self.retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            self.retry_after = None
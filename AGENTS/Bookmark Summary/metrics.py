@@ -0,0 +1,377 @@
+# Timing spans, counters and histograms shared by runner.py and endpoint.py.
+#
+# Each process keeps its own registry and periodically writes a snapshot to
+# METRICS_DIR/<pid>.json; /metrics merges every snapshot (gunicorn workers
+# and the runner daemon alike) into Prometheus text format: counters and
+# histograms are summed, gauges (which every process reads from the same
+# stores) take the most recent snapshot's value. Snapshots of processes that
+# have exited are folded into retired.json so counters never go backwards.
+# The runner also writes one JSON report per run with every span it
+# recorded, so a slow run can be pinned on a stage.
+
+import bisect
+import contextlib
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+METRICS_DIR = "/home/debian/bookmark_bot/metrics"
+REPORT_DIR = "/home/debian/bookmark_bot/reports"
+REPORT_KEEP = 200           # Most recent run reports kept on disk
+FLUSH_INTERVAL = 1.0        # Min seconds between snapshot writes from one process
+PREFIX = "bookmark_bot_"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# name -> (type, help)
+METRICS = {
+    "stage_seconds": ("histogram", "Duration of pipeline stages (scrape, extract, compact, tokenize, llm, escape, send)."),
+    "stage_errors_total": ("counter", "Pipeline stage spans that raised."),
+    "llm_ttft_seconds": ("histogram", "LLM time to first streamed token."),
+    "llm_tokens_per_second": ("histogram", "LLM generation speed."),
+    "llm_completion_tokens_total": ("counter", "Completion tokens generated by the LLM."),
+    "http_request_seconds": ("histogram", "Flask request latency by route."),
+    "feature_load_seconds": ("histogram", "Time to import an endpoint.py feature module on first use."),
+    "cache_lookups_total": ("counter", "Disk cache lookups by cache and result."),
+    "prompt_tokens_total": ("counter", "Page tokens before (scraped) and after (compacted) prompt compaction."),
+    "prompt_compaction_ratio": ("histogram", "Compacted prompt tokens / scraped page tokens, per page."),
+    "articles_total": ("counter", "Bookmarks finished by the runner, by outcome."),
+    "llm_seconds_saved_total": ("counter", "Estimated LLM seconds saved by collapsing duplicate bookmarks."),
+    "host_busy_total": ("counter", "Page fetches answered with 429/503 + Retry-After (the host was paused)."),
+    "fetch_tier_total": ("counter", "Pages fetched per tier (cache, http, browser)."),
+    "telegram_messages_total": ("counter", "Telegram messages sent."),
+    "telegram_retries_total": ("counter", "Telegram sends retried after rate limits or errors."),
+    "queue_depth": ("gauge", "Items waiting in a queue."),
+    "bookmarks": ("gauge", "Bookmarks in the store by status."),
+    "jobs": ("gauge", "Background jobs by status."),
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.gauge_callbacks = {}
+        self._last_flush = 0.0
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": list(buckets), "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(histogram["buckets"], value)
+            if index < len(histogram["counts"]):
+                histogram["counts"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def gauge_callback(self, name, callback, **labels):
+        """Registers callback() to be read whenever the gauge is exported."""
+        with self._lock:
+            self.gauge_callbacks[_key(name, labels)] = callback
+
+    def snapshot(self):
+        with self._lock:
+            gauges = dict(self.gauges)
+            callbacks = list(self.gauge_callbacks.items())
+            snapshot = {
+                "pid": os.getpid(),
+                "start_time": process_start_time(os.getpid()),
+                "time": time.time(),
+                "counters": [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, dict(labels), json.loads(json.dumps(h))] for (name, labels), h in self.histograms.items()],
+            }
+        for key, callback in callbacks:
+            try:
+                gauges[key] = callback()
+            except Exception:
+                continue
+        snapshot["gauges"] = [[name, dict(labels), value] for (name, labels), value in gauges.items()]
+        return snapshot
+
+    def flush(self, force=False):
+        """Writes this process's snapshot for /metrics, at most every FLUSH_INTERVAL seconds."""
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        try:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+            with open(path + ".tmp", "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Could not write metrics snapshot: {e}")
+
+
+def process_start_time(pid):
+    """The process's start time in clock ticks since boot (/proc/<pid>/stat field 22), or None."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name (field 2) may contain spaces and parentheses; fields 3+ follow the last ')'
+    fields = stat[stat.rindex(")") + 2:].split()
+    return int(fields[22 - 3])
+
+
+registry = Registry()
+
+
+# ------------------------------
+# Spans and run reports
+# ------------------------------
+
+class RunReport:
+    """Collects every span of one runner invocation and writes it as JSON."""
+
+    def __init__(self, kind="run"):
+        self.kind = kind
+        self.started = time.time()
+        self._started_monotonic = time.monotonic()
+        self.spans = []
+        self.fields = {}
+
+    def add_span(self, stage, started, seconds, error, labels):
+        self.spans.append({
+            "stage": stage,
+            "start": round(started - self._started_monotonic, 4),
+            "seconds": round(seconds, 4),
+            "error": error,
+            **labels,
+        })
+
+    def summary(self):
+        stages = {}
+        for span in self.spans:
+            stages.setdefault(span["stage"], []).append(span["seconds"])
+        return {
+            stage: {
+                "count": len(times),
+                "total": round(sum(times), 3),
+                "p50": round(sorted(times)[len(times) // 2], 3),
+                "max": round(max(times), 3),
+            }
+            for stage, times in stages.items()
+        }
+
+    def write(self, directory=None):
+        directory = directory or REPORT_DIR
+        report = {
+            "kind": self.kind,
+            "pid": os.getpid(),
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "seconds": round(time.monotonic() - self._started_monotonic, 3),
+            **self.fields,
+            "stages": self.summary(),
+            "spans": self.spans,
+        }
+        try:
+            os.makedirs(directory, exist_ok=True)
+            name = f"{self.kind}-{datetime.fromtimestamp(self.started):%Y%m%d-%H%M%S}-{os.getpid()}.json"
+            path = os.path.join(directory, name)
+            with open(path, "w") as f:
+                json.dump(report, f, indent=1)
+            reports = sorted(entry for entry in os.listdir(directory) if entry.endswith(".json"))
+            for old in reports[:-REPORT_KEEP]:
+                os.remove(os.path.join(directory, old))
+            print(f"Run report written to {path}")
+            return path
+        except OSError as e:
+            print(f"Could not write run report: {e}")
+            return None
+
+
+_report = None
+
+
+def start_report(kind="run"):
+    global _report
+    _report = RunReport(kind)
+    return _report
+
+
+def finish_report(**fields):
+    """Writes and detaches the current run report; returns its path."""
+    global _report
+    report, _report = _report, None
+    if report is None:
+        return None
+    report.fields.update(fields)
+    return report.write()
+
+
+def note(key, **fields):
+    """Appends a record (e.g. one LLM call's TTFT) to a list in the current run report."""
+    if _report is not None:
+        _report.fields.setdefault(key, []).append(fields)
+
+
+@contextlib.contextmanager
+def span(stage, **labels):
+    """Times a block as one pipeline stage (works around awaits too)."""
+    started = time.monotonic()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        registry.observe("stage_seconds", seconds, stage=stage)
+        if error is not None and error != "CancelledError":
+            registry.inc("stage_errors_total", stage=stage)
+        if _report is not None:
+            _report.add_span(stage, started, seconds, error, labels)
+
+
+# ------------------------------
+# Prometheus export
+# ------------------------------
+
+def pid_alive(pid, start_time=None):
+    """True if pid is running and, when start_time is known, is still the same process."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # A recycled pid belongs to a process that started later
+    return start_time is None or process_start_time(pid) in (None, start_time)
+
+
+def _merge(into, snapshot, include_gauges):
+    for name, labels, value in snapshot.get("counters", []):
+        key = _key(name, labels)
+        into["counters"][key] = into["counters"].get(key, 0) + value
+    for name, labels, histogram in snapshot.get("histograms", []):
+        key = _key(name, labels)
+        merged = into["histograms"].get(key)
+        if merged is None or merged["buckets"] != histogram["buckets"]:
+            into["histograms"][key] = json.loads(json.dumps(histogram))
+            continue
+        merged["counts"] = [a + b for a, b in zip(merged["counts"], histogram["counts"])]
+        merged["sum"] += histogram["sum"]
+        merged["count"] += histogram["count"]
+    if include_gauges:
+        # Last value wins: the same gauge from several processes is one reading, not a sum
+        taken = snapshot.get("time", 0)
+        for name, labels, value in snapshot.get("gauges", []):
+            key = _key(name, labels)
+            if taken >= into["gauge_times"].get(key, 0):
+                into["gauges"][key] = value
+                into["gauge_times"][key] = taken
+
+
+def _collect():
+    """Merges this process's registry with every other process's snapshot."""
+    merged = {"counters": {}, "histograms": {}, "gauges": {}, "gauge_times": {}}
+    _merge(merged, registry.snapshot(), True)
+    if not os.path.isdir(METRICS_DIR):
+        return merged
+    with open(os.path.join(METRICS_DIR, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = os.path.join(METRICS_DIR, "retired.json")
+        retired = {"counters": {}, "histograms": {}, "gauges": {}, "gauge_times": {}}
+        retired_changed = False
+        if os.path.exists(retired_path):
+            with open(retired_path) as f:
+                _merge(retired, json.load(f), False)
+        for entry in os.listdir(METRICS_DIR):
+            stem = entry[:-len(".json")]
+            if not entry.endswith(".json") or not stem.isdigit() or int(stem) == os.getpid():
+                continue
+            path = os.path.join(METRICS_DIR, entry)
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if pid_alive(int(stem), snapshot.get("start_time")):
+                _merge(merged, snapshot, True)
+            else:
+                _merge(retired, snapshot, False)
+                os.remove(path)
+                retired_changed = True
+        if retired_changed:
+            with open(retired_path + ".tmp", "w") as f:
+                json.dump({
+                    "counters": [[n, dict(l), v] for (n, l), v in retired["counters"].items()],
+                    "histograms": [[n, dict(l), h] for (n, l), h in retired["histograms"].items()],
+                }, f)
+            os.replace(retired_path + ".tmp", retired_path)
+        _merge(merged, {
+            "counters": [[n, dict(l), v] for (n, l), v in retired["counters"].items()],
+            "histograms": [[n, dict(l), h] for (n, l), h in retired["histograms"].items()],
+        }, False)
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render(extra_gauges=()):
+    """Returns every metric in Prometheus text format.
+
+    `extra_gauges` is an iterable of (name, labels, value) computed by the caller.
+    """
+    merged = _collect()
+    for name, labels, value in extra_gauges:
+        merged["gauges"][_key(name, labels)] = value
+
+    by_name = {}
+    for kind in ("counters", "histograms", "gauges"):
+        for (name, labels), value in merged[kind].items():
+            by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(by_name):
+        metric_type, help_text = METRICS.get(name, ("untyped", name))
+        full_name = PREFIX + name
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {metric_type}")
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if metric_type == "histogram":
+                cumulative = 0
+                for bound, count in zip(value["buckets"], value["counts"]):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_labels_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{full_name}_bucket{_labels_text(labels, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{full_name}_sum{_labels_text(labels)} {value['sum']}")
+                lines.append(f"{full_name}_count{_labels_text(labels)} {value['count']}")
+            else:
+                lines.append(f"{full_name}{_labels_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
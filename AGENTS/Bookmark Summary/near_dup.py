@@ -0,0 +1,210 @@
+# Near-duplicate page detection for the runner, ahead of the LLM stage.
+#
+# Each scraped page gets a MinHash sketch of its word 3-shingles, built with
+# one-permutation hashing: every shingle is hashed once, the hash picks one
+# of SKETCH_BINS bins and each bin keeps its smallest value. Matching bins
+# estimate the Jaccard similarity of two pages; at JACCARD_THRESHOLD or more
+# they are treated as the same article (syndicated copies, AMP vs. canonical,
+# a changed sidebar or date). Lookups go through a banded LSH index so only
+# pages sharing a whole band of bins are compared.
+
+import hashlib
+import re
+from array import array
+
+from url_canon import canonical_url
+
+SHINGLE_WORDS = 3
+MIN_WORDS = 50            # Shorter texts are too easy to confuse; they are never collapsed
+SKETCH_BINS = 64
+BANDS = 16                # 16 bands of 4 bins: pages at Jaccard 0.8 share a band >99.9% of the time
+JACCARD_THRESHOLD = 0.8
+
+_WORD_RE = re.compile(r"\w+")
+_EMPTY = (1 << 64) - 1
+_BIN_BITS = SKETCH_BINS.bit_length() - 1
+
+
+def sketch(text):
+    """Returns a MinHash sketch (tuple of SKETCH_BINS ints) of the text, or None for short texts."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    bins = [_EMPTY] * SKETCH_BINS
+    for shingle in {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        index = value & (SKETCH_BINS - 1)
+        value >>= _BIN_BITS
+        if value < bins[index]:
+            bins[index] = value
+    return tuple(bins)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two sketches (bins empty in both are ignored)."""
+    used = matches = 0
+    for x, y in zip(a, b):
+        if x != _EMPTY or y != _EMPTY:
+            used += 1
+            matches += x == y
+    return matches / used if used else 0.0
+
+
+def to_blob(page_sketch):
+    return array("Q", page_sketch).tobytes()
+
+
+def from_blob(blob):
+    values = array("Q")
+    values.frombytes(blob)
+    return tuple(values)
+
+
+class SketchIndex:
+    def __init__(self, bands=BANDS, threshold=JACCARD_THRESHOLD):
+        self.bands = bands
+        self.rows = SKETCH_BINS // bands
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(bands)]
+        self._sketches = {}
+
+    def _band_keys(self, page_sketch):
+        for band in range(self.bands):
+            rows = page_sketch[band * self.rows:(band + 1) * self.rows]
+            # All-empty bands (short pages) would put every short page in one bucket
+            if any(value != _EMPTY for value in rows):
+                yield band, rows
+
+    def add(self, key, page_sketch):
+        self._sketches[key] = page_sketch
+        for band, rows in self._band_keys(page_sketch):
+            self._buckets[band].setdefault(rows, set()).add(key)
+
+    def remove(self, key):
+        page_sketch = self._sketches.pop(key, None)
+        if page_sketch is None:
+            return
+        for band, rows in self._band_keys(page_sketch):
+            self._buckets[band].get(rows, set()).discard(key)
+
+    def find(self, page_sketch):
+        """Returns (key, similarity) of the most similar stored page above the threshold, or None."""
+        candidates = set()
+        for band, rows in self._band_keys(page_sketch):
+            candidates.update(self._buckets[band].get(rows, ()))
+        best = None
+        for key in candidates:
+            score = similarity(self._sketches[key], page_sketch)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def __len__(self):
+        return len(self._sketches)
+
+
+class Deduper:
+    """Collapses bookmarks that point at a page already delivered or already claimed in this run.
+
+    Pages are claimed by canonical URL (after <link rel=canonical>) and by
+    content sketch; the runner releases a claim when the summary or delivery
+    fails so a later copy gets summarized instead. Bookmarks checked with
+    recheck=True (added or requeued by hand) ignore delivered pages.
+    """
+
+    def __init__(self, seen=()):
+        self.index = SketchIndex()
+        self.claims = {}        # canonical key -> URL claiming it ("" for delivered pages)
+        self.delivered = set()  # Keys of delivered pages, kept across release()
+        for key, blob in seen:
+            self.claims[key] = ""
+            self.delivered.add(key)
+            if blob:
+                self.index.add(key, from_blob(blob))
+        self.by_url = 0
+        self.by_content = 0
+        self.tokens_skipped = 0
+        self.summary_seconds = 0.0
+        self.summary_tokens = 0
+        self.summaries = 0
+
+    def is_delivered(self, key):
+        return self.claims.get(key) == ""
+
+    def _duplicate_of(self, key, url, recheck):
+        owner = self.claims.get(key)
+        return owner is not None and owner != url and not (recheck and owner == "")
+
+    def claim_url(self, url, recheck=False):
+        """Pre-scrape check; returns the key it duplicates, or None after claiming it.
+
+        Only duplicates of delivered pages are counted; the runner leaves copies
+        of pages still in flight pending.
+        """
+        key = canonical_url(url)
+        if self._duplicate_of(key, url, recheck):
+            self.by_url += self.is_delivered(key)
+            return key
+        self.claims[key] = url
+        return None
+
+    def check(self, url, data, recheck=False):
+        """Post-scrape check; returns the key the page duplicates, or None after claiming it.
+
+        Sets data["canonical"] and data["sketch"] for bookmark_store.record_seen_page().
+        """
+        key = canonical_url(data.get("canonical_url") or url)
+        data["canonical"] = key
+        if self._duplicate_of(key, url, recheck):
+            self.by_url += self.is_delivered(key)
+            return key
+        page_sketch = sketch(data["content"])
+        data["sketch"] = to_blob(page_sketch) if page_sketch is not None else None
+        if page_sketch is not None:
+            match = self.index.find(page_sketch)
+            if match is not None and self._duplicate_of(match[0], url, recheck):
+                self.by_content += self.is_delivered(match[0])
+                return match[0]
+            self.index.add(key, page_sketch)
+        self.claims[key] = url
+        return None
+
+    def mark_delivered(self, url):
+        """Turns the URL's claims into delivered pages, so later copies are collapsed for good."""
+        for key in [key for key, owner in self.claims.items() if owner == url]:
+            self.claims[key] = ""
+            self.delivered.add(key)
+
+    def release(self, url):
+        for key in [key for key, owner in self.claims.items() if owner == url]:
+            if key in self.delivered:
+                # A recheck of a delivered page failed; the earlier delivery still counts
+                self.claims[key] = ""
+                continue
+            del self.claims[key]
+            self.index.remove(key)
+
+    def skipped(self, tokens):
+        self.tokens_skipped += tokens
+
+    def observe_summary(self, seconds, tokens):
+        self.summaries += 1
+        self.summary_seconds += seconds
+        self.summary_tokens += tokens
+
+    def stats(self):
+        """Duplicates collapsed and the LLM time that saved, estimated from this run's summaries."""
+        collapsed = self.by_url + self.by_content
+        saved = None
+        if self.summaries:
+            if self.tokens_skipped and self.summary_tokens:
+                saved = self.tokens_skipped * self.summary_seconds / self.summary_tokens
+            else:
+                saved = collapsed * self.summary_seconds / self.summaries
+        return {
+            "collapsed": collapsed,
+            "by_url": self.by_url,
+            "by_content": self.by_content,
+            "tokens_skipped": self.tokens_skipped,
+            "llm_seconds_saved": round(saved, 1) if saved is not None else None,
+        }
@@ -0,0 +1,193 @@
+# Page-parallel PDF text extraction.
+#
+# Each page uses the PyMuPDF text layer when it has one. Only pages without
+# extractable text (but with images on them, i.e. scans) are rendered and
+# OCRed with Tesseract, at a DPI chosen from the page size; those pages are
+# split into small batches across a process pool. Every finished
+# page is cached under (file hash, page number), so a re-summary or a retry
+# after a partial failure only extracts the pages it is missing.
+#
+#   python3 pdf_extract.py book.pdf --workers 4 > book.txt
+
+import argparse
+import concurrent.futures
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+from blob_store import file_sha256
+from disk_cache import DiskCache
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:
+    pytesseract = None
+
+PAGE_CACHE_FILE = "/home/debian/bookmark_bot/cache/pdf_pages.db"
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MAX_WORKERS = os.cpu_count() or 1
+PAGES_PER_TASK = 4          # OCR pages per pool task; small batches balance the workers
+MIN_TEXT_CHARS = 25         # A text layer shorter than this is treated as missing
+OCR_TARGET_PIXELS = 2500    # Long side of the rendered page in pixels
+OCR_MIN_DPI = 150
+OCR_MAX_DPI = 400
+OCR_LANG = "eng"
+
+METHOD_CACHE = "cache"
+METHOD_TEXT = "text"
+METHOD_OCR = "ocr"
+METHOD_EMPTY = "empty"
+
+
+class PdfExtractError(Exception):
+    pass
+
+
+def ocr_dpi(page):
+    """Picks a DPI that renders the page's long side at about OCR_TARGET_PIXELS."""
+    long_side_inches = max(page.rect.width, page.rect.height) / 72
+    if long_side_inches <= 0:
+        return OCR_MIN_DPI
+    return int(max(OCR_MIN_DPI, min(OCR_MAX_DPI, OCR_TARGET_PIXELS / long_side_inches)))
+
+
+def text_layer(page):
+    """Returns (text, needs_ocr) from a page's text layer."""
+    text = page.get_text("text").strip()
+    if len(text) >= MIN_TEXT_CHARS:
+        return text, False
+    # Pages with no images are genuinely (nearly) blank; OCR can't add anything
+    return text, bool(page.get_images(full=False))
+
+
+def ocr_page(page):
+    pixmap = page.get_pixmap(dpi=ocr_dpi(page), colorspace=fitz.csGRAY)
+    image = Image.open(io.BytesIO(pixmap.tobytes("png")))
+    return pytesseract.image_to_string(image, lang=OCR_LANG).strip()
+
+
+def _ocr_batch(path, page_numbers):
+    """Process pool task: OCRs a batch of pages from one open document."""
+    with fitz.open(path) as doc:
+        return [(number, ocr_page(doc[number])) for number in page_numbers]
+
+
+def _page_key(file_hash, number):
+    return f"{file_hash}:{number}"
+
+
+def extract_pages(path, workers=MAX_WORKERS, cache=None, ocr=True, progress=None):
+    """Extracts every page of a PDF; returns (list of page texts, stats).
+
+    Text layers are read in this process, which is fast; only pages that need
+    OCR are sent to the process pool. `progress(done, total)` is called as
+    pages finish. Pages that fail are reported in a PdfExtractError after the
+    rest have been extracted and cached.
+    """
+    started = time.monotonic()
+    file_hash = file_sha256(path)
+    stats = {METHOD_CACHE: 0, METHOD_TEXT: 0, METHOD_OCR: 0, METHOD_EMPTY: 0, "failed": 0}
+    ocr = ocr and pytesseract is not None
+
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+        pages = [None] * page_count
+        done = 0
+
+        def finish(number, text, method):
+            nonlocal done
+            pages[number] = text
+            stats[method] += 1
+            if cache is not None and method != METHOD_CACHE:
+                cache.set(_page_key(file_hash, number), {"text": text, "method": method})
+            done += 1
+            if progress:
+                progress(done, page_count)
+
+        layer_text = {}
+        for number in range(page_count):
+            entry = cache.get(_page_key(file_hash, number)) if cache is not None else None
+            if entry is not None:
+                finish(number, entry["text"], METHOD_CACHE)
+                continue
+            text, needs_ocr = text_layer(doc[number])
+            if needs_ocr and ocr:
+                layer_text[number] = text
+            else:
+                finish(number, text, METHOD_TEXT if text else METHOD_EMPTY)
+
+    def finish_ocr(results):
+        for number, ocr_text in results:
+            text = layer_text[number]
+            if len(ocr_text) > len(text):
+                finish(number, ocr_text, METHOD_OCR)
+            else:
+                finish(number, text, METHOD_TEXT if text else METHOD_EMPTY)
+
+    pending = sorted(layer_text)
+    batches = [pending[i:i + PAGES_PER_TASK] for i in range(0, len(pending), PAGES_PER_TASK)]
+    failed = []
+    if len(batches) <= 1 or workers <= 1:
+        for batch in batches:
+            try:
+                finish_ocr(_ocr_batch(path, batch))
+            except Exception as e:
+                print(f"OCR of pages {batch[0] + 1}-{batch[-1] + 1} failed: {e}")
+                failed.extend(batch)
+    else:
+        # spawn, not fork: callers may be multi-threaded (e.g. a gunicorn worker)
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(min(workers, len(batches)), mp_context=context) as pool:
+            futures = {pool.submit(_ocr_batch, path, batch): batch for batch in batches}
+            for future in concurrent.futures.as_completed(futures):
+                batch = futures[future]
+                try:
+                    finish_ocr(future.result())
+                except Exception as e:
+                    print(f"OCR of pages {batch[0] + 1}-{batch[-1] + 1} failed: {e}")
+                    failed.extend(batch)
+
+    stats["failed"] = len(failed)
+    stats["pages"] = page_count
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    if failed:
+        raise PdfExtractError(
+            f"{len(failed)} of {page_count} pages could not be extracted "
+            f"(first: page {min(failed) + 1}); finished pages were cached"
+        )
+    return pages, stats
+
+
+def extract_text(path, workers=MAX_WORKERS, cache=None, ocr=True, progress=None):
+    """Returns the whole document's text (pages separated by blank lines) and stats."""
+    pages, stats = extract_pages(path, workers=workers, cache=cache, ocr=ocr, progress=progress)
+    return "\n\n".join(text for text in pages if text), stats
+
+
+def open_page_cache(path=PAGE_CACHE_FILE, max_bytes=PAGE_CACHE_MAX_BYTES):
+    return DiskCache(path, max_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the text of a PDF, OCRing scanned pages.")
+    parser.add_argument("pdf")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--no-ocr", action="store_true", help="only use the PDF text layer")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the page cache")
+    args = parser.parse_args()
+    if pytesseract is None and not args.no_ocr:
+        print("pytesseract is not installed; scanned pages will come back empty.", file=sys.stderr)
+
+    cache = None if args.no_cache else open_page_cache()
+    text, stats = extract_text(args.pdf, workers=args.workers, cache=cache, ocr=not args.no_ocr)
+    print(text)
+    print(f"Extraction stats: {stats}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Summarizes an uploaded PDF and sends the summary to Telegram.
+#
+# Called in-process by the web app's "pdf_summary" job (see web_jobs), or run
+# by hand as `python3 pdf_summary.py <file.pdf>`. Text comes from pdf_extract
+# (parallel pages, OCR only for scans, per-page cache); long documents go
+# through the same map-reduce chunker as articles.
+
+import argparse
+import asyncio
+import os
+
+import pdf_extract
+from chunker import CHUNK_TOKENS, count_tokens, map_reduce_summary
+from llm_client import LLMClient
+from summary_cache import SummaryCache
+from telegram_delivery import TelegramDelivery
+
+# Telegram Bot Configuration
+BOT_TOKEN = 'XXXX'  # Replace with your bot token
+CHAT_ID = 'XXXX'  # Replace with your Telegram chat ID
+
+LLM_API_URL = "http://10.1.1.96:1234/v1/chat/completions"
+LLM_MODEL = "llama 3.2 8b"
+LLM_SYSTEM_PROMPT = "Summarize the content of this document. Ensure all responses are in English."
+LLM_TEMPERATURE = 0.7
+
+# Extraction counts for 80% of the job's progress, summarizing for the rest
+EXTRACT_SHARE = 0.8
+
+
+class PdfSummaryError(Exception):
+    pass
+
+
+def report_progress(fraction, note):
+    print(f"PROGRESS {fraction:.3f} {note}", flush=True)
+
+
+async def summarize(title, content):
+    """Summarizes document text, chunking it when it exceeds the context budget."""
+    cache = SummaryCache()
+
+    async with LLMClient(LLM_API_URL) as llm:
+        async def complete(system_prompt, user_content):
+            cached = cache.get(user_content, LLM_MODEL, system_prompt, LLM_TEMPERATURE)
+            if cached is not None:
+                return cached
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ]
+            summary = await llm.chat(LLM_MODEL, messages, temperature=LLM_TEMPERATURE)
+            cache.put(user_content, LLM_MODEL, system_prompt, LLM_TEMPERATURE, summary)
+            return summary
+
+        if count_tokens(content) <= CHUNK_TOKENS:
+            return await complete(LLM_SYSTEM_PROMPT, f"Title: {title}\n\nContent: {content}")
+        return await map_reduce_summary(complete, title, content)
+
+
+async def send_summary(title, summary):
+    async with TelegramDelivery(BOT_TOKEN, CHAT_ID) as delivery:
+        await delivery.deliver(f"{title}\n\n{summary}")
+
+
+def summarize_pdf(path, workers=pdf_extract.MAX_WORKERS, progress=report_progress, log=print):
+    """Extracts, summarizes and sends one PDF; progress(fraction, note) and log(line) report on it."""
+    title = os.path.basename(path)
+    reported = [-1]
+
+    def on_pages(done, total):
+        # One progress update per percent, not per page
+        percent = 100 * done // total if total else 100
+        if percent != reported[0]:
+            reported[0] = percent
+            progress(EXTRACT_SHARE * percent / 100, f"{done}/{total} pages")
+
+    text, stats = pdf_extract.extract_text(
+        path, workers=workers, cache=pdf_extract.open_page_cache(), progress=on_pages
+    )
+    log(f"Extraction stats: {stats}")
+    if not text.strip():
+        raise PdfSummaryError(f"No text could be extracted from {title}.")
+
+    progress(EXTRACT_SHARE, "summarizing")
+    summary = asyncio.run(summarize(title, text))
+    progress(0.95, "sending to Telegram")
+    asyncio.run(send_summary(title, summary))
+    progress(1.0, "done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a PDF and send it to Telegram.")
+    parser.add_argument("pdf")
+    parser.add_argument("--workers", type=int, default=pdf_extract.MAX_WORKERS)
+    args = parser.parse_args()
+    try:
+        summarize_pdf(args.pdf, workers=args.workers)
+    except PdfSummaryError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":
+    main()
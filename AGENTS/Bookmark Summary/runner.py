@@ -1,190 +1,562 @@
+import argparse
 import asyncio
-from datetime import datetime
-from playwright.sync_api import sync_playwright
-import requests
+import contextlib
 import json
-from telegram import Bot
-import re
+import os
+import signal
+import time
+from datetime import datetime
+import aiohttp
+
+import bookmark_store
+import compaction
+import metrics
+from browser_pool import BrowserPool
+from fetcher import Fetcher
+from host_scheduler import HostBusy, HostScheduler, interleave_by_host
+from chunker import CHUNK_TOKENS, count_tokens, map_reduce_summary
+from llm_client import LLMClient, LLMError
+from metrics import RATIO_BUCKETS, registry, span
+from near_dup import Deduper
+from scrape_cache import ScrapeCache
+from store_watcher import StoreWatcher
+from summary_cache import SummaryCache
+from url_canon import canonical_url
+from telegram_delivery import TelegramDelivery
 
 # Telegram Bot Configuration
 BOT_TOKEN = 'XXXX'  # Replace with your bot token
 CHAT_ID = 'XXXX'  # Replace with your Telegram chat ID
 
-# Configuration file path
-BOOKMARK_FILE = "/home/debian/bookmark_bot/bookmarks.txt"
+# Bookmark store (bookmarks.txt is imported into it once, then renamed)
+BOOKMARK_DB = bookmark_store.DB_FILE
+BOOKMARK_FILE = bookmark_store.LEGACY_BOOKMARK_FILE
 ARTICLE_LIMIT = 1  # Limit on the number of articles to summarize per run
 
-# Function to send messages via Telegram
-async def send_message_to_telegram(message):
-    bot = Bot(token=BOT_TOKEN)
-    
-    # Escape special characters for Markdown
-    def escape_markdown(text):
-        escape_chars = r"_*[]()~`>#+-=|{}.!"
-        return re.sub(f"([{re.escape(escape_chars)}])", r"\\\1", text)
-
-    # Escape the message
-    escaped_message = escape_markdown(message)
-
-    # Split message if it exceeds Telegram's 4096-character limit
-    max_length = 4096
-    if len(escaped_message) > max_length:
-        chunks = [escaped_message[i:i + max_length] for i in range(0, len(escaped_message), max_length)]
-        for chunk in chunks:
-            await bot.send_message(chat_id=CHAT_ID, text=chunk, parse_mode="MarkdownV2")
-    else:
-        await bot.send_message(chat_id=CHAT_ID, text=escaped_message, parse_mode="MarkdownV2")
+# Pipeline concurrency: workers per stage and the size of the queues between them
+SCRAPE_CONCURRENCY = 2
+SUMMARY_CONCURRENCY = 1
+DELIVERY_CONCURRENCY = 1
+STAGE_QUEUE_SIZE = 4
+# Bookmarks admitted beyond what the limit still needs, so one failed scrape doesn't stall the run
+RETRY_MARGIN = 1
+# Bookmarks the host scheduler picks from when choosing which site to fetch next
+SCRAPE_WINDOW = 16
 
-# Function to read bookmarks from the file
-def read_bookmarks(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            bookmarks = []
-            for line in file.readlines():
-                url, date_added, too_large = line.strip().split(',')
-                bookmarks.append({
-                    "url": url,
-                    "date_added": date_added,
-                    "too_large": too_large == "true"
-                })
-            return bookmarks
-    except FileNotFoundError:
-        print(f"Error: {file_path} not found.")
-        return []
-
-# Function to remove a bookmark from the file
-def remove_bookmark(file_path, url):
-    bookmarks = read_bookmarks(file_path)
-    for bookmark in bookmarks:
-        if bookmark["url"] == url:
-            bookmarks.remove(bookmark)
-            break
-    with open(file_path, "w") as file:
-        for bookmark in bookmarks:
-            file.write(f"{bookmark['url']},{bookmark['date_added']},{str(bookmark['too_large']).lower()}\n")
-
-# Function to update the "too_large" flag
-def update_size_flag(file_path, url, is_too_large):
-    bookmarks = read_bookmarks(file_path)
-    for bookmark in bookmarks:
-        if bookmark["url"] == url:
-            bookmark["too_large"] = is_too_large
-            break
-    with open(file_path, "w") as file:
-        for bookmark in bookmarks:
-            file.write(f"{bookmark['url']},{bookmark['date_added']},{str(bookmark['too_large']).lower()}\n")
-
-# Scraping with Playwright
-def scrape_website(url):
+# Pages above this are flagged too_large instead of being chunked
+MAX_PAGE_TOKENS = 400000
+# Failed scrapes/summaries are retried on later runs up to this many times
+MAX_ATTEMPTS = 3
+
+# Scraping with the shared Playwright browser pool
+_browser_pool = None
+
+async def get_browser_pool():
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = await BrowserPool(size=SCRAPE_CONCURRENCY).start()
+    return _browser_pool
+
+async def close_browser_pool():
+    global _browser_pool
+    if _browser_pool is not None:
+        print(f"Browser pool: {_browser_pool.stats()}")
+        await _browser_pool.close()
+        _browser_pool = None
+
+_scrape_cache = None
+
+def get_scrape_cache():
+    global _scrape_cache
+    if _scrape_cache is None:
+        _scrape_cache = ScrapeCache()
+    return _scrape_cache
+
+async def scrape_website(fetcher, url):
     print(f"Scraping website: {url}")
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/114.0.0.0 Safari/537.36"
-            )
-        )
-        page = context.new_page()
-        page.goto(url)
-        page.wait_for_selector("body")
-        
-        # Extract visible content
-        data = {
-            "title": page.title(),
-            "meta_description": page.evaluate("() => document.querySelector('meta[name=\"description\"]')?.content || 'No Description'"),
-            "content": page.evaluate("() => document.body.innerText"),
-        }
-        browser.close()
-        return data
-
-# Check and update size flag
-def check_and_update_size(file_path, url, content):
-    token_limit = 60000  # Token limit for flagging too large
-    token_count = len(content.split()) * 2  # Approximate token count using word count
-    is_too_large = token_count >= token_limit
-    update_size_flag(file_path, url, is_too_large)
+    with span("scrape", url=url):
+        return await fetcher.fetch(url)
+
+# Flag pages too big to be worth summarizing even in chunks
+def check_and_update_size(url, content):
+    with span("tokenize", url=url):
+        is_too_large = count_tokens(content) >= MAX_PAGE_TOKENS
+    if is_too_large:
+        bookmark_store.set_status(url, bookmark_store.STATUS_TOO_LARGE, BOOKMARK_DB)
     return is_too_large
 
+# Cut the page down to its main content before it reaches the LLM
+def compact_content(url, data):
+    with span("compact", url=url):
+        data["content"], stats = compaction.compact(data)
+    print(f"Prompt for {url}: {stats['tokens_in']} -> {stats['tokens_out']} tokens "
+          f"({stats['ratio']:.0%} of the page text).")
+    registry.inc("prompt_tokens_total", stats["tokens_in"], stage="scraped")
+    registry.inc("prompt_tokens_total", stats["tokens_out"], stage="compacted")
+    registry.observe("prompt_compaction_ratio", stats["ratio"], buckets=RATIO_BUCKETS)
+    metrics.note("compaction", url=url, **stats)
+
 # Summarization with External API
-def summarize_with_external_api(data):
-    api_url = "http://10.1.1.96:1234/v1/chat/completions"  # Endpoint from Script A
-    payload = {
-        "model": "llama 3.2 8b",
-        "messages": [
-            {
-                "role": "system",
-                "content": "Summarize the content of this webpage. Ensure all responses are in English."
-            },
-            {
-                "role": "user",
-                "content": f"Title: {data['title']}\n\nContent: {data['content']}",
-            }
-        ],
-        "temperature": 0.7,
-        "max_tokens": -1,
-        "stream": False
-    }
-    headers = {"Content-Type": "application/json"}
+LLM_API_URL = "http://10.1.1.96:1234/v1/chat/completions"  # Endpoint from Script A
+LLM_MODEL = "llama 3.2 8b"
+LLM_SYSTEM_PROMPT = "Summarize the content of this webpage. Ensure all responses are in English."
+LLM_TEMPERATURE = 0.7
+
+_summary_cache = None
+
+def get_summary_cache():
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = SummaryCache()
+    return _summary_cache
+
+async def complete(llm, system_prompt, user_content):
+    """Sends one chat completion (or serves it from the summary cache); raises LLMError."""
+    cache = get_summary_cache()
+    cached = cache.get(user_content, LLM_MODEL, system_prompt, LLM_TEMPERATURE)
+    if cached is not None:
+        print("Using cached summary.")
+        return cached
+
+    messages = [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": user_content,
+        }
+    ]
+    summary = await llm.chat(LLM_MODEL, messages, temperature=LLM_TEMPERATURE)
+    cache.put(user_content, LLM_MODEL, system_prompt, LLM_TEMPERATURE, summary)
+    return summary
+
+async def summarize_with_external_api(llm, data):
+    """Summarizes a page, chunking it when it exceeds the context budget; returns None on error."""
+    async def run(system_prompt, user_content):
+        return await complete(llm, system_prompt, user_content)
 
     try:
-        response = requests.post(api_url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        result = response.json()
-        summary = result.get("choices", [{}])[0].get("message", {}).get("content", "No summary available.")
-        return summary
-    except requests.RequestException as e:
+        with span("summarize", title=data["title"]):
+            with span("tokenize"):
+                fits = count_tokens(data["content"]) <= CHUNK_TOKENS
+            if fits:
+                return await run(LLM_SYSTEM_PROMPT, f"Title: {data['title']}\n\nContent: {data['content']}")
+            return await map_reduce_summary(run, data["title"], data["content"])
+    except LLMError as e:
         print(f"Error calling API: {e}")
-        return "Error: Unable to summarize content."
+        return None
 
-# Main Function
-def main():
-    bookmarks = read_bookmarks(BOOKMARK_FILE)
-    if not bookmarks:
-        print("No URLs found in bookmarks file.")
-        return
+# Bookmarks the stages can hold at once: queued or being worked on in each stage
+def pipeline_capacity():
+    return (SCRAPE_WINDOW + SCRAPE_CONCURRENCY + STAGE_QUEUE_SIZE + SUMMARY_CONCURRENCY
+            + STAGE_QUEUE_SIZE + DELIVERY_CONCURRENCY)
 
-    summaries = []
-    articles_processed = 0
-    for bookmark in bookmarks:
-        if articles_processed >= ARTICLE_LIMIT:
-            break
+# Admits only the bookmarks the limit still needs (plus RETRY_MARGIN), and
+# tops up as admitted ones fail; in-flight work is also bounded by the stages'
+# capacity. A summary is only started when, should every summary already
+# started be delivered, the limit would still not be reached, so no article
+# is summarized beyond the limit. Bookmarks still in the pipeline once the
+# limit is reached are left pending for the next run, their scrape cached.
+class ArticleBudget:
+    def __init__(self, limit, capacity, margin=RETRY_MARGIN):
+        self.limit = limit
+        self.capacity = capacity
+        self.margin = margin
+        self.in_flight = 0
+        self.claimed = 0
+        self.succeeded = 0
+        self.left_pending = 0
+        self._cond = asyncio.Condition()
 
-        url = bookmark["url"]
-        if bookmark["too_large"]:
-            continue
+    @property
+    def done(self):
+        return self.succeeded >= self.limit
+
+    def _room(self):
+        return self.in_flight < min(self.capacity, self.limit - self.succeeded + self.margin)
+
+    async def reserve(self):
+        """Waits until another bookmark is needed; returns False once the limit has been reached."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.done or self._room())
+            if self.done:
+                return False
+            self.in_flight += 1
+            return True
+
+    async def claim(self):
+        """Waits until summarizing one more article can't overshoot the limit; False once it's reached."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.done or self.succeeded + self.claimed < self.limit)
+            if self.done:
+                return False
+            self.claimed += 1
+            return True
 
+    async def finish(self, success, claimed=False):
+        async with self._cond:
+            self.in_flight -= 1
+            if claimed:
+                self.claimed -= 1
+            if success:
+                self.succeeded += 1
+            self._cond.notify_all()
+
+    async def leave_pending(self):
+        """Drops a bookmark from this run untouched, because the limit is (about to be) reached."""
+        self.left_pending += 1
+        await self.finish(False)
+
+# Bookmarks for a page that was already delivered skip the LLM. A copy of a page
+# that is still in flight in this run stays pending: if that one fails, the
+# copy is summarized next run, and if it is delivered, the copy is collapsed then.
+def mark_duplicate(url, duplicate_of, deduper):
+    """Marks the bookmark a duplicate if its original was delivered; returns whether it did."""
+    if not deduper.is_delivered(duplicate_of):
+        print(f"{url} is the same page as {duplicate_of}, which is still in progress; leaving it for the next run.")
+        return False
+    print(f"{url} is the same page as {duplicate_of}; not summarizing it again.")
+    bookmark_store.set_status(url, bookmark_store.STATUS_DUPLICATE, BOOKMARK_DB)
+    registry.inc("articles_total", outcome="duplicate")
+    return True
+
+# Rate-limited bookmarks stay pending, without counting as a failed attempt, but
+# are not picked up again until the host's pause is over
+async def leave_for_next_run(url, reason, retry_after, budget, deduper):
+    print(f"{reason}; leaving {url} for the next run.")
+    bookmark_store.defer_bookmark(url, retry_after, BOOKMARK_DB)
+    registry.inc("articles_total", outcome="host_busy")
+    deduper.release(url)
+    await budget.finish(False)
+
+# Pipeline stages: each worker pulls from its input queue and pushes to the next.
+# The scrape queue is a HostScheduler, which decides which site is fetched next.
+async def scrape_worker(fetcher, scrape_queue, summary_queue, budget, deduper):
+    while True:
+        bookmark = await scrape_queue.get()
+        url = bookmark["url"]
         try:
-            data = scrape_website(url)
-            content = data["content"]
-            if check_and_update_size(BOOKMARK_FILE, url, content):
+            if budget.done:
+                deduper.release(url)
+                await budget.leave_pending()
                 continue
-
-            summary = summarize_with_external_api(data)
-            if "Error" in summary:
-                print(f"Marking URL {url} as too large due to summarization error.")
-                update_size_flag(BOOKMARK_FILE, url, True)  # Mark as too large
+            if scrape_queue.is_closed(url):
+                await leave_for_next_run(url, "Host asked for a long pause", scrape_queue.pause_left(url),
+                                         budget, deduper)
                 continue
-
-            title_with_link = f"[{data['title']}]({url})"
-            summaries.append(f"{title_with_link}\n\n{summary}\n{'-'*40}")
-            remove_bookmark(BOOKMARK_FILE, url)
-            articles_processed += 1
+            data = await scrape_website(fetcher, url)
+            if check_and_update_size(url, data["content"]):
+                registry.inc("articles_total", outcome="too_large")
+                deduper.release(url)
+                await budget.finish(False)
+                continue
+            # Tokenizing a long page takes a while; keep the event loop free
+            await asyncio.to_thread(compact_content, url, data)
+            with span("dedupe", url=url):
+                duplicate_of = deduper.check(url, data, bookmark.get("recheck", False))
+            if data["canonical"] != canonical_url(url):
+                # The page named its canonical URL; later imports of it will be recognised
+                bookmark_store.set_canonical(url, data["canonical"], BOOKMARK_DB)
+            if duplicate_of is not None:
+                if mark_duplicate(url, duplicate_of, deduper):
+                    deduper.skipped(count_tokens(data["content"]))
+                await budget.finish(False)
+            else:
+                await summary_queue.put((url, data))
+        except HostBusy as e:
+            registry.inc("host_busy_total", status=e.status)
+            if scrape_queue.defer(bookmark, e.retry_after):
+                print(f"{e}; {url} requeued.")
+            else:
+                await leave_for_next_run(url, str(e), e.retry_after, budget, deduper)
         except Exception as e:
             print(f"Error processing URL {url}: {e}")
+            bookmark_store.record_failure(url, MAX_ATTEMPTS, BOOKMARK_DB)
+            registry.inc("articles_total", outcome="scrape_failed")
+            deduper.release(url)
+            await budget.finish(False)
+        finally:
+            scrape_queue.task_done(bookmark)
 
-    # Send summaries via Telegram
-    if summaries:
-        content = "\n\n".join(summaries)
+async def summary_worker(llm, summary_queue, delivery_queue, budget, deduper):
+    while True:
+        url, data = await summary_queue.get()
+        claimed = False
         try:
-            asyncio.run(send_message_to_telegram(content))
+            claimed = await budget.claim()
+            if not claimed:
+                deduper.release(url)
+                await budget.leave_pending()
+                continue
+            started = time.monotonic()
+            summary = await summarize_with_external_api(llm, data)
+            if summary is None:
+                print(f"Summarization failed for {url}; will retry on a later run.")
+                bookmark_store.record_failure(url, MAX_ATTEMPTS, BOOKMARK_DB)
+                registry.inc("articles_total", outcome="summary_failed")
+                deduper.release(url)
+                await budget.finish(False, claimed=True)
+            else:
+                deduper.observe_summary(time.monotonic() - started, count_tokens(data["content"]))
+                await delivery_queue.put((url, data, summary))
         except Exception as e:
-            print(f"Error sending message to Telegram: {e}")
-    else:
+            print(f"Error processing URL {url}: {e}")
+            deduper.release(url)
+            await budget.finish(False, claimed=claimed)
+        finally:
+            summary_queue.task_done()
+
+async def delivery_worker(delivery, delivery_queue, budget, deduper):
+    while True:
+        # Summaries only get here after budget.claim(), so delivering them can't overshoot the limit
+        url, data, summary = await delivery_queue.get()
         try:
-            asyncio.run(send_message_to_telegram("No summaries generated."))
+            title_with_link = f"[{data['title']}]({url})"
+            await delivery.deliver(f"{title_with_link}\n\n{summary}\n{'-'*40}")
+            bookmark_store.remove_bookmark(url, BOOKMARK_DB)
+            bookmark_store.record_seen_page(data["canonical"], data.get("sketch"), data["title"], BOOKMARK_DB)
+            deduper.mark_delivered(url)
+            registry.inc("articles_total", outcome="delivered")
+            await budget.finish(True, claimed=True)
         except Exception as e:
             print(f"Error sending message to Telegram: {e}")
+            registry.inc("articles_total", outcome="delivery_failed")
+            deduper.release(url)
+            await budget.finish(False, claimed=True)
+        finally:
+            delivery_queue.task_done()
+
+# Long-lived clients shared by every pipeline run in this process
+class PipelineResources:
+    async def __aenter__(self):
+        self._stack = contextlib.AsyncExitStack()
+        connector = aiohttp.TCPConnector(limit=SCRAPE_CONCURRENCY * 4, limit_per_host=SCRAPE_CONCURRENCY)
+        self.session = await self._stack.enter_async_context(aiohttp.ClientSession(connector=connector))
+        self.llm = await self._stack.enter_async_context(LLMClient(LLM_API_URL))
+        self.delivery = await self._stack.enter_async_context(TelegramDelivery(BOT_TOKEN, CHAT_ID))
+        self.fetcher = Fetcher(self.session, get_browser_pool, get_scrape_cache())
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            await close_browser_pool()
+            self.print_stats()
+        finally:
+            await self._stack.aclose()
+
+    def print_stats(self):
+        print(f"Fetch tiers: {self.fetcher.stats()}")
+        if _scrape_cache is not None:
+            print(f"Scrape cache: {_scrape_cache.stats()}")
+        if _summary_cache is not None:
+            print(f"Summary cache: {_summary_cache.stats()}")
+
+async def run_pipeline(bookmarks, resources, limit=ARTICLE_LIMIT):
+    """Runs scrape -> summarize -> deliver as concurrent stages; returns the number delivered."""
+    scrape_queue = HostScheduler(SCRAPE_WINDOW)
+    summary_queue = asyncio.Queue(STAGE_QUEUE_SIZE)
+    delivery_queue = asyncio.Queue(STAGE_QUEUE_SIZE)
+    budget = ArticleBudget(limit, pipeline_capacity())
+    deduper = Deduper(bookmark_store.seen_pages(BOOKMARK_DB))
+    metrics.start_report()
+    registry.gauge_callback("queue_depth", scrape_queue.qsize, queue="scrape")
+    registry.gauge_callback("queue_depth", summary_queue.qsize, queue="summary")
+    registry.gauge_callback("queue_depth", delivery_queue.qsize, queue="delivery")
+    registry.gauge_callback("queue_depth", resources.delivery.qsize, queue="telegram")
+
+    workers = (
+        [asyncio.create_task(scrape_worker(resources.fetcher, scrape_queue, summary_queue, budget, deduper)) for _ in range(SCRAPE_CONCURRENCY)]
+        + [asyncio.create_task(summary_worker(resources.llm, summary_queue, delivery_queue, budget, deduper)) for _ in range(SUMMARY_CONCURRENCY)]
+        + [asyncio.create_task(delivery_worker(resources.delivery, delivery_queue, budget, deduper)) for _ in range(DELIVERY_CONCURRENCY)]
+    )
+    try:
+        # Round-robin across sites, so one big blog archive doesn't fill the window
+        for bookmark in interleave_by_host(bookmarks):
+            # Copies of one URL (tracking params, AMP, ...) are collapsed before scraping
+            duplicate_of = deduper.claim_url(bookmark["url"], bookmark.get("recheck", False))
+            if duplicate_of is not None:
+                mark_duplicate(bookmark["url"], duplicate_of, deduper)
+                continue
+            if not await budget.reserve():
+                break
+            await scrape_queue.put(bookmark)
+
+        # Each stage is drained in order so nothing is still in flight upstream
+        await scrape_queue.join()
+        await summary_queue.join()
+        await delivery_queue.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if budget.left_pending:
+            print(f"Limit of {limit} reached; {budget.left_pending} bookmarks already started are left for the next run.")
+        dedupe = deduper.stats()
+        if dedupe["collapsed"]:
+            saved = dedupe["llm_seconds_saved"]
+            print(f"Collapsed {dedupe['collapsed']} duplicate bookmarks ({dedupe['by_url']} by URL, "
+                  f"{dedupe['by_content']} by content), skipping {dedupe['tokens_skipped']} prompt tokens; "
+                  f"LLM time saved: {'~%.0fs' % saved if saved is not None else 'unknown (no summaries this run)'}.")
+            if saved:
+                registry.inc("llm_seconds_saved_total", saved)
+        metrics.finish_report(
+            bookmarks=len(bookmarks),
+            delivered=budget.succeeded,
+            fetch_tiers=resources.fetcher.stats(),
+            dedupe=dedupe,
+            hosts=scrape_queue.stats(),
+            caches={
+                name: cache.stats()
+                for name, cache in (("scrape", _scrape_cache), ("summary", _summary_cache))
+                if cache is not None
+            },
+        )
+        registry.flush(force=True)
+
+    return budget.succeeded
+
+async def run_once():
+    bookmarks = bookmark_store.pending_bookmarks(db_path=BOOKMARK_DB)
+    if not bookmarks:
+        print("No URLs found in bookmark store.")
+        return
+
+    async with PipelineResources() as resources:
+        if not await run_pipeline(bookmarks, resources):
+            try:
+                await resources.delivery.deliver("No summaries generated.")
+            except Exception as e:
+                print(f"Error sending message to Telegram: {e}")
+
+# ------------------------------
+# Daemon mode: stay resident with warm browser/HTTP pools and react to store changes
+# ------------------------------
+DAEMON_BATCH_SIZE = 3               # Articles delivered per batch
+DAEMON_ARTICLES_PER_MINUTE = 2      # Drain rate; batches are spaced to respect it
+DAEMON_IDLE_RECHECK = 300           # Seconds to wait for a change before re-checking anyway
+DAEMON_RETRY_DELAY = 15 * 60        # Seconds before a failed bookmark is retried
+DAEMON_SHUTDOWN_GRACE = 60          # Seconds the current batch gets to finish on SIGTERM
+HEARTBEAT_FILE = "/home/debian/bookmark_bot/runner.heartbeat"
+HEARTBEAT_INTERVAL = 30
+
+class Heartbeat:
+    """Periodically rewrites a small JSON status file so supervisors can spot a hung daemon."""
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self.state = "starting"
+        self.delivered = 0
+        self.batches = 0
+
+    def write(self, **changes):
+        for key, value in changes.items():
+            setattr(self, key, value)
+        status = {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "started": self.started,
+            "state": self.state,
+            "delivered": self.delivered,
+            "batches": self.batches,
+        }
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(status, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not write heartbeat: {e}")
+
+    async def run(self):
+        while True:
+            self.write()
+            registry.flush(force=True)
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+async def _wait_unless_stopped(awaitable, stop):
+    """Waits for awaitable or the stop event; returns the awaitable's result, or None if stopped."""
+    task = asyncio.ensure_future(awaitable)
+    stopper = asyncio.create_task(stop.wait())
+    done, _ = await asyncio.wait({task, stopper}, return_when=asyncio.FIRST_COMPLETED)
+    stopper.cancel()
+    if task in done:
+        return task.result()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return None
+
+async def run_daemon():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    watcher = StoreWatcher(BOOKMARK_DB).start()
+    heartbeat = Heartbeat(HEARTBEAT_FILE)
+    heartbeat_task = asyncio.create_task(heartbeat.run())
+    print(f"Runner daemon started (watching store via {watcher.mode}).")
+    try:
+        async with PipelineResources() as resources:
+            while not stop.is_set():
+                bookmarks = bookmark_store.pending_bookmarks(
+                    limit=DAEMON_BATCH_SIZE * 4, db_path=BOOKMARK_DB, retry_delay=DAEMON_RETRY_DELAY
+                )
+                delivered = 0
+                if bookmarks:
+                    heartbeat.write(state="working")
+                    batch_started = time.monotonic()
+                    batch = asyncio.create_task(run_pipeline(bookmarks, resources, DAEMON_BATCH_SIZE))
+                    await _wait_unless_stopped(asyncio.shield(batch), stop)
+                    if not batch.done():
+                        print("Shutdown requested; letting the current batch finish.")
+                        try:
+                            await asyncio.wait_for(batch, DAEMON_SHUTDOWN_GRACE)
+                        except asyncio.TimeoutError:
+                            print("Current batch did not finish in time; cancelled.")
+                    if batch.done() and not batch.cancelled():
+                        if batch.exception() is not None:
+                            print(f"Batch failed: {batch.exception()!r}")
+                        else:
+                            delivered = batch.result()
+                    heartbeat.write(delivered=heartbeat.delivered + delivered, batches=heartbeat.batches + 1)
+
+                    # Space batches so the drain rate stays at DAEMON_ARTICLES_PER_MINUTE
+                    pause = delivered * 60 / DAEMON_ARTICLES_PER_MINUTE - (time.monotonic() - batch_started)
+                    if pause > 0:
+                        heartbeat.write(state="pacing")
+                        await _wait_unless_stopped(asyncio.sleep(pause), stop)
+
+                if not delivered and not stop.is_set():
+                    # Nothing to do (or everything failed or was deferred): sleep until the store
+                    # changes or the earliest rate-limited bookmark is due
+                    heartbeat.write(state="idle")
+                    timeout = DAEMON_IDLE_RECHECK
+                    due = bookmark_store.seconds_until_next_deferral(BOOKMARK_DB)
+                    if due is not None:
+                        timeout = min(timeout, due + 1)
+                    await _wait_unless_stopped(watcher.wait_for_change(timeout), stop)
+    finally:
+        watcher.stop()
+        heartbeat_task.cancel()
+        await asyncio.gather(heartbeat_task, return_exceptions=True)
+        heartbeat.write(state="stopped")
+        print("Runner daemon stopped.")
+
+# Main Function
+def main():
+    parser = argparse.ArgumentParser(description="Summarize saved bookmarks and send them to Telegram.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay resident and process new bookmarks as they are added")
+    args = parser.parse_args()
+
+    bookmark_store.init_db(BOOKMARK_DB, BOOKMARK_FILE)
+    if args.daemon:
+        asyncio.run(run_daemon())
+    else:
+        asyncio.run(run_once())
 
 if __name__ == "__main__":
     main()
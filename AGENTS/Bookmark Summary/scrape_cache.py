@@ -0,0 +1,69 @@
+# Scrape results cache keyed by normalized URL (url_canon.normalize_url).
+#
+# Stores the title, meta description and extracted text of a page together
+# with the ETag/Last-Modified validators the server sent. A later scrape of
+# the same URL (a retry, a re-queued bookmark, an EPUB conversion) first sends
+# a conditional GET and reuses the stored text on 304 instead of rendering the
+# page again. The request itself is made by fetcher.Fetcher, which keeps the
+# response body when the page has changed.
+
+import time
+
+from disk_cache import DiskCache
+from url_canon import normalize_url
+
+CACHE_FILE = "/home/debian/bookmark_bot/cache/scrape_cache.db"
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Entries without validators are trusted for this long before re-rendering
+FRESH_WITHOUT_VALIDATORS = 6 * 60 * 60
+
+
+class ScrapeCache:
+    def __init__(self, path=CACHE_FILE, max_bytes=CACHE_MAX_BYTES):
+        self.cache = DiskCache(path, max_bytes)
+        self.revalidated = 0
+        self.changed = 0
+
+    def get(self, url):
+        return self.cache.get(normalize_url(url))
+
+    def put(self, url, data, etag=None, last_modified=None):
+        self.cache.set(normalize_url(url), {
+            "title": data["title"],
+            "meta_description": data["meta_description"],
+            "content": data["content"],
+            "main_content": data.get("main_content"),
+            "canonical_url": data.get("canonical_url"),
+            "etag": etag,
+            "last_modified": last_modified,
+        })
+
+    def is_fresh(self, entry):
+        """Entries without validators can't be revalidated, so they are trusted for a while."""
+        if entry.get("etag") or entry.get("last_modified"):
+            return False
+        return time.time() - entry["created_at"] < FRESH_WITHOUT_VALIDATORS
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def mark_revalidated(self, url):
+        self.revalidated += 1
+        self.cache.touch(normalize_url(url))
+
+    def mark_changed(self):
+        self.changed += 1
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats["revalidated"] = self.revalidated
+        stats["changed"] = self.changed
+        return stats
+
+    def close(self):
+        self.cache.close()
@@ -0,0 +1,105 @@
+# Production entry point for the endpoint.py Flask app.
+#
+# Runs the app under gunicorn: a pre-fork master with several worker
+# processes, each serving requests on a small thread pool, so one slow EPUB
+# conversion or large upload no longer blocks every other page. Send SIGHUP
+# to the master for a graceful reload (new workers start, old ones finish
+# their requests); SIGTERM shuts down gracefully.
+#
+# Background jobs (EPUB conversions, PDF summaries) don't run in the web
+# workers, which are recycled every MAX_REQUESTS requests and replaced on
+# reload. The master starts one job process (web_jobs.py) next to them and,
+# on shutdown, stops it once its running jobs have finished.
+#
+#   python3 serve.py                      # 0.0.0.0:80 with the defaults below
+#   python3 serve.py --bind 127.0.0.1:8080 --workers 4 --threads 8
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from job_queue import DRAIN_TIMEOUT
+
+BIND = "0.0.0.0:80"
+WORKERS = min(multiprocessing.cpu_count() * 2 + 1, 8)
+THREADS = 4                # Threads per worker (gthread worker class)
+TIMEOUT = 300              # Seconds a request may run before its worker is restarted
+GRACEFUL_TIMEOUT = 30      # Seconds workers get to finish requests on reload/shutdown
+KEEPALIVE = 5              # Seconds to keep idle client connections open
+MAX_REQUESTS = 2000        # Recycle workers periodically to cap memory growth
+MAX_REQUESTS_JITTER = 200
+JOB_PROCESS = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_jobs.py")]
+
+_job_process = None
+
+
+def start_job_process(server):
+    """Starts the job process, or restarts it if it has died (checked again on every reload)."""
+    global _job_process
+    if _job_process is None or _job_process.poll() is not None:
+        _job_process = subprocess.Popen(JOB_PROCESS)
+        server.log.info("Started job process %s", _job_process.pid)
+
+
+def stop_job_process(server):
+    """Asks the job process to stop and waits for its running jobs to finish."""
+    if _job_process is None or _job_process.poll() is not None:
+        return
+    _job_process.terminate()
+    try:
+        _job_process.wait(DRAIN_TIMEOUT + 10)
+    except subprocess.TimeoutExpired:
+        _job_process.kill()
+
+
+class EndpointApplication(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        # Imported in each worker (no preload) so SQLite connections and
+        # thread pools are never shared across a fork, and SIGHUP reloads code.
+        from endpoint import app
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve endpoint.py with gunicorn.")
+    parser.add_argument("--bind", default=BIND)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    parser.add_argument("--timeout", type=int, default=TIMEOUT)
+    parser.add_argument("--keepalive", type=int, default=KEEPALIVE)
+    parser.add_argument("--graceful-timeout", type=int, default=GRACEFUL_TIMEOUT)
+    parser.add_argument("--access-log", default=None, help="access log path, or - for stdout")
+    args = parser.parse_args()
+
+    EndpointApplication({
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": args.keepalive,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "accesslog": args.access_log,
+        "on_starting": start_job_process,
+        "on_reload": start_job_process,
+        "on_exit": stop_job_process,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Change notifications for the bookmark store.
+#
+# Uses inotify (via the optional inotify_simple package) on the directory
+# holding the SQLite database so writes from endpoint.py wake the runner
+# daemon within milliseconds. Without inotify it polls the mtimes of the
+# database and its WAL file instead.
+
+import asyncio
+import os
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+POLL_INTERVAL = 2.0  # Seconds between mtime checks when inotify is unavailable
+
+
+class StoreWatcher:
+    def __init__(self, db_path, poll_interval=POLL_INTERVAL):
+        self.db_path = db_path
+        self.directory = os.path.dirname(os.path.abspath(db_path))
+        self.names = {os.path.basename(db_path), os.path.basename(db_path) + "-wal"}
+        self.poll_interval = poll_interval
+        self._changed = asyncio.Event()
+        self._inotify = None
+        self._poller = None
+        self._mtimes = self._stat()
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify is not None else "poll"
+
+    def start(self):
+        if INotify is not None:
+            try:
+                self._inotify = INotify()
+                self._inotify.add_watch(self.directory, flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+                asyncio.get_running_loop().add_reader(self._inotify.fileno(), self._on_inotify)
+                return self
+            except OSError as e:
+                print(f"inotify unavailable ({e}); falling back to polling.")
+                self._inotify = None
+        self._poller = asyncio.create_task(self._poll())
+        return self
+
+    def stop(self):
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fileno())
+            self._inotify.close()
+            self._inotify = None
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def _on_inotify(self):
+        for event in self._inotify.read(timeout=0):
+            if event.name in self.names:
+                self._changed.set()
+
+    def _stat(self):
+        mtimes = {}
+        for name in self.names:
+            try:
+                mtimes[name] = os.stat(os.path.join(self.directory, name)).st_mtime_ns
+            except FileNotFoundError:
+                mtimes[name] = None
+        return mtimes
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            mtimes = self._stat()
+            if mtimes != self._mtimes:
+                self._mtimes = mtimes
+                self._changed.set()
+
+    async def wait_for_change(self, timeout=None):
+        """Waits until the store changes or `timeout` seconds pass; returns True on change."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._changed.clear()
+        return True
@@ -0,0 +1,45 @@
+# Memoized LLM summaries keyed by what actually determines the output.
+#
+# The key is a hash of the normalized prompt content plus the model name,
+# system prompt and temperature, so the same article saved under a different
+# URL, or re-run after a failed Telegram delivery, is a lookup instead of a
+# fresh generation.
+
+import hashlib
+import re
+
+from disk_cache import DiskCache
+
+CACHE_FILE = "/home/debian/bookmark_bot/cache/summary_cache.db"
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_content(text):
+    """Collapses whitespace so cosmetic differences don't change the key."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def summary_key(content, model, system_prompt, temperature):
+    digest = hashlib.sha256()
+    for part in (normalize_content(content), model, system_prompt, repr(float(temperature))):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, path=CACHE_FILE, max_bytes=CACHE_MAX_BYTES):
+        self.cache = DiskCache(path, max_bytes)
+
+    def get(self, content, model, system_prompt, temperature):
+        entry = self.cache.get(summary_key(content, model, system_prompt, temperature))
+        return entry["summary"] if entry else None
+
+    def put(self, content, model, system_prompt, temperature, summary):
+        self.cache.set(summary_key(content, model, system_prompt, temperature), {"summary": summary})
+
+    def stats(self):
+        return self.cache.stats()
+
+    def close(self):
+        self.cache.close()
@@ -0,0 +1,158 @@
+# Telegram delivery with one shared Bot and a rate-limited send queue.
+#
+# Messages are escaped for MarkdownV2 first and then split on paragraph, line
+# or word boundaries, never between a backslash and the character it escapes.
+# A single sender task spaces messages to stay under Telegram's per-chat and
+# global limits and waits out 429 `retry_after` responses.
+
+import asyncio
+import re
+import time
+from datetime import timedelta
+
+from telegram import Bot
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+from metrics import registry, span
+
+API_URL = "https://api.telegram.org/bot"  # Bot API base; the token and method are appended
+MAX_MESSAGE_LENGTH = 4096
+PRIVATE_CHAT_INTERVAL = 1.0   # Seconds between messages to one private chat
+GROUP_CHAT_INTERVAL = 3.0     # Groups are limited to 20 messages a minute
+GLOBAL_INTERVAL = 1 / 30      # Bot-wide limit of ~30 messages a second
+MAX_SEND_ATTEMPTS = 5
+
+_ESCAPE_CHARS = r"_*[]()~`>#+-=|{}.!"
+
+
+def escape_markdown(text):
+    """Escapes every MarkdownV2 special character."""
+    return re.sub(f"([{re.escape(_ESCAPE_CHARS)}\\\\])", r"\\\1", text)
+
+
+def _safe_cut(text, cut):
+    """Moves a cut point back so it doesn't separate a backslash from what it escapes."""
+    backslashes = 0
+    while cut - backslashes - 1 >= 0 and text[cut - backslashes - 1] == "\\":
+        backslashes += 1
+    return cut - 1 if backslashes % 2 else cut
+
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Splits escaped text into chunks of at most `limit` characters on natural boundaries."""
+    chunks = []
+    while len(text) > limit:
+        window = text[:limit]
+        for separator in ("\n\n", "\n", " "):
+            cut = window.rfind(separator)
+            if cut > limit // 4:
+                break
+        else:
+            cut = limit
+        cut = _safe_cut(text, cut)
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def _retry_seconds(error):
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class TelegramDelivery:
+    """Queues messages for one or more chats and sends them within rate limits.
+
+    Use as `async with TelegramDelivery(token, chat_id) as delivery:` and
+    `await delivery.deliver(text)`, which resolves once every part is sent.
+    """
+
+    def __init__(self, token, chat_id, bot=None):
+        self.chat_id = chat_id
+        self.bot = bot or Bot(token=token, base_url=API_URL)
+        self._queue = asyncio.Queue()
+        self._sender = None
+        self._last_sent = {}
+        self._last_global = 0.0
+        self.sent = 0
+        self.retries = 0
+
+    async def __aenter__(self):
+        await self.bot.initialize()
+        self._sender = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._sender is not None:
+            await self._queue.join()
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+            self._sender = None
+        await self.bot.shutdown()
+
+    def enqueue(self, text, chat_id=None, escape=True):
+        """Queues a message and returns a future resolved when it has been delivered."""
+        with span("escape"):
+            body = escape_markdown(text) if escape else text
+            parts = split_message(body)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((chat_id or self.chat_id, parts, future))
+        return future
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    async def deliver(self, text, chat_id=None, escape=True):
+        await self.enqueue(text, chat_id=chat_id, escape=escape)
+
+    async def _run(self):
+        while True:
+            chat_id, parts, future = await self._queue.get()
+            try:
+                for part in parts:
+                    await self._send(chat_id, part)
+                if not future.done():
+                    future.set_result(len(parts))
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _wait_for_slot(self, chat_id):
+        interval = GROUP_CHAT_INTERVAL if str(chat_id).startswith("-") else PRIVATE_CHAT_INTERVAL
+        now = time.monotonic()
+        ready_at = max(self._last_sent.get(chat_id, 0.0) + interval, self._last_global + GLOBAL_INTERVAL)
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    async def _send(self, chat_id, text):
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            await self._wait_for_slot(chat_id)
+            try:
+                with span("send"):
+                    await self.bot.send_message(chat_id=chat_id, text=text, parse_mode="MarkdownV2")
+                self._last_sent[chat_id] = self._last_global = time.monotonic()
+                self.sent += 1
+                registry.inc("telegram_messages_total")
+                return
+            except RetryAfter as e:
+                delay = _retry_seconds(e)
+                print(f"Telegram rate limit hit; retrying in {delay:.0f}s.")
+            except (TimedOut, NetworkError) as e:
+                if attempt == MAX_SEND_ATTEMPTS - 1:
+                    raise
+                delay = 2 ** attempt
+                print(f"Telegram send failed ({e}); retrying in {delay}s.")
+            self.retries += 1
+            registry.inc("telegram_retries_total")
+            self._last_sent[chat_id] = time.monotonic()
+            await asyncio.sleep(delay)
+        raise TimedOut(f"Giving up on Telegram message after {MAX_SEND_ATTEMPTS} attempts")
@@ -0,0 +1,63 @@
+import asyncio
+
+from runner import ArticleBudget
+
+
+def test_only_the_limit_plus_the_margin_is_admitted():
+    async def run():
+        budget = ArticleBudget(limit=1, capacity=28, margin=1)
+        assert await budget.reserve() and await budget.reserve()
+        third = asyncio.create_task(budget.reserve())
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        # A failure tops the run up with another bookmark
+        await budget.finish(False)
+        assert await asyncio.wait_for(third, 1) is True
+        return budget
+
+    assert asyncio.run(run()).in_flight == 2
+
+
+def test_admission_stops_once_the_limit_is_delivered():
+    async def run():
+        budget = ArticleBudget(limit=1, capacity=28, margin=1)
+        await budget.reserve()
+        await budget.reserve()
+        waiting = asyncio.create_task(budget.reserve())
+        assert await budget.claim()
+        await budget.finish(True, claimed=True)
+        return await asyncio.wait_for(waiting, 1), budget.done
+
+    assert asyncio.run(run()) == (False, True)
+
+
+def test_no_summary_starts_beyond_the_limit():
+    async def run():
+        budget = ArticleBudget(limit=1, capacity=28, margin=1)
+        await budget.reserve()
+        await budget.reserve()
+        assert await budget.claim()
+        second = asyncio.create_task(budget.claim())
+        await asyncio.sleep(0.01)
+        assert not second.done()
+        # The first summary failed: the second one may go ahead
+        await budget.finish(False, claimed=True)
+        assert await asyncio.wait_for(second, 1) is True
+        await budget.finish(True, claimed=True)
+        return budget.done, budget.claimed
+
+    assert asyncio.run(run()) == (True, 0)
+
+
+def test_capacity_bounds_large_limits():
+    async def run():
+        budget = ArticleBudget(limit=100, capacity=3)
+        for _ in range(3):
+            await budget.reserve()
+        blocked = asyncio.create_task(budget.reserve())
+        await asyncio.sleep(0.01)
+        done = blocked.done()
+        blocked.cancel()
+        return done
+
+    assert asyncio.run(run()) is False
@@ -0,0 +1,98 @@
+import io
+import os
+import time
+
+import pytest
+
+import blob_store
+from blob_store import BlobStore, UploadTooLarge
+
+DATA = b"hello blobs" * 1000
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_same_bytes_are_stored_once(store, tmp_path):
+    digest, size, created = store.save_stream(io.BytesIO(DATA))
+    again, _, created_again = store.save_stream(io.BytesIO(DATA))
+    assert (again, size, created, created_again) == (digest, len(DATA), True, False)
+
+    store.link(digest, str(tmp_path / "a.txt"))
+    store.link(digest, str(tmp_path / "b.txt"))
+    assert (tmp_path / "a.txt").read_bytes() == DATA
+    assert os.path.samefile(tmp_path / "a.txt", store.blob_path(digest))
+    assert os.stat(store.blob_path(digest)).st_nlink == 3
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_oversized_upload_leaves_nothing_behind(store):
+    with pytest.raises(UploadTooLarge):
+        store.save_stream(io.BytesIO(DATA), max_bytes=10)
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_removing_the_last_name_deletes_the_blob(store, tmp_path):
+    digest, _, _ = store.save_stream(io.BytesIO(DATA))
+    store.link(digest, str(tmp_path / "a.txt"))
+    store.link(digest, str(tmp_path / "b.txt"))
+    age(store.blob_path(digest), blob_store.GC_GRACE_SECONDS + 60)
+
+    store.remove(str(tmp_path / "a.txt"))
+    assert os.path.exists(store.blob_path(digest))
+    store.remove(str(tmp_path / "b.txt"))
+    assert not os.path.exists(store.blob_path(digest))
+
+
+def test_unlinked_blobs_are_kept_for_the_grace_period(store, tmp_path):
+    digest, _, _ = store.save_stream(io.BytesIO(DATA))
+    assert store.collect_garbage() == 0
+    assert os.path.exists(store.blob_path(digest))
+
+    age(store.blob_path(digest), blob_store.GC_GRACE_SECONDS + 60)
+    assert store.collect_garbage() == 1
+    assert not os.path.exists(store.blob_path(digest))
+
+
+def test_reupload_restarts_grace_without_touching_linked_names(store, tmp_path):
+    digest, _, _ = store.save_stream(io.BytesIO(DATA))
+    store.link(digest, str(tmp_path / "a.txt"))
+    age(store.blob_path(digest), blob_store.GC_GRACE_SECONDS + 60)
+    listed_mtime = os.stat(tmp_path / "a.txt").st_mtime
+
+    store.save_stream(io.BytesIO(DATA))
+    # Every name shares the blob's inode, so its mtime must not move
+    assert os.stat(tmp_path / "a.txt").st_mtime == listed_mtime
+
+    # Its only name goes away before the new upload is linked: still kept
+    store.remove(str(tmp_path / "a.txt"))
+    assert store.collect_garbage() == 0
+    assert os.path.exists(store.blob_path(digest))
+
+    age(os.path.join(store.recent_dir, digest), blob_store.GC_GRACE_SECONDS + 60)
+    assert store.collect_garbage() == 1
+    assert os.listdir(store.recent_dir) == []
+
+
+def test_sweeps_are_rate_limited(store, tmp_path):
+    digest, _, _ = store.save_stream(io.BytesIO(DATA))
+    store.collect_garbage()
+    age(store.blob_path(digest), blob_store.GC_GRACE_SECONDS + 60)
+    assert store.collect_garbage_if_due() is None
+    age(store.gc_marker, blob_store.GC_INTERVAL + 60)
+    assert store.collect_garbage_if_due() == 1
+
+
+def test_adopt_links_existing_files_into_the_store(store, tmp_path):
+    (tmp_path / "a.txt").write_bytes(DATA)
+    (tmp_path / "b.txt").write_bytes(DATA)
+    digest = store.adopt(str(tmp_path / "a.txt"))
+    assert store.adopt(str(tmp_path / "b.txt")) == digest
+    assert os.path.samefile(tmp_path / "a.txt", tmp_path / "b.txt")
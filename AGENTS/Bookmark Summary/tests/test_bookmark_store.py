@@ -0,0 +1,148 @@
+import sqlite3
+
+import pytest
+
+import bookmark_store
+from bookmark_store import STATUS_DUPLICATE, STATUS_FAILED, STATUS_PENDING, STATUS_TOO_LARGE
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "bookmarks.db")
+
+
+def pending_by_url(db):
+    return {bookmark["url"]: bookmark for bookmark in bookmark_store.pending_bookmarks(db_path=db)}
+
+
+def test_old_database_gains_new_columns_and_canonical_keys(db):
+    old = sqlite3.connect(db)
+    old.executescript("""
+        CREATE TABLE bookmarks (
+            id INTEGER PRIMARY KEY, url TEXT NOT NULL, date_added TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending', updated_at TEXT
+        );
+        INSERT INTO bookmarks (url, date_added) VALUES ('https://Example.com/a?utm_source=x', '2020-01-01 00:00:00');
+    """)
+    old.close()
+
+    conn = bookmark_store.connect(db)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(bookmarks)")}
+    assert {"attempts", "canonical_url", "not_before", "recheck"} <= columns
+    assert conn.execute("SELECT canonical_url FROM bookmarks").fetchone()[0] == "https://example.com/a"
+    # The backfilled key is what duplicate detection goes by
+    assert not bookmark_store.add_bookmark("https://example.com/a", db_path=db)
+    assert pending_by_url(db)["https://Example.com/a?utm_source=x"]["recheck"] is False
+
+
+def test_legacy_text_file_is_imported_once(db, tmp_path):
+    legacy = tmp_path / "bookmarks.txt"
+    legacy.write_text(
+        "https://example.com/a,2020-01-01 00:00:00,False\n"
+        "https://example.com/b,2020-01-02 00:00:00,True\n"
+        "not a bookmark line\n"
+    )
+    bookmark_store.init_db(db, str(legacy))
+    assert not legacy.exists() and (tmp_path / "bookmarks.txt.imported").exists()
+    assert [(b["url"], b["status"]) for b in bookmark_store.get_bookmarks(db)] == [
+        ("https://example.com/a", STATUS_PENDING),
+        ("https://example.com/b", STATUS_TOO_LARGE),
+    ]
+
+
+def test_every_change_bumps_the_store_version(db):
+    versions = [bookmark_store.store_version(db)]
+    bookmark_store.add_bookmark("https://example.com/a", db_path=db)
+    versions.append(bookmark_store.store_version(db))
+    bookmark_store.set_status("https://example.com/a", STATUS_FAILED, db)
+    versions.append(bookmark_store.store_version(db))
+    bookmark_store.remove_bookmark("https://example.com/a", db)
+    versions.append(bookmark_store.store_version(db))
+    assert versions == sorted(set(versions))
+
+
+def test_failures_count_up_to_failed(db):
+    url = "https://example.com/flaky"
+    bookmark_store.add_bookmark(url, db_path=db)
+    bookmark_store.record_failure(url, 3, db)
+    bookmark_store.record_failure(url, 3, db)
+    assert url in pending_by_url(db)
+    # A recent failure waits out the retry delay
+    assert bookmark_store.pending_bookmarks(db_path=db, retry_delay=3600) == []
+    bookmark_store.record_failure(url, 3, db)
+    assert bookmark_store.count_by_status(db) == {STATUS_FAILED: 1}
+    assert pending_by_url(db) == {}
+
+
+def test_deferred_bookmarks_wait_their_turn(db):
+    bookmark_store.add_bookmarks([("https://example.com/a", None), ("https://example.com/b", None)], db_path=db)
+    assert bookmark_store.seconds_until_next_deferral(db) is None
+    bookmark_store.defer_bookmark("https://example.com/a", 600, db)
+    assert list(pending_by_url(db)) == ["https://example.com/b"]
+    assert 0 < bookmark_store.seconds_until_next_deferral(db) <= 600
+    bookmark_store.defer_bookmark("https://example.com/a", -1, db)
+    assert list(pending_by_url(db)) == ["https://example.com/a", "https://example.com/b"]
+
+
+def test_add_and_remove_single_bookmarks(db):
+    assert bookmark_store.add_bookmark("https://example.com/a", db_path=db)
+    assert not bookmark_store.add_bookmark("https://example.com/a/", db_path=db)
+    assert bookmark_store.remove_bookmark("https://example.com/a", db)
+    assert not bookmark_store.remove_bookmark("https://example.com/a", db)
+    assert bookmark_store.count_bookmarks(db) == 0
+
+
+def test_bookmarks_added_or_requeued_by_hand_are_rechecked(db):
+    bookmark_store.add_bookmark("https://example.com/by-hand", db_path=db)
+    bookmark_store.add_bookmarks([("https://example.com/imported", None)], db_path=db)
+    pending = pending_by_url(db)
+    assert pending["https://example.com/by-hand"]["recheck"] is True
+    assert pending["https://example.com/imported"]["recheck"] is False
+
+    bookmark_store.set_status("https://example.com/imported", STATUS_DUPLICATE, db)
+    assert bookmark_store.requeue_bookmarks(statuses=[STATUS_DUPLICATE], db_path=db) == 1
+    requeued = pending_by_url(db)["https://example.com/imported"]
+    assert requeued["status"] == STATUS_PENDING and requeued["recheck"] is True
+
+
+def test_seen_pages_expire(db):
+    bookmark_store.record_seen_page("https://example.com/old", None, "Old", db)
+    bookmark_store.record_seen_page("https://example.com/new", b"sketch", "New", db)
+    bookmark_store.connect(db).execute(
+        "UPDATE seen_pages SET date_seen = '2000-01-01 00:00:00' WHERE canonical_url = 'https://example.com/old'"
+    )
+    assert [tuple(row) for row in bookmark_store.seen_pages(db)] == [("https://example.com/new", b"sketch")]
+
+
+def test_bulk_import_skips_stored_and_repeated_links(db):
+    bookmark_store.add_bookmark("https://example.com/a", db_path=db)
+    entries = [
+        ("https://example.com/a?utm_source=feed", None),
+        ("https://example.com/b", "2024-01-02 03:04:05"),
+        ("https://EXAMPLE.com/b", None),
+        ("https://example.com/c", None),
+    ]
+    assert bookmark_store.add_bookmarks(entries, db_path=db) == (2, 2)
+    assert bookmark_store.count_bookmarks(db) == 3
+    assert pending_by_url(db)["https://example.com/b"]["date_added"] == "2024-01-02 03:04:05"
+    assert bookmark_store.add_bookmarks([], db_path=db) == (0, 0)
+
+
+def test_requeue_by_url_and_by_status(db):
+    urls = [f"https://example.com/{name}" for name in ("failed", "large", "pending", "other")]
+    bookmark_store.add_bookmarks([(url, None) for url in urls], db_path=db)
+    bookmark_store.set_status(urls[0], STATUS_FAILED, db)
+    bookmark_store.set_status(urls[1], STATUS_TOO_LARGE, db)
+    bookmark_store.set_status(urls[3], STATUS_FAILED, db)
+
+    # Bookmarks already pending with no attempts are left alone
+    assert bookmark_store.requeue_bookmarks(urls=[urls[1], urls[2]], db_path=db) == 1
+    assert bookmark_store.requeue_bookmarks(statuses=[STATUS_FAILED], db_path=db) == 2
+    assert set(pending_by_url(db)) == set(urls)
+    assert bookmark_store.requeue_bookmarks(urls=urls, statuses=[STATUS_FAILED], db_path=db) == 0
+
+
+def test_bulk_remove_counts_only_stored_bookmarks(db):
+    bookmark_store.add_bookmarks([("https://example.com/a", None), ("https://example.com/b", None)], db_path=db)
+    assert bookmark_store.remove_bookmarks(["https://example.com/a", "https://example.com/missing"], db) == 1
+    assert bookmark_store.count_bookmarks(db) == 1
@@ -0,0 +1,69 @@
+import asyncio
+
+from chunker import CHUNK_PROMPT, REDUCE_PROMPT, count_tokens, map_reduce_summary, split_into_chunks
+
+
+def paragraphs(n, words=60):
+    return "\n\n".join(" ".join(f"word{i}x{j}" for j in range(words)) + "." for i in range(n))
+
+
+def test_short_text_is_one_chunk():
+    assert split_into_chunks("One paragraph.\n\nAnother one.", budget=1000) == ["One paragraph.\n\nAnother one."]
+
+
+def test_chunks_stay_within_budget_and_keep_every_paragraph():
+    text = paragraphs(40)
+    budget = count_tokens(text) // 5
+    chunks = split_into_chunks(text, budget)
+    assert len(chunks) >= 5
+    assert all(count_tokens(chunk) <= budget for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+
+
+def test_oversized_paragraph_is_split_on_sentences():
+    sentences = [f"Sentence number {i} has a few words in it." for i in range(200)]
+    budget = count_tokens(" ".join(sentences)) // 4
+    chunks = split_into_chunks(" ".join(sentences), budget)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= budget for chunk in chunks)
+    assert " ".join(chunks).split() == " ".join(sentences).split()
+
+
+def test_heading_starts_a_new_chunk_once_half_full():
+    body = " ".join(["filler"] * 40) + "."
+    budget = count_tokens(body) * 2
+    chunks = split_into_chunks(f"{body}\n\n{body}\n\nSecond Section\n\n{body}", budget)
+    assert chunks[1].startswith("Second Section")
+
+
+def test_map_reduce_summarizes_every_chunk_then_merges():
+    calls = []
+
+    async def complete(system_prompt, user_content):
+        calls.append(system_prompt)
+        await asyncio.sleep(0)
+        return "partial" if system_prompt == CHUNK_PROMPT else "merged"
+
+    text = paragraphs(40)
+    budget = count_tokens(text) // 5
+    chunks = split_into_chunks(text, budget)
+    summary = asyncio.run(map_reduce_summary(complete, "Title", text, chunk_tokens=budget, reduce_tokens=budget))
+    assert summary == "merged"
+    assert calls.count(CHUNK_PROMPT) == len(chunks)
+    assert calls[-1] == REDUCE_PROMPT
+
+
+def test_map_reduce_respects_concurrency():
+    running = peak = 0
+
+    async def complete(system_prompt, user_content):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "s"
+
+    text = paragraphs(40)
+    asyncio.run(map_reduce_summary(complete, "T", text, chunk_tokens=count_tokens(text) // 8, concurrency=2))
+    assert peak == 2
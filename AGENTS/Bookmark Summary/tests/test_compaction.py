@@ -0,0 +1,57 @@
+from chunker import CHUNK_TOKENS, count_tokens
+from compaction import (
+    MAX_PROMPT_TOKENS, OMISSION_MARKER, SHORT_LINE_REPEATS, cap_tokens, collapse_whitespace, compact,
+    drop_repeated_lines,
+)
+
+
+def numbered_lines(n):
+    return "\n".join(f"Line {i} of the article carries its own distinct sentence." for i in range(n))
+
+
+def test_collapse_whitespace_drops_blank_lines_and_runs_of_spaces():
+    assert collapse_whitespace("  a \t b\xa0c \n\n\n  d  ") == "a b c\nd"
+
+
+def test_repeated_long_lines_are_kept_once():
+    line = "This sentence is long enough to be real content, not a button."
+    assert drop_repeated_lines(f"{line}\nother\n{line}") == f"{line}\nother"
+
+
+def test_frequent_short_lines_are_dropped_entirely():
+    text = "\n".join(["Reply", "first comment"] + ["Reply", "another comment"] * SHORT_LINE_REPEATS)
+    assert "Reply" not in drop_repeated_lines(text).split("\n")
+
+
+def test_cap_leaves_short_text_alone():
+    assert cap_tokens("short text", max_tokens=100) == "short text"
+
+
+def test_cap_keeps_head_and_tail_around_a_marker():
+    text = numbered_lines(500)
+    capped = cap_tokens(text, max_tokens=count_tokens(text) // 4, head_share=0.75)
+    lines = capped.split("\n")
+    assert lines[0] == "Line 0 of the article carries its own distinct sentence."
+    assert lines[-1] == "Line 499 of the article carries its own distinct sentence."
+    marker = OMISSION_MARKER.split("{")[0]
+    assert sum(line.startswith(marker) for line in lines) == 1
+    assert count_tokens(capped) <= count_tokens(text) // 4 + 10
+
+
+def test_cap_cuts_a_single_huge_line():
+    capped = cap_tokens("word " * 5000, max_tokens=200)
+    assert count_tokens(capped) < 400
+
+
+def test_cap_does_not_cut_pages_the_chunker_can_take():
+    # The cap must leave room for several rounds of map-reduce chunks
+    assert MAX_PROMPT_TOKENS >= CHUNK_TOKENS * 8
+
+
+def test_compact_prefers_main_content_and_reports_the_ratio():
+    data = {"content": "Menu\nHome\n" + numbered_lines(20) + "\nFooter", "main_content": numbered_lines(20)}
+    text, stats = compact(data)
+    assert text == numbered_lines(20)
+    assert stats["main_content"] is True
+    assert stats["tokens_out"] < stats["tokens_in"]
+    assert stats["ratio"] == round(stats["tokens_out"] / stats["tokens_in"], 3)
@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+import dir_index
+from dir_index import DirectoryIndex
+
+
+def names(index, **kwargs):
+    return [entry["name"] for entry in index.list(**kwargs)[0]]
+
+
+@pytest.fixture
+def folder(tmp_path):
+    for name, size, age in (("b.txt", 30, 200), ("A.txt", 10, 100), ("c.epub", 20, 300)):
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        then = time.time() - age
+        os.utime(path, (then, then))
+    return tmp_path
+
+
+def test_listing_is_sorted_paged_and_filtered(folder):
+    index = DirectoryIndex(str(folder), include=lambda name: name.endswith(".txt"), use_inotify=False)
+    assert names(index) == ["A.txt", "b.txt"]
+    assert names(index, sort="size", descending=True) == ["b.txt", "A.txt"]
+    assert names(index, sort="date") == ["b.txt", "A.txt"]
+    assert names(index, offset=1, limit=1) == ["b.txt"]
+    assert index.list(limit=1)[1] == 2
+    assert names(index, query="B") == ["b.txt"]
+
+
+def test_unchanged_folder_is_not_rescanned(folder):
+    index = DirectoryIndex(str(folder), use_inotify=False)
+    version = index.version()
+    names(index)
+    names(index, sort="size")
+    assert index.version() == version
+    assert index.rebuilds == 1
+
+
+def test_mtime_mode_notices_added_and_removed_files(folder):
+    index = DirectoryIndex(str(folder), use_inotify=False)
+    assert index.mode == "mtime"
+    version = index.version()
+
+    (folder / "d.txt").write_bytes(b"new")
+    assert "d.txt" in names(index)
+    assert index.version() != version
+
+    os.remove(folder / "d.txt")
+    assert index.version() == version
+    assert index.rebuilds == 3
+
+
+@pytest.mark.skipif(dir_index.INotify is None, reason="inotify_simple is not installed")
+def test_inotify_mode_notices_changes(folder):
+    index = DirectoryIndex(str(folder))
+    try:
+        assert index.mode == "inotify"
+        version = index.version()
+        (folder / "d.txt").write_bytes(b"new")
+        deadline = time.monotonic() + 5
+        while index.version() == version and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert "d.txt" in names(index)
+    finally:
+        index.close()
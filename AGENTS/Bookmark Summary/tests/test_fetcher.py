@@ -0,0 +1,168 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from fetcher import TIER_BROWSER, TIER_CACHE, TIER_HTTP, Fetcher
+from host_scheduler import HostBusy
+from scrape_cache import ScrapeCache
+
+ARTICLE = "<p>" + "A sentence of article text, long enough to count as a real page. " * 20 + "</p>"
+
+
+def page(body, title="Article"):
+    return f"<html><head><title>{title}</title></head><body><article>{body}</article></body></html>"
+
+
+class FakePool:
+    """Stands in for browser_pool.BrowserPool; records what it was asked to render."""
+
+    def __init__(self):
+        self.rendered = []
+
+    async def scrape(self, url):
+        self.rendered.append(url)
+        return {"title": "Rendered", "meta_description": "", "content": "Text the browser saw.", "status": 200}
+
+
+class Site:
+    """A local web server whose pages are (status, headers, body) set by each test."""
+
+    def __init__(self):
+        self.pages = {}
+        self.requests = []
+
+    async def handle(self, request):
+        self.requests.append((request.path, dict(request.headers)))
+        status, headers, body = self.pages[request.path]
+        etag = headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(status=status, headers=headers, body=body.encode())
+
+
+def run(site, cache, scenario):
+    """Serves `site` on a loopback port and runs scenario(fetch, base_url) against a Fetcher."""
+    pool = FakePool()
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/{path:.*}", site.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        server = web.TCPSite(runner, "127.0.0.1", 0)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+
+        async def get_pool():
+            return pool
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                fetcher = Fetcher(session, get_pool, cache)
+                await scenario(fetcher, f"http://127.0.0.1:{port}")
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+    return pool
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ScrapeCache(str(tmp_path / "scrape_cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_unchanged_page_is_revalidated_with_a_conditional_get(cache):
+    site = Site()
+    site.pages["/a"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, page(ARTICLE))
+
+    async def scenario(fetcher, base):
+        first = await fetcher.fetch(base + "/a")
+        second = await fetcher.fetch(base + "/a")
+        assert second["content"] == first["content"]
+        assert fetcher.counts[TIER_HTTP] == 1 and fetcher.counts[TIER_CACHE] == 1
+
+    run(site, cache, scenario)
+    assert "If-None-Match" not in site.requests[0][1]
+    assert site.requests[1][1]["If-None-Match"] == '"v1"'
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_changed_page_replaces_the_cached_copy(cache):
+    site = Site()
+    site.pages["/a"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, page(ARTICLE, "Old title"))
+
+    async def scenario(fetcher, base):
+        await fetcher.fetch(base + "/a")
+        site.pages["/a"] = (200, {"Content-Type": "text/html", "ETag": '"v2"'}, page(ARTICLE, "New title"))
+        assert (await fetcher.fetch(base + "/a"))["title"] == "New title"
+        entry = cache.get(base + "/a")
+        assert (entry["title"], entry["etag"]) == ("New title", '"v2"')
+
+    run(site, cache, scenario)
+    assert cache.stats()["changed"] == 1
+
+
+def test_page_without_validators_is_reused_while_fresh(cache):
+    site = Site()
+    site.pages["/a"] = (200, {"Content-Type": "text/html"}, page(ARTICLE))
+
+    async def scenario(fetcher, base):
+        await fetcher.fetch(base + "/a")
+        await fetcher.fetch(base + "/a")
+        assert fetcher.counts[TIER_CACHE] == 1
+
+    run(site, cache, scenario)
+    assert len(site.requests) == 1
+
+
+def test_static_pages_skip_the_browser(cache):
+    site = Site()
+    site.pages["/a"] = (200, {"Content-Type": "text/html; charset=utf-8"}, page(ARTICLE, "Static"))
+
+    async def scenario(fetcher, base):
+        data = await fetcher.fetch(base + "/a")
+        assert data["title"] == "Static" and "article text" in data["content"]
+        assert fetcher.counts[TIER_HTTP] == 1
+
+    assert run(site, cache, scenario).rendered == []
+
+
+@pytest.mark.parametrize("headers, body", [
+    ({"Content-Type": "text/html"}, page('<div id="root"></div>')),
+    ({"Content-Type": "text/html"}, page("<noscript>Please enable JavaScript.</noscript><p>Loading</p>")),
+    ({"Content-Type": "application/pdf"}, "%PDF-1.4"),
+])
+def test_js_shells_and_other_content_fall_back_to_the_browser(cache, headers, body):
+    site = Site()
+    site.pages["/app"] = (200, headers, body)
+
+    async def scenario(fetcher, base):
+        assert (await fetcher.fetch(base + "/app"))["title"] == "Rendered"
+        assert fetcher.counts[TIER_BROWSER] == 1
+
+    assert len(run(site, cache, scenario).rendered) == 1
+
+
+def test_unreachable_host_falls_back_to_the_browser(cache):
+    async def scenario(fetcher, base):
+        # Nothing listens on port 9 (discard) on loopback
+        assert (await fetcher.fetch("http://127.0.0.1:9/a"))["title"] == "Rendered"
+
+    assert run(Site(), cache, scenario).rendered == ["http://127.0.0.1:9/a"]
+
+
+def test_rate_limited_host_is_reported_not_rendered(cache):
+    site = Site()
+    site.pages["/a"] = (429, {"Retry-After": "30"}, "Slow down")
+
+    async def scenario(fetcher, base):
+        with pytest.raises(HostBusy) as busy:
+            await fetcher.fetch(base + "/a")
+        assert busy.value.retry_after == 30
+
+    assert run(site, cache, scenario).rendered == []
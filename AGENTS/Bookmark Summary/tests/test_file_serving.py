@@ -0,0 +1,80 @@
+import pytest
+from flask import Flask
+
+from file_serving import serve_file
+
+BODY = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "data.bin").write_bytes(BODY)
+    app = Flask(__name__)
+
+    @app.route("/files/<path:filename>", methods=["GET", "HEAD"])
+    def files(filename):
+        return serve_file(str(tmp_path), filename)
+
+    return app.test_client()
+
+
+def test_whole_file(client):
+    response = client.get("/files/data.bin")
+    assert response.status_code == 200
+    assert response.data == BODY
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["Content-Length"] == str(len(BODY))
+
+
+def test_single_range(client):
+    response = client.get("/files/data.bin", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.data == BODY[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(BODY)}"
+
+
+def test_suffix_and_open_ended_ranges(client):
+    assert client.get("/files/data.bin", headers={"Range": "bytes=-5"}).data == BODY[-5:]
+    assert client.get("/files/data.bin", headers={"Range": "bytes=1000-"}).data == BODY[1000:]
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/files/data.bin", headers={"Range": f"bytes={len(BODY)}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(BODY)}"
+
+
+def test_multiple_ranges_get_the_whole_file(client):
+    response = client.get("/files/data.bin", headers={"Range": "bytes=0-1,5-6"})
+    assert response.status_code == 200
+    assert response.data == BODY
+
+
+def test_if_range_with_a_stale_etag_gets_the_whole_file(client):
+    response = client.get("/files/data.bin", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.data == BODY
+
+
+def test_if_range_with_the_current_etag_gets_the_range(client):
+    etag = client.get("/files/data.bin").headers["ETag"]
+    response = client.get("/files/data.bin", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.data == BODY[:10]
+
+
+def test_conditional_get(client):
+    etag = client.get("/files/data.bin").headers["ETag"]
+    assert client.get("/files/data.bin", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_head_sends_headers_only(client):
+    response = client.head("/files/data.bin", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["Content-Length"] == "10"
+    assert response.data == b""
+
+
+def test_missing_and_escaping_paths_are_404(client):
+    assert client.get("/files/nope.bin").status_code == 404
+    assert client.get("/files/../etc/passwd").status_code == 404
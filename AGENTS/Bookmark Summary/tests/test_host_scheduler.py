@@ -0,0 +1,123 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from host_scheduler import (
+    DEFAULT_RETRY_AFTER, MAX_DEFERRALS, MAX_RETRY_WAIT, HostScheduler, host_key, interleave_by_host,
+    parse_retry_after,
+)
+
+
+def bookmark(url):
+    return {"url": url}
+
+
+def filled(urls, **kwargs):
+    """A scheduler holding the given URLs, and the clock reading to drive _next_ready() with."""
+    scheduler = HostScheduler(**kwargs)
+
+    async def fill():
+        for url in urls:
+            await scheduler.put(bookmark(url))
+
+    asyncio.run(fill())
+    return scheduler, time.monotonic()
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(None) == DEFAULT_RETRY_AFTER
+    assert parse_retry_after("soon") == DEFAULT_RETRY_AFTER
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+
+
+def test_host_key_ignores_www_and_case():
+    assert host_key("https://WWW.Example.com/a") == "example.com"
+
+
+def test_interleave_by_host_keeps_each_hosts_order():
+    urls = ["https://a.com/1", "https://a.com/2", "https://a.com/3", "https://b.com/1", "https://c.com/1"]
+    ordered = [b["url"] for b in interleave_by_host([bookmark(url) for url in urls])]
+    assert ordered == ["https://a.com/1", "https://b.com/1", "https://c.com/1", "https://a.com/2", "https://a.com/3"]
+
+
+def test_token_bucket_allows_a_burst_then_the_steady_rate():
+    scheduler, now = filled([f"https://a.com/{i}" for i in range(5)], concurrency=10, rate=1.0, burst=3)
+    for i in range(3):
+        assert scheduler._next_ready(now)[0]["url"] == f"https://a.com/{i}"
+    item, wait = scheduler._next_ready(now)
+    assert item is None and wait == pytest.approx(1.0, abs=0.01)
+    assert scheduler._next_ready(now + 1.0)[0]["url"] == "https://a.com/3"
+    assert scheduler._next_ready(now + 1.0)[0] is None
+
+
+def test_per_host_concurrency_cap():
+    scheduler, now = filled(["https://a.com/1", "https://a.com/2"], concurrency=1, rate=100, burst=10)
+    first, _ = scheduler._next_ready(now)
+    assert scheduler._next_ready(now) == (None, None)
+    scheduler.task_done(first)
+    assert scheduler._next_ready(now)[0]["url"] == "https://a.com/2"
+
+
+def test_a_throttled_host_does_not_hold_up_others():
+    urls = ["https://a.com/1", "https://a.com/2", "https://b.com/1"]
+    scheduler, now = filled(urls, concurrency=10, rate=1.0, burst=1)
+    served = [scheduler._next_ready(now)[0]["url"] for _ in range(2)]
+    assert served == ["https://a.com/1", "https://b.com/1"]
+
+
+def test_defer_pauses_the_host_and_restarts_without_a_burst():
+    scheduler, now = filled(["https://a.com/1", "https://a.com/2"], concurrency=10, rate=1.0, burst=3)
+    first, _ = scheduler._next_ready(now)
+    assert scheduler.defer(first, 10) is True
+    scheduler.task_done(first)
+    item, wait = scheduler._next_ready(time.monotonic())
+    assert item is None and 9 < wait <= 10
+    resumed = time.monotonic() + 10
+    assert scheduler._next_ready(resumed)[0] is first
+    assert scheduler._next_ready(resumed)[0] is None
+    assert scheduler.stats()["deferred"] == 1
+
+
+def test_long_pauses_close_the_host():
+    scheduler, now = filled(["https://a.com/1", "https://a.com/2"], concurrency=10)
+    first, _ = scheduler._next_ready(now)
+    assert scheduler.defer(first, MAX_RETRY_WAIT + 1) is False
+    assert scheduler.is_closed(first["url"])
+    # Closed hosts hand out the rest of their bookmarks at once, to be left for the next run
+    assert scheduler._next_ready(now)[0]["url"] == "https://a.com/2"
+
+
+def test_a_bookmark_is_deferred_at_most_max_deferrals_times():
+    scheduler, now = filled(["https://a.com/1"], concurrency=10)
+    item, _ = scheduler._next_ready(now)
+    for _ in range(MAX_DEFERRALS):
+        assert scheduler.defer(item, 0) is True
+        scheduler.task_done(item)
+        item, _ = scheduler._next_ready(time.monotonic() + 1)
+    assert scheduler.defer(item, 0) is False
+
+
+def test_workers_drain_the_queue():
+    async def run():
+        scheduler = HostScheduler(rate=1000, burst=10)
+        for i in range(6):
+            await scheduler.put(bookmark(f"https://host{i % 2}.com/{i}"))
+        done = []
+
+        async def worker():
+            while True:
+                item = await scheduler.get()
+                done.append(item["url"])
+                scheduler.task_done(item)
+
+        workers = [asyncio.create_task(worker()) for _ in range(3)]
+        await asyncio.wait_for(scheduler.join(), 5)
+        for task in workers:
+            task.cancel()
+        return done
+
+    assert len(asyncio.run(run())) == 6
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+import job_queue
+from job_queue import ORPHAN_ERROR, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING, JobQueue, run_command
+from metrics import process_start_time
+
+
+@pytest.fixture
+def queue(tmp_path):
+    """A queue without a dispatcher: jobs are only claimed when the test calls _claim()."""
+    queue = JobQueue(db_path=str(tmp_path / "jobs.db"), log_dir=str(tmp_path / "logs"), max_running=2)
+    queue.register("echo", lambda ctx, arg: None)
+    return queue
+
+
+def dead_pid():
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def wait_for(queue, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in (STATUS_DONE, STATUS_FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_identical_pending_jobs_are_deduplicated(queue):
+    first, created = queue.submit("echo", "a")
+    again, created_again = queue.submit("echo", "a")
+    other, _ = queue.submit("echo", "b")
+    assert created and not created_again
+    assert again["id"] == first["id"]
+    assert other["id"] != first["id"]
+    assert queue.counts() == {STATUS_QUEUED: 2}
+
+
+def test_a_finished_job_can_be_submitted_again(queue):
+    first, _ = queue.submit("echo", "a")
+    queue._update(first["id"], status=STATUS_DONE)
+    second, created = queue.submit("echo", "a")
+    assert created and second["id"] != first["id"]
+
+
+def test_running_jobs_are_capped(queue):
+    for arg in "abc":
+        queue.submit("echo", arg)
+    claimed = [queue._claim(), queue._claim(), queue._claim()]
+    assert [job["arg"] for job in claimed[:2]] == ["a", "b"]
+    assert claimed[2] is None
+    queue._update(claimed[0]["id"], status=STATUS_DONE)
+    assert queue._claim()["arg"] == "c"
+
+
+def test_jobs_of_dead_workers_fail_instead_of_running_again(queue):
+    job, _ = queue.submit("echo", "a")
+    queue._update(job["id"], status=STATUS_RUNNING, worker_pid=dead_pid())
+    queue._fail_orphans(queue._conn())
+    assert queue.get(job["id"])["status"] == STATUS_FAILED
+    assert queue.get(job["id"])["error"] == ORPHAN_ERROR
+    # The job can be submitted again by hand
+    assert queue.submit("echo", "a")[1] is True
+
+
+def test_jobs_of_live_workers_stay_running(queue):
+    queue.submit("echo", "a")
+    claimed = queue._claim()
+    assert claimed["worker_start"] == process_start_time(os.getpid())
+    queue._fail_orphans(queue._conn())
+    assert queue.get(claimed["id"])["status"] == STATUS_RUNNING
+
+
+def test_a_recycled_worker_pid_does_not_keep_a_job_running(queue):
+    queue.submit("echo", "a")
+    claimed = queue._claim()
+    queue._update(claimed["id"], worker_start=claimed["worker_start"] - 1)
+    queue._fail_orphans(queue._conn())
+    assert queue.get(claimed["id"])["status"] == STATUS_FAILED
+
+
+def test_jobs_keep_their_slot_while_their_command_runs(queue):
+    job, _ = queue.submit("echo", "a")
+    child = subprocess.Popen(["sleep", "30"])
+    try:
+        queue._update(job["id"], status=STATUS_RUNNING, worker_pid=dead_pid(),
+                      child_pid=child.pid, child_start=process_start_time(child.pid))
+        queue._fail_orphans(queue._conn())
+        assert queue.get(job["id"])["status"] == STATUS_RUNNING
+    finally:
+        child.kill()
+        child.wait()
+    queue._fail_orphans(queue._conn())
+    assert queue.get(job["id"])["status"] == STATUS_FAILED
+
+
+def test_handlers_run_with_progress_and_logs(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.db"), log_dir=str(tmp_path / "logs")).start()
+    script = "print('hello'); print('PROGRESS 0.5 halfway', flush=True)"
+    queue.register("cmd", lambda ctx, arg: run_command(ctx, [sys.executable, "-c", arg]))
+    queue.register("boom", lambda ctx, arg: 1 / 0)
+    ok = wait_for(queue, queue.submit("cmd", script)[0]["id"])
+    failed = wait_for(queue, queue.submit("boom", "x")[0]["id"])
+    assert ok["status"] == STATUS_DONE and ok["progress"] == 1.0 and ok["note"] == "halfway"
+    assert ok["child_pid"] is None
+    assert "hello" in open(ok["log_path"]).read()
+    assert failed["status"] == STATUS_FAILED and "division by zero" in failed["error"]
+
+
+def test_old_databases_gain_the_pid_columns(tmp_path):
+    db_path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db_path)
+    schema = job_queue.SCHEMA
+    for column in ("worker_start", "child_pid", "child_start"):
+        schema = schema.replace(f"    {column} INTEGER,\n", "")
+    conn.executescript(schema)
+    conn.close()
+    JobQueue(db_path=db_path, log_dir=str(tmp_path / "logs"))
+    columns = {row[1] for row in sqlite3.connect(db_path).execute("PRAGMA table_info(jobs)")}
+    assert {"worker_start", "child_pid", "child_start"} <= columns
@@ -0,0 +1,83 @@
+from near_dup import MIN_WORDS, Deduper, SketchIndex, from_blob, similarity, sketch, to_blob
+
+ARTICLE = " ".join(f"token{i}" for i in range(400))
+OTHER = " ".join(f"other{i}" for i in range(400))
+
+
+def test_short_texts_have_no_sketch():
+    assert sketch(" ".join(["word"] * (MIN_WORDS - 1))) is None
+
+
+def test_similarity_separates_copies_from_different_pages():
+    assert similarity(sketch(ARTICLE), sketch(ARTICLE)) == 1.0
+    assert similarity(sketch(ARTICLE), sketch(ARTICLE + " share this")) > 0.9
+    assert similarity(sketch(ARTICLE), sketch(OTHER)) < 0.1
+
+
+def test_blob_round_trip():
+    page_sketch = sketch(ARTICLE)
+    assert from_blob(to_blob(page_sketch)) == page_sketch
+
+
+def test_index_finds_and_forgets_near_duplicates():
+    index = SketchIndex()
+    index.add("a", sketch(ARTICLE))
+    assert index.find(sketch(ARTICLE + " footer"))[0] == "a"
+    assert index.find(sketch(OTHER)) is None
+    index.remove("a")
+    assert index.find(sketch(ARTICLE)) is None
+    assert len(index) == 0
+
+
+def test_deduper_collapses_by_canonical_url_before_scraping():
+    deduper = Deduper()
+    assert deduper.claim_url("https://www.example.com/post?utm_source=x") is None
+    assert deduper.claim_url("http://example.com/post/") == "https://example.com/post"
+    # The original is still in flight: not counted until it is delivered
+    assert not deduper.is_delivered("https://example.com/post")
+    assert deduper.by_url == 0
+    deduper.mark_delivered("https://www.example.com/post?utm_source=x")
+    assert deduper.claim_url("http://example.com/post/") == "https://example.com/post"
+    assert deduper.by_url == 1
+
+
+def test_deduper_collapses_by_content_and_releases_claims():
+    deduper = Deduper()
+    assert deduper.check("https://a.example/1", {"content": ARTICLE}) is None
+    assert deduper.check("https://b.example/2", {"content": ARTICLE + " more"}) == "https://a.example/1"
+    deduper.release("https://a.example/1")
+    assert deduper.check("https://b.example/2", {"content": ARTICLE}) is None
+    deduper.mark_delivered("https://b.example/2")
+    assert deduper.check("https://c.example/3", {"content": ARTICLE}) == "https://b.example/2"
+    assert deduper.by_content == 1
+
+
+def test_deduper_honours_the_page_canonical_url():
+    deduper = Deduper()
+    data = {"content": ARTICLE, "canonical_url": "https://example.com/real"}
+    assert deduper.check("https://example.com/real?ref=feed", data) is None
+    assert data["canonical"] == "https://example.com/real"
+    mirror = {"content": OTHER, "canonical_url": "https://example.com/real"}
+    assert deduper.check("https://mirror.example/copy", mirror) == "https://example.com/real"
+
+
+def test_deduper_starts_with_delivered_pages():
+    deduper = Deduper(seen=[("https://example.com/old", to_blob(sketch(ARTICLE)))])
+    assert deduper.is_delivered("https://example.com/old")
+    assert deduper.claim_url("https://example.com/old") == "https://example.com/old"
+    assert deduper.check("https://new.example/x", {"content": ARTICLE}) == "https://example.com/old"
+
+
+def test_recheck_ignores_delivered_pages_but_not_this_runs_claims():
+    deduper = Deduper(seen=[("https://example.com/old", to_blob(sketch(ARTICLE)))])
+    assert deduper.claim_url("https://example.com/old", recheck=True) is None
+    assert deduper.check("https://example.com/old", {"content": ARTICLE}, recheck=True) is None
+    assert deduper.check("https://copy.example/x", {"content": ARTICLE}, recheck=True) == "https://example.com/old"
+
+
+def test_a_failed_recheck_keeps_the_earlier_delivery():
+    deduper = Deduper(seen=[("https://example.com/old", to_blob(sketch(ARTICLE)))])
+    assert deduper.claim_url("https://example.com/old", recheck=True) is None
+    deduper.release("https://example.com/old")
+    assert deduper.is_delivered("https://example.com/old")
+    assert deduper.check("https://new.example/x", {"content": ARTICLE}) == "https://example.com/old"
@@ -0,0 +1,44 @@
+import pytest
+
+from summary_cache import SummaryCache, summary_key
+
+ARTICLE = "Title\n\nFirst paragraph of the article.\nSecond paragraph."
+KEY_ARGS = (ARTICLE, "model-a", "Summarize this.", 0.2)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SummaryCache(str(tmp_path / "summary_cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_whitespace_does_not_change_the_key():
+    reflowed = "  Title First paragraph of the article.\n\n\tSecond   paragraph. "
+    assert summary_key(reflowed, *KEY_ARGS[1:]) == summary_key(*KEY_ARGS)
+    # An int temperature is the same setting as the float
+    assert summary_key(ARTICLE, "model-a", "Summarize this.", 0) == summary_key(ARTICLE, "model-a", "Summarize this.", 0.0)
+
+
+@pytest.mark.parametrize("changed", [
+    ("Title\n\nFirst paragraph of the article.\nThird paragraph.", "model-a", "Summarize this.", 0.2),
+    (ARTICLE, "model-b", "Summarize this.", 0.2),
+    (ARTICLE, "model-a", "Summarize this briefly.", 0.2),
+    (ARTICLE, "model-a", "Summarize this.", 0.7),
+])
+def test_anything_that_changes_the_output_changes_the_key(cache, changed):
+    cache.put(*KEY_ARGS, "A summary.")
+    assert summary_key(*changed) != summary_key(*KEY_ARGS)
+    assert cache.get(*changed) is None
+
+
+def test_parts_cannot_run_into_each_other():
+    assert summary_key("ab", "c", "", 0) != summary_key("a", "bc", "", 0)
+
+
+def test_hits_and_misses_are_counted(cache):
+    assert cache.get(*KEY_ARGS) is None
+    cache.put(*KEY_ARGS, "A summary.")
+    assert cache.get(*KEY_ARGS) == "A summary."
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
@@ -0,0 +1,38 @@
+from url_canon import canonical_url, normalize_url
+
+
+def test_normalize_url_lowercases_host_and_drops_default_port_and_fragment():
+    assert normalize_url("HTTPS://Example.COM:443#top") == "https://example.com/"
+    assert normalize_url("http://example.com:8080/a?b=1#c") == "http://example.com:8080/a?b=1"
+
+
+def test_scheme_www_and_trailing_slash_do_not_matter():
+    assert canonical_url("http://www.example.com/post/") == canonical_url("https://example.com/post")
+    assert canonical_url("https://m.example.com/post") == "https://example.com/post"
+
+
+def test_tracking_params_are_dropped_and_the_rest_sorted():
+    url = "https://example.com/a?utm_source=x&b=2&fbclid=abc&a=1"
+    assert canonical_url(url) == "https://example.com/a?a=1&b=2"
+
+
+def test_amp_variants_map_to_the_article():
+    article = canonical_url("https://example.com/news/story")
+    assert canonical_url("https://example.com/news/story/amp") == article
+    assert canonical_url("https://example.com/amp/news/story") == article
+    assert canonical_url("https://example.com/news/story?amp=1") == article
+    assert canonical_url("https://example-com.cdn.ampproject.org/c/s/example.com/news/story") == article
+    assert canonical_url("https://www.google.com/amp/s/example.com/news/story") == article
+
+
+def test_short_hosts_keep_their_prefix():
+    # "m.com" is a domain of its own, not a mobile subdomain
+    assert canonical_url("https://m.com/x") == "https://m.com/x"
+
+
+def test_non_http_urls_are_only_normalized():
+    assert canonical_url("FTP://Example.com/file") == "ftp://example.com/file"
+
+
+def test_invalid_port_is_returned_unchanged():
+    assert canonical_url("https://example.com:notaport/x") == "https://example.com:notaport/x"
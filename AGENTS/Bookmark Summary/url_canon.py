@@ -0,0 +1,106 @@
+# Canonical forms of bookmark URLs, used to spot the same page saved twice.
+#
+# normalize_url() only removes differences that can never change the page
+# (scheme/host case, default port, fragment) and keys the scrape cache.
+# canonical_url() is the dedupe key for the bookmark store and the runner:
+# it also drops tracking parameters, www./m. prefixes, the http/https
+# difference, trailing slashes and AMP variants (including Google's AMP
+# cache URLs). The stored URL is always the one the user saved.
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that identify the click, not the page
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "ttclid", "li_fat_id",
+    "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "vero_id", "ref_src",
+    "ref_url", "cmpid", "s_cid", "ncid", "sr_share", "spm", "oly_anon_id", "oly_enc_id", "rb_clickid",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "itm_")
+# Host prefixes that serve the same pages as the bare domain
+HOST_PREFIXES = ("www.", "m.", "amp.")
+AMP_CACHE_SUFFIX = ".cdn.ampproject.org"
+
+
+def normalize_url(url):
+    """Normalizes scheme/host case, default port, empty path and fragment."""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def _unwrap_amp_cache(host, path):
+    """Returns (host, path) of the original page for Google AMP cache URLs."""
+    segments = path.split("/")
+    if host.endswith(AMP_CACHE_SUFFIX) and len(segments) > 3 and segments[1] in ("c", "v", "i"):
+        # /c/s/example.com/path (s = https)
+        rest = segments[3:] if segments[2] == "s" else segments[2:]
+    elif host in ("google.com", "www.google.com") and len(segments) > 2 and segments[1] == "amp":
+        # /amp/s/example.com/path
+        rest = segments[3:] if segments[2] == "s" else segments[2:]
+    else:
+        return host, path
+    if not rest or not rest[0]:
+        return host, path
+    return rest[0].lower(), "/" + "/".join(rest[1:])
+
+
+def _strip_amp_path(path):
+    if path.endswith("/amp") or path.endswith("/amp/"):
+        path = path[:path.rstrip("/").rfind("/")] or "/"
+    if path.startswith("/amp/"):
+        path = path[len("/amp"):]
+    for suffix in (".amp.html", ".amp"):
+        if path.endswith(suffix):
+            path = path[:-len(suffix)] + (".html" if suffix == ".amp.html" else "")
+    return path
+
+
+def _keep_param(key, value):
+    key = key.lower()
+    if key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES):
+        return False
+    if key == "amp" and value in ("", "1", "true"):
+        return False
+    if key == "outputtype" and value.lower() == "amp":
+        return False
+    return True
+
+
+def canonical_url(url):
+    """Returns the dedupe key for a URL; equal keys are taken to be the same page."""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return normalize_url(url)
+    host = (parts.hostname or "").rstrip(".")
+    host, path = _unwrap_amp_cache(host, parts.path)
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    netloc = host if port is None or DEFAULT_PORTS[scheme] == port else f"{host}:{port}"
+
+    path = _strip_amp_path(path)
+    while "//" in path:
+        path = path.replace("//", "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if _keep_param(key, value)
+    )
+    # Scheme is dropped from the key: http and https copies of a page are the same bookmark
+    return urlunsplit(("https", netloc, path or "/", urlencode(query), ""))
@@ -0,0 +1,206 @@
+# Bookmark manager pages (backed by bookmark_store).
+#
+# Loaded by endpoint.py on the first request to /, /add, /remove, /import
+# or /batch/*. The bulk routes answer with JSON when sent JSON (or asked
+# for it) and re-render the bookmark page otherwise.
+
+from flask import jsonify, render_template, request
+
+import bookmark_store
+from bookmark_import import FORMATS, decode_upload, parse_bookmarks
+from web_common import BOOKMARK_DB, conditional_response, page_args, paging_info, register_templates
+
+BOOKMARK_FILE = bookmark_store.LEGACY_BOOKMARK_FILE  # Imported into the store once, then renamed
+bookmark_store.init_db(BOOKMARK_DB, BOOKMARK_FILE)
+
+def render_bookmarks(paging, message=None):
+    total = bookmark_store.count_bookmarks(BOOKMARK_DB)
+    paging = paging_info(paging, total)
+    bookmarks = bookmark_store.list_bookmarks(
+        offset=(paging["page"] - 1) * paging["per_page"],
+        limit=paging["per_page"],
+        sort=paging["sort"],
+        descending=paging["order"] == "desc",
+        db_path=BOOKMARK_DB,
+    )
+    return render_template("bookmarks.html", bookmarks=bookmarks, paging=paging, message=message)
+
+bookmark_template = """
+{% from "pager.html" import pager, sort_header %}
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Bookmark Manager</title>
+    <style>
+        table { width: 100%; border-collapse: collapse; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f2f2f2; }
+        tr:nth-child(even) { background-color: #f9f9f9; }
+        tr:nth-child(odd) { background-color: #ffffff; }
+        .too-large { background-color: red !important; color: white; }
+    </style>
+</head>
+<body>
+    <h1>Bookmark Manager</h1>
+    
+    <h2>Add a Bookmark</h2>
+    <form action="/add" method="post">
+        <input type="text" name="url" placeholder="Enter URL" required>
+        <button type="submit">Add</button>
+    </form>
+    
+    <h2>Remove a Bookmark</h2>
+    <form action="/remove" method="post">
+        <input type="text" name="url" placeholder="Enter URL" required>
+        <button type="submit">Remove</button>
+    </form>
+
+    <h2>Import Bookmarks</h2>
+    <form action="/import" method="post" enctype="multipart/form-data">
+        <p>Browser export (HTML), JSON or a text file with one URL per line:
+        <input type="file" name="file"></p>
+        <p><textarea name="text" rows="4" cols="80" placeholder="...or paste URLs here, one per line"></textarea></p>
+        <button type="submit">Import</button>
+    </form>
+
+    <h2>Bookmarks</h2>
+    <form method="post">
+    <p>
+        <button type="submit" formaction="/batch/remove">Remove selected</button>
+        <button type="submit" formaction="/batch/requeue">Requeue selected</button>
+        <button type="submit" formaction="/batch/requeue" name="status" value="failed">Requeue all failed</button>
+    </p>
+    <table>
+        <thead>
+            <tr>
+                <th></th>
+                <th>{{ sort_header('index', paging, 'url', 'URL') }}</th>
+                <th>{{ sort_header('index', paging, 'date', 'Date Added') }}</th>
+                <th>{{ sort_header('index', paging, 'status', 'Status') }}</th>
+            </tr>
+        </thead>
+        <tbody>
+            {% for bookmark in bookmarks %}
+            <tr class="{% if bookmark.status != 'pending' %}too-large{% endif %}">
+                <td><input type="checkbox" name="url" value="{{ bookmark.url }}"></td>
+                <td>{{ bookmark.url }}</td>
+                <td>{{ bookmark.date_display }}</td>
+                <td>{{ bookmark.status }}</td>
+            </tr>
+            {% endfor %}
+        </tbody>
+    </table>
+    </form>
+    {{ pager('index', paging) }}
+
+    {% if message %}
+        <p><strong>{{ message }}</strong></p>
+    {% endif %}
+    
+    <p><a href="/pdf">Manage PDFs</a></p>
+</body>
+</html>
+"""
+
+register_templates({"bookmarks.html": bookmark_template})
+
+def index():
+    paging = page_args("date")
+    version = bookmark_store.store_version(BOOKMARK_DB)
+    etag = f"bm-{version}-{paging['page']}-{paging['per_page']}-{paging['sort']}-{paging['order']}"
+    return conditional_response(etag, lambda: render_bookmarks(paging))
+
+def add_bookmark():
+    url = request.form.get("url").strip()
+    if not url:
+        message = "Invalid URL! Cannot add empty or whitespace-only entries."
+    else:
+        if bookmark_store.add_bookmark(url, db_path=BOOKMARK_DB):
+            message = "Bookmark added successfully!"
+        else:
+            message = "This URL is already in your bookmarks!"
+    return render_bookmarks(page_args("date"), message=message)
+
+def remove_bookmark():
+    url = request.form.get("url").strip()
+    if bookmark_store.remove_bookmark(url, BOOKMARK_DB):
+        message = "Removed from bookmarks."
+    else:
+        message = "This was not in your bookmarks!"
+    return render_bookmarks(page_args("date"), message=message)
+
+# ------------------------------
+# Bulk import and batch operations
+# ------------------------------
+REQUEUE_STATUSES = {bookmark_store.STATUS_FAILED, bookmark_store.STATUS_TOO_LARGE, bookmark_store.STATUS_DUPLICATE}
+
+def wants_json():
+    return request.is_json or request.accept_mimetypes.best == "application/json"
+
+def batch_result(message, status=200, **counts):
+    if wants_json():
+        return jsonify(message=message, **counts), status
+    return render_bookmarks(page_args("date"), message=message), status
+
+def json_list(field):
+    """Returns the JSON body's `field` ([] when absent), or None unless it is a list of strings."""
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return None
+    values = body.get(field)
+    if values is None:
+        return []
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        return None
+    return values
+
+def requested_urls():
+    """Returns the selected URLs, or None when a JSON body's "urls" is not a list of strings."""
+    urls = json_list("urls") if request.is_json else request.form.getlist("url")
+    if urls is None:
+        return None
+    return [url.strip() for url in urls if url.strip()]
+
+def bad_list(field):
+    return batch_result(f'Expected "{field}" to be a list of strings.', 400)
+
+def import_bookmarks():
+    fmt = request.args.get("format") or request.form.get("format") or None
+    if fmt is not None and fmt not in FORMATS:
+        return batch_result(f"Unknown format {fmt!r}; use one of {', '.join(FORMATS)}.", 400)
+    file = request.files.get("file")
+    if request.is_json:
+        text, filename = request.get_data(as_text=True), "import.json"
+    elif file is not None and file.filename:
+        text, filename = decode_upload(file.stream.read()), file.filename
+    else:
+        text, filename = request.form.get("text", ""), None
+    try:
+        entries = parse_bookmarks(text, filename, fmt)
+    except ValueError as e:
+        return batch_result(f"Could not read the import: {e}", 400)
+    added, skipped = bookmark_store.add_bookmarks(entries, db_path=BOOKMARK_DB)
+    message = f"Imported {added} of {len(entries)} links ({skipped} already stored or repeated)."
+    return batch_result(message, links=len(entries), added=added, skipped=skipped)
+
+def batch_remove():
+    urls = requested_urls()
+    if urls is None:
+        return bad_list("urls")
+    removed = bookmark_store.remove_bookmarks(urls, BOOKMARK_DB)
+    return batch_result(f"Removed {removed} of {len(urls)} selected bookmarks.", removed=removed)
+
+def batch_requeue():
+    statuses = json_list("statuses") if request.is_json else request.form.getlist("status")
+    if statuses is None:
+        return bad_list("statuses")
+    statuses = [status for status in statuses if status in REQUEUE_STATUSES]
+    urls = requested_urls()
+    if urls is None:
+        return bad_list("urls")
+    if not urls and not statuses:
+        return batch_result("Select bookmarks (or a status) to requeue.", 400, requeued=0)
+    requeued = bookmark_store.requeue_bookmarks(urls, statuses, BOOKMARK_DB)
+    return batch_result(f"Requeued {requeued} bookmarks.", requeued=requeued)
@@ -0,0 +1,114 @@
+# Helpers shared by endpoint.py's feature modules (web_bookmarks, web_pdfs,
+# web_epub, web_transfers, web_jobs): pagination, conditional responses,
+# folder listings, the shared blob store and the template registry.
+#
+# Kept free of heavy imports; it is loaded at startup along with endpoint.py.
+
+from flask import make_response, render_template, request
+
+import bookmark_store
+from blob_store import BlobStore
+
+# Bookmark and PDF store used by the feature modules and /metrics
+BOOKMARK_DB = bookmark_store.DB_FILE
+
+# Upload size limits per route, in bytes
+UPLOAD_LIMITS = {
+    "transfer": 8 * 1024 ** 3,
+    "pdf_upload": 512 * 1024 ** 2,
+    "import_bookmarks": 64 * 1024 ** 2,
+}
+
+blobs = BlobStore()
+
+# Pagination defaults for the bookmark, PDF and folder tables
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+# Templates by name, served through the app's DictLoader; feature modules add theirs when loaded
+TEMPLATES = {}
+
+def register_templates(templates):
+    TEMPLATES.update(templates)
+
+def page_args(default_sort):
+    """Reads page/per_page/sort/order from the query string."""
+    per_page = request.args.get("per_page", DEFAULT_PER_PAGE, type=int)
+    return {
+        "page": max(1, request.args.get("page", 1, type=int)),
+        "per_page": min(MAX_PER_PAGE, max(1, per_page)),
+        "sort": request.args.get("sort", default_sort),
+        "order": "desc" if request.args.get("order") == "desc" else "asc",
+        "q": request.args.get("q", "").strip() or None,
+    }
+
+def paging_info(paging, total):
+    pages = max(1, -(-total // paging["per_page"]))
+    return dict(paging, total=total, pages=pages, page=min(paging["page"], pages))
+
+def conditional_response(etag, render):
+    """Returns 304 if the client already has this ETag, otherwise renders and tags the page."""
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def render_listing(index, template, endpoint, paging, **context):
+    """Renders one page of a folder listing from its DirectoryIndex."""
+    files, total = index.list(
+        offset=(paging["page"] - 1) * paging["per_page"],
+        limit=paging["per_page"],
+        sort=paging["sort"],
+        descending=paging["order"] == "desc",
+        query=paging["q"],
+    )
+    paging = paging_info(paging, total)
+    if paging["page"] > 1 and not files and total:
+        # Page past the end (e.g. after deletes); show the last one instead
+        return render_listing(index, template, endpoint, dict(paging, page=paging["pages"]), **context)
+    return render_template(template, files=files, paging=paging, endpoint=endpoint, **context)
+
+def listing_response(index, template, endpoint, message=None, **context):
+    paging = page_args("name")
+    if message is not None or request.method != "GET":
+        return render_listing(index, template, endpoint, paging, message=message, **context)
+    etag = f"{endpoint}-{index.version()}-{paging['page']}-{paging['per_page']}-{paging['sort']}-{paging['order']}-{paging['q'] or ''}"
+    return conditional_response(etag, lambda: render_listing(index, template, endpoint, paging, **context))
+
+# Shared pager and sortable-header macros
+pager_template = """
+{% macro pager(endpoint, paging) %}
+  {% if paging.pages > 1 %}
+  <p>
+    {% if paging.page > 1 %}
+      <a href="{{ url_for(endpoint, page=paging.page - 1, per_page=paging.per_page, sort=paging.sort, order=paging.order, q=paging.q) }}">&laquo; Prev</a>
+    {% endif %}
+    Page {{ paging.page }} of {{ paging.pages }} ({{ paging.total }} total)
+    {% if paging.page < paging.pages %}
+      <a href="{{ url_for(endpoint, page=paging.page + 1, per_page=paging.per_page, sort=paging.sort, order=paging.order, q=paging.q) }}">Next &raquo;</a>
+    {% endif %}
+  </p>
+  {% endif %}
+{% endmacro %}
+
+{% macro sort_header(endpoint, paging, key, label) %}
+  {% set next_order = 'desc' if paging.sort == key and paging.order == 'asc' else 'asc' %}
+  <a href="{{ url_for(endpoint, sort=key, order=next_order, per_page=paging.per_page, q=paging.q) }}">{{ label }}</a>
+  {% if paging.sort == key %}{{ '&#9650;' if paging.order == 'asc' else '&#9660;' }}{% endif %}
+{% endmacro %}
+
+{% macro filter_form(endpoint, paging) %}
+  <form method="get" action="{{ url_for(endpoint) }}">
+    <input type="text" name="q" value="{{ paging.q or '' }}" placeholder="Filter by name">
+    <input type="hidden" name="sort" value="{{ paging.sort }}">
+    <input type="hidden" name="order" value="{{ paging.order }}">
+    <input type="hidden" name="per_page" value="{{ paging.per_page }}">
+    <button type="submit">Filter</button>
+  </form>
+{% endmacro %}
+"""
+
+register_templates({"pager.html": pager_template})
@@ -0,0 +1,96 @@
+# EPUB converter pages: queue webpage-to-EPUB conversions and manage the results.
+#
+# Loaded by endpoint.py on the first request to an /epub route. The
+# conversion itself runs as an "epub" job (see web_jobs).
+
+import os
+
+from flask import redirect, request, url_for
+
+from dir_index import DirectoryIndex
+from file_serving import serve_file
+from web_common import listing_response, register_templates
+from web_jobs import jobs
+
+UPLOAD_FOLDER = "/home/debian/bookmark_bot/epubs"
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Ensure EPUB folder exists
+
+epub_index = DirectoryIndex(UPLOAD_FOLDER, include=lambda name: name.endswith(".epub"))
+
+# EPUB Converter HTML Template
+epub_template = """
+{% from "pager.html" import pager, sort_header, filter_form %}
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Web to EPUB Converter</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f4f4f4; }
+        button { padding: 5px 10px; cursor: pointer; }
+    </style>
+</head>
+<body>
+    <h1>Web to EPUB Converter</h1>
+    <form method="POST">
+        <input type="text" name="url" placeholder="Enter website URL" required>
+        <button type="submit">Convert</button>
+    </form>
+    {% if message %}
+        <p><strong>{{ message }}</strong> <a href="{{ url_for('list_jobs') }}">Job status</a></p>
+    {% endif %}
+
+    <h2>Converted EPUB Files</h2>
+    {{ filter_form(endpoint, paging) }}
+    <table>
+        <tr>
+            <th>{{ sort_header(endpoint, paging, 'name', 'Filename') }}</th>
+            <th>{{ sort_header(endpoint, paging, 'size', 'Size') }}</th>
+            <th>{{ sort_header(endpoint, paging, 'date', 'Converted') }}</th>
+            <th>Download</th>
+            <th>Delete</th>
+        </tr>
+        {% for file in files %}
+        <tr>
+            <td>{{ file.name }}</td>
+            <td>{{ file.size | filesizeformat }}</td>
+            <td>{{ file.mtime | timestampformat }}</td>
+            <td><a href="{{ url_for('download_file', filename=file.name) }}"><button>Download</button></a></td>
+            <td><a href="{{ url_for('delete_file', filename=file.name) }}"><button>Delete</button></a></td>
+        </tr>
+        {% endfor %}
+    </table>
+    {{ pager(endpoint, paging) }}
+</body>
+</html>
+"""
+
+register_templates({"epub.html": epub_template})
+
+def index_epub():
+    message = None
+    if request.method == "POST":
+        url = request.form["url"].strip()
+        if url:
+            job, created = jobs.submit("epub", url)
+            if created:
+                message = f"Conversion queued as job {job['id']}."
+            else:
+                message = f"This URL is already being converted (job {job['id']}, {job['status']})."
+    
+    return listing_response(epub_index, "epub.html", "index_epub", message=message)
+
+def download_file(filename):
+    """Serves an EPUB file for download."""
+    return serve_file(UPLOAD_FOLDER, filename, as_attachment=True)
+
+def delete_file(filename):
+    """Deletes the selected EPUB file."""
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    return redirect(url_for("index_epub"))
@@ -0,0 +1,65 @@
+# Background job queue, its job handlers and the /jobs status routes.
+#
+# The web workers import this module to submit jobs and report on them.
+# The jobs themselves run in a separate, long-lived job process:
+#
+#   python3 web_jobs.py        # started (and stopped) by serve.py
+#
+# There a handler's heavy modules are imported on its first job and stay
+# warm for the next ones; the web workers never import them.
+
+import os
+
+from flask import abort, jsonify, request, send_from_directory
+
+from job_queue import JobQueue, run_command
+
+# Background jobs (EPUB conversions, PDF summaries) run outside the request
+jobs = JobQueue()
+
+BOT_DIR = "/home/debian/bookmark_bot"
+# web_to_epub is deployed next to the app; copies without a convert(url) entry point run as a script
+EPUB_SCRIPT = os.path.join(BOT_DIR, "web_to_epub.py")
+
+def _line_logger(ctx):
+    def log(line):
+        ctx.log.write(f"{line}\n")
+        ctx.log.flush()
+    return log
+
+def convert_webpage_to_epub(ctx, url):
+    """Converts the given URL with web_to_epub.convert(), or its script when that isn't importable."""
+    try:
+        import web_to_epub
+        convert = web_to_epub.convert
+    except (ImportError, AttributeError):
+        run_command(ctx, ["python3", EPUB_SCRIPT, url], cwd=BOT_DIR)
+        return
+    convert(url)
+
+def summarise_pdf(ctx, full_path):
+    """Summarizes a PDF in this process, logging to the job's own log file."""
+    import pdf_summary  # PyMuPDF, tiktoken, Telegram: loaded by the first summary only
+    pdf_summary.summarize_pdf(full_path, progress=ctx.progress, log=_line_logger(ctx))
+
+jobs.register("epub", convert_webpage_to_epub)
+jobs.register("pdf_summary", summarise_pdf)
+
+def list_jobs():
+    limit = min(500, max(1, request.args.get("limit", 50, type=int)))
+    return jsonify({"counts": jobs.counts(), "jobs": jobs.list(limit)})
+
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job)
+
+def job_log(job_id):
+    job = jobs.get(job_id)
+    if job is None or not job["log_path"] or not os.path.exists(job["log_path"]):
+        abort(404)
+    return send_from_directory(os.path.dirname(job["log_path"]), os.path.basename(job["log_path"]), mimetype="text/plain")
+
+if __name__ == "__main__":
+    jobs.serve_forever()
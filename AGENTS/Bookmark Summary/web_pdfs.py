@@ -0,0 +1,163 @@
+# PDF manager pages: upload, view, remove and summarise PDFs.
+#
+# Loaded by endpoint.py on the first request to a /pdf route. Summaries
+# run as "pdf_summary" jobs (see web_jobs), so PyMuPDF and the Telegram
+# stack are only imported once the first summary job starts.
+
+import os
+
+from flask import redirect, render_template, request, url_for
+
+import bookmark_store
+from file_serving import serve_file
+from web_common import BOOKMARK_DB, blobs, conditional_response, page_args, paging_info, register_templates
+from web_jobs import jobs
+
+# File and folder settings for PDFs (pdfs.txt is imported into the store once, then renamed)
+PDF_LIST_FILE = bookmark_store.LEGACY_PDF_LIST_FILE
+PDF_UPLOAD_FOLDER = "/home/debian/bookmark_bot/pdf_uploads"
+
+# Ensure the upload folder exists
+if not os.path.exists(PDF_UPLOAD_FOLDER):
+    os.makedirs(PDF_UPLOAD_FOLDER)
+
+# Existing uploads are moved into the blob store as they are imported
+bookmark_store.init_pdfs(blobs.adopt, BOOKMARK_DB, PDF_LIST_FILE)
+
+def render_pdfs(paging, message=None):
+    total = bookmark_store.count_pdfs(BOOKMARK_DB)
+    paging = paging_info(paging, total)
+    pdfs = bookmark_store.list_pdfs(
+        offset=(paging["page"] - 1) * paging["per_page"],
+        limit=paging["per_page"],
+        sort=paging["sort"],
+        descending=paging["order"] == "desc",
+        db_path=BOOKMARK_DB,
+    )
+    for pdf in pdfs:
+        pdf["full_path"] = pdf["path"]
+    return render_template("pdfs.html", pdfs=pdfs, paging=paging, message=message)
+
+# HTML Template for PDF Management
+pdf_template = """
+{% from "pager.html" import pager, sort_header %}
+<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>PDF Manager</title>
+  <style>
+    table { width: 100%; border-collapse: collapse; }
+    th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+    th { background-color: #f2f2f2; }
+    tr:nth-child(even) { background-color: #f9f9f9; }
+    tr:nth-child(odd) { background-color: #ffffff; }
+  </style>
+</head>
+<body>
+  <h1>PDF Manager</h1>
+  
+  <h2>Upload a PDF</h2>
+  <form action="/pdf/upload" method="post" enctype="multipart/form-data">
+      <input type="file" name="pdf_file" accept=".pdf" required>
+      <button type="submit">Upload</button>
+  </form>
+  
+  <h2>Uploaded PDFs</h2>
+  <table>
+    <thead>
+      <tr>
+        <th>{{ sort_header('pdf_manager', paging, 'filename', 'Filename') }}</th>
+        <th>{{ sort_header('pdf_manager', paging, 'date', 'Date Uploaded') }}</th>
+        <th>Action</th>
+      </tr>
+    </thead>
+    <tbody>
+      {% for pdf in pdfs %}
+      <tr>
+        <td><a href="{{ url_for('view_pdf', filename=pdf.filename) }}">{{ pdf.filename }}</a></td>
+        <td>{{ pdf.date_uploaded }}</td>
+        <td>
+          <!-- Summarise Button -->
+          <form action="/pdf/summarise" method="post" style="display:inline;">
+            <input type="hidden" name="full_path" value="{{ pdf.full_path }}">
+            <button type="submit">Summarise</button>
+          </form>
+          <!-- Remove Button -->
+          <form action="/pdf/remove" method="post" style="display:inline;">
+            <input type="hidden" name="full_path" value="{{ pdf.full_path }}">
+            <button type="submit">Remove</button>
+          </form>
+        </td>
+      </tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  {{ pager('pdf_manager', paging) }}
+  
+  {% if message %}
+    <p><strong>{{ message }}</strong></p>
+  {% endif %}
+  
+  <p><a href="{{ url_for('list_jobs') }}">Job status</a></p>
+  <p><a href="/">Back to Bookmark Manager</a></p>
+</body>
+</html>
+"""
+
+register_templates({"pdfs.html": pdf_template})
+
+def pdf_manager():
+    paging = page_args("date")
+    version = bookmark_store.pdf_version(BOOKMARK_DB)
+    etag = f"pdf-{version}-{paging['page']}-{paging['per_page']}-{paging['sort']}-{paging['order']}"
+    return conditional_response(etag, lambda: render_pdfs(paging))
+
+def pdf_upload():
+    if "pdf_file" not in request.files:
+        return redirect(url_for("pdf_manager"))
+    file = request.files["pdf_file"]
+    if file.filename == "":
+        return redirect(url_for("pdf_manager"))
+    if file and file.filename.lower().endswith(".pdf"):
+        digest, size, created = blobs.commit(file.stream)
+        full_path = os.path.abspath(os.path.join(PDF_UPLOAD_FOLDER, os.path.basename(file.filename)))
+        pdf, added = bookmark_store.add_pdf(full_path, digest, size, db_path=BOOKMARK_DB)
+        if added:
+            blobs.link(digest, full_path)
+            message = f"Successfully uploaded {file.filename}."
+        else:
+            message = f"{file.filename} is already uploaded as {pdf['filename']}."
+    else:
+        message = "Uploaded file is not a PDF."
+    return render_pdfs(page_args("date"), message=message)
+
+def view_pdf(filename):
+    return serve_file(PDF_UPLOAD_FOLDER, filename, mimetype="application/pdf")
+
+def pdf_remove():
+    full_path = request.form.get("full_path")
+    if full_path and bookmark_store.remove_pdf(full_path, BOOKMARK_DB):
+        try:
+            blobs.remove(full_path)
+            message = "PDF removed successfully."
+        except Exception as e:
+            message = f"Error removing PDF: {e}"
+    else:
+        message = "PDF file not found."
+    return render_pdfs(page_args("date"), message=message)
+
+# Summarise Route: queues a pdf_summary job for a given PDF
+def pdf_summarise():
+    full_path = request.form.get("full_path")
+    if not full_path or not os.path.exists(full_path):
+        message = "PDF file not found."
+    else:
+        job, created = jobs.submit("pdf_summary", full_path)
+        if created:
+            message = f"Summary job {job['id']} queued for: {os.path.basename(full_path)}."
+        else:
+            message = f"A summary of {os.path.basename(full_path)} is already {job['status']} (job {job['id']})."
+
+    return render_pdfs(page_args("date"), message=message)
@@ -0,0 +1,114 @@
+# File transfer pages: upload, list, download and delete files in the transfer folder.
+#
+# Loaded by endpoint.py on the first request to a /transfer route.
+
+import os
+
+from flask import abort, redirect, request, url_for
+from werkzeug.utils import secure_filename
+
+from dir_index import DirectoryIndex
+from file_serving import serve_file
+from web_common import blobs, listing_response, register_templates
+
+TRANSFER_FOLDER = "/home/debian/bookmark_bot/transfers"
+os.makedirs(TRANSFER_FOLDER, exist_ok=True)
+
+# Allowed file extensions (excluding scripts like .sh, .py, etc.)
+EXCLUDED_EXTENSIONS = {"sh", "py", "exe", "bat", "cmd", "js", "php", "pl", "rb"}
+
+def allowed_file(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() not in EXCLUDED_EXTENSIONS
+
+# Cached listing; the in-progress ".link" names come from blobs.link()
+transfer_index = DirectoryIndex(TRANSFER_FOLDER, include=lambda name: allowed_file(name) and not name.endswith(".link"))
+
+# File Transfer HTML Template
+transfer_template = """
+{% from "pager.html" import pager, sort_header, filter_form %}
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>File Transfer</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f4f4f4; }
+        button { padding: 5px 10px; cursor: pointer; }
+    </style>
+</head>
+<body>
+    <h1>File Transfer</h1>
+    <form method="POST" enctype="multipart/form-data">
+        <input type="file" name="file" required>
+        <button type="submit">Upload</button>
+    </form>
+    {% if message %}
+        <p><strong>{{ message }}</strong></p>
+    {% endif %}
+    <h2>Available Files</h2>
+    {{ filter_form(endpoint, paging) }}
+    <table>
+        <tr>
+            <th>{{ sort_header(endpoint, paging, 'name', 'Filename') }}</th>
+            <th>{{ sort_header(endpoint, paging, 'size', 'Size') }}</th>
+            <th>{{ sort_header(endpoint, paging, 'date', 'Modified') }}</th>
+            <th>Download</th>
+            <th>Delete</th>
+        </tr>
+        {% for file in files %}
+        <tr>
+            <td>{{ file.name }}</td>
+            <td>{{ file.size | filesizeformat }}</td>
+            <td>{{ file.mtime | timestampformat }}</td>
+            <td><a href="{{ url_for('download_transfer', filename=file.name) }}"><button>Download</button></a></td>
+            <td><a href="{{ url_for('delete_transfer', filename=file.name) }}"><button>Delete</button></a></td>
+        </tr>
+        {% endfor %}
+    </table>
+    {{ pager(endpoint, paging) }}
+</body>
+</html>
+"""
+
+register_templates({"transfer.html": transfer_template})
+
+def transfer():
+    message = None
+    if request.method == "POST":
+        if "file" not in request.files:
+            message = "No file part."
+        else:
+            file = request.files["file"]
+            filename = secure_filename(file.filename or "")
+            if file.filename == "":
+                message = "No selected file."
+            elif not filename:
+                return listing_response(transfer_index, "transfer.html", "transfer", message="Invalid file name."), 400
+            elif allowed_file(filename):
+                digest, size, created = blobs.commit(file.stream)
+                blobs.link(digest, os.path.join(TRANSFER_FOLDER, filename))
+                if created:
+                    message = "File uploaded successfully."
+                else:
+                    message = "File uploaded successfully (identical content was already stored, so it uses no extra space)."
+            else:
+                message = "File type not allowed."
+    
+    # List all files excluding scripts
+    return listing_response(transfer_index, "transfer.html", "transfer", message=message)
+
+def download_transfer(filename):
+    return serve_file(TRANSFER_FOLDER, filename, as_attachment=True)
+
+def delete_transfer(filename):
+    # Names are listed as stored, so only reject ones that can't be a file in the folder ("..")
+    if not secure_filename(filename):
+        abort(400)
+    file_path = os.path.join(TRANSFER_FOLDER, filename)
+    if os.path.isfile(file_path) and allowed_file(filename):
+        blobs.remove(file_path)
+    return redirect(url_for("transfer"))